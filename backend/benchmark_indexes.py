@@ -0,0 +1,201 @@
+"""
+Times the hot inventory/log queries with and without the composite indexes from
+migration 0025 on a seeded dataset.
+
+    python benchmark_indexes.py --stores 20 --items 200 --rows 200000
+
+Everything runs inside one transaction that is rolled back at the end, so the
+database is left exactly as it was (run it against a scratch database anyway if
+it holds real data: seeding takes write locks for the duration).
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+
+# Setup Django Environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ims_mrp.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from users.models import Store
+from inventory.models import (
+    Item, Location, Recipe, Inventory, ProductionLog, ReceivingLog, DailyUsage, UsageRollup, ExpiredItemLog, StocktakeSession
+)
+
+BENCHMARKED_INDEXES = [
+    (Inventory, 'inventory_fifo_idx'),
+    (ProductionLog, 'production_store_time_idx'),
+    (ProductionLog, 'production_recipe_time_idx'),
+    (ReceivingLog, 'receiving_item_time_idx'),
+    (DailyUsage, 'daily_usage_date_idx'),
+    (ExpiredItemLog, 'expired_log_time_idx'),
+    (StocktakeSession, 'stocktake_completed_idx'),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    # auto_now_add would stamp every seeded row with the same instant
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def seed(stores, items, rows):
+    now = timezone.now()
+    rng = random.Random(42)
+    store_objs = Store.objects.bulk_create([Store(name=f"Bench Store {i}") for i in range(stores)])
+    item_objs = Item.objects.bulk_create([Item(name=f"Bench Item {i}", type='ingredient', base_unit='g') for i in range(items)])
+    recipes = Recipe.objects.bulk_create([Recipe(item=item, yield_quantity=1) for item in item_objs[:max(items // 10, 1)]])
+    locations = {store.id: Location.objects.bulk_create([Location(store=store, name=f"Loc {i}") for i in range(3)]) for store in store_objs}
+
+    def moment(days):
+        return now - timedelta(minutes=rng.randrange(days * 24 * 60))
+
+    Inventory.objects.bulk_create([
+        Inventory(
+            store=store, item=rng.choice(item_objs), location=rng.choice(locations[store.id]),
+            quantity=rng.choice([0.0, rng.uniform(1, 100)]), created_at=moment(30),
+            expiration_date=now + timedelta(hours=rng.randrange(-24 * 30, 24 * 30))
+        )
+        for store in store_objs for _ in range(rows // stores)
+    ], batch_size=2000)
+
+    with explicit_timestamps(ProductionLog._meta.get_field('timestamp'), ReceivingLog._meta.get_field('timestamp'),
+                             ExpiredItemLog._meta.get_field('disposed_at'), StocktakeSession._meta.get_field('started_at')):
+        ProductionLog.objects.bulk_create([
+            ProductionLog(store=rng.choice(store_objs), recipe=rng.choice(recipes), quantity_made=1, timestamp=moment(365))
+            for _ in range(rows)
+        ], batch_size=2000)
+        ReceivingLog.objects.bulk_create([
+            ReceivingLog(store=rng.choice(store_objs), item=rng.choice(item_objs), quantity=10, timestamp=moment(365))
+            for _ in range(rows)
+        ], batch_size=2000)
+        ExpiredItemLog.objects.bulk_create([
+            ExpiredItemLog(store=rng.choice(store_objs), item=rng.choice(item_objs), quantity_expired=1, disposed_at=moment(365))
+            for _ in range(rows)
+        ], batch_size=2000)
+        sessions = []
+        for store in store_objs:
+            for week in range(52):
+                started = now - timedelta(weeks=week)
+                sessions.append(StocktakeSession(store=store, status='COMPLETED', started_at=started, completed_at=started + timedelta(hours=1)))
+        StocktakeSession.objects.bulk_create(sessions, batch_size=2000)
+
+    today = timezone.localdate()
+    days = max(rows // (stores * items), 1)
+    DailyUsage.objects.bulk_create([
+        DailyUsage(store=store, item=item, date=today - timedelta(days=day), starting_count=10, ending_count=5, implied_consumption=5)
+        for store in store_objs for item in item_objs for day in range(days)
+    ], batch_size=2000)
+    for store in store_objs:
+        UsageRollup.rebuild(store.id)
+    return store_objs, item_objs, recipes
+
+
+def hot_queries(store, items, recipes):
+    now = timezone.now()
+    item_ids = [item.id for item in items[:10]]
+    recipe_ids = [recipe.id for recipe in recipes[:5]]
+    month_ago = now - timedelta(days=30)
+    today = timezone.localdate()
+    return {
+        'FIFO batches (store, item, expiry)': lambda: list(
+            Inventory.objects.filter(store=store, item_id__in=item_ids).order_by('expiration_date', 'id').values_list('id', 'quantity')
+        ),
+        'Recent production (store, timestamp)': lambda: list(
+            ProductionLog.objects.filter(store=store).order_by('-timestamp').values_list('id', flat=True)[:5]
+        ),
+        'Theoretical usage (store, recipe, timestamp)': lambda: ProductionLog.objects.filter(
+            store=store, recipe_id__in=recipe_ids, timestamp__gte=month_ago, timestamp__lte=now
+        ).aggregate(total=Sum('quantity_made')),
+        'Received since last count (store, item, timestamp)': lambda: list(
+            ReceivingLog.objects.filter(store=store, item_id__in=item_ids, timestamp__gte=month_ago).values('item_id').annotate(total=Sum('quantity'))
+        ),
+        'Usage over a week (store, date)': lambda: list(
+            DailyUsage.objects.filter(store=store, date__range=(today - timedelta(days=6), today)).values('item_id').annotate(total=Sum('implied_consumption'))
+        ),
+        'Waste over a month (store, disposed_at)': lambda: list(
+            ExpiredItemLog.objects.filter(store=store, disposed_at__gte=month_ago).values('item_id').annotate(total=Sum('quantity_expired'))
+        ),
+        'Previous stocktake (store, status, completed_at)': lambda: StocktakeSession.objects.filter(
+            store=store, status='COMPLETED', completed_at__lt=now
+        ).order_by('-completed_at').first(),
+    }
+
+
+def time_queries(queries, repeat):
+    timings = {}
+    for name, query in queries.items():
+        query()  # warm up
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stores', type=int, default=20)
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=200000, help="Rows seeded per log/batch table.")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query (median reported).")
+    args = parser.parse_args()
+
+    try:
+        # SQLite only allows schema changes in a transaction with FK checks off
+        with connection.constraint_checks_disabled(), transaction.atomic():
+            print(f"Seeding {args.rows} rows per table across {args.stores} stores ({connection.vendor})...")
+            stores, items, recipes = seed(args.stores, args.items, args.rows)
+            queries = hot_queries(stores[0], items, recipes)
+
+            indexes = [(model, next(index for index in model._meta.indexes if index.name == name)) for model, name in BENCHMARKED_INDEXES]
+            with connection.schema_editor(atomic=False) as editor:
+                for model, index in indexes:
+                    editor.remove_index(model, index)
+            analyze()
+            before = time_queries(queries, args.repeat)
+
+            with connection.schema_editor(atomic=False) as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+            analyze()
+            after = time_queries(queries, args.repeat)
+
+            width = max(len(name) for name in queries)
+            print(f"\n{'Query':<{width}}  {'Before ms':>10}  {'After ms':>10}  {'Speedup':>8}")
+            for name in queries:
+                speedup = before[name] / after[name] if after[name] else float('inf')
+                print(f"{name:<{width}}  {before[name]:>10.2f}  {after[name]:>10.2f}  {speedup:>7.1f}x")
+            raise Rollback
+    except Rollback:
+        print("\nRolled back seeded data.")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ims_mrp.settings')
 django.setup()
 
 from users.models import CustomUser, Store
-from inventory.models import Location, Item, UnitConversion, Recipe, RecipeStep, RecipeStepIngredient, Inventory, ProductionLog, RecipeIngredient, ExpiredItemLog, DailyUsage, StoreItemSettings
+from inventory.models import Location, Item, UnitConversion, Recipe, RecipeStep, RecipeStepIngredient, Inventory, ProductionLog, RecipeIngredient, ExpiredItemLog, DailyUsage, UsageRollup, StoreItemSettings
 
 def create_mock_data():
     print("Flushing Database...")
@@ -17,7 +17,8 @@ def create_mock_data():
     # Be careful with order due to foreign keys
     Inventory.objects.all().delete()
     ProductionLog.objects.all().delete()
-    DailyUsage.objects.all().delete()
+    with DailyUsage.bulk_writes():
+        DailyUsage.objects.all().delete()
     ExpiredItemLog.objects.all().delete()
     RecipeStepIngredient.objects.all().delete()
     RecipeStep.objects.all().delete()
@@ -255,6 +256,7 @@ def create_mock_data():
              sold_sponge = random.randint(1, 5)
              DailyUsage.objects.create(store=store, date=date, item=sponge, implied_consumption=sold_sponge, starting_count=sold_sponge, ending_count=0)
 
+    UsageRollup.rebuild()
     print("Analytics Data populated.")
     print("Done! Mock data created successfully.")
 
@@ -187,6 +187,38 @@ STORAGES = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache (dashboard payloads are cached per store and business date). It must be shared:
+# management commands and every gunicorn worker bump the same invalidation versions, so a
+# per-process cache would keep serving stale dashboards. Redis when REDIS_URL is set,
+# otherwise a database table (`manage.py createcachetable`).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'ims_mrp_cache',
+        }
+    }
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# Items with more batches than this recompute expirations outside the request after a
+# shelf-life change, queued for `manage.py recompute_expirations` (None = always inline)
+EXPIRATION_RECOMPUTE_INLINE_LIMIT = 5000
+
+# Default age (days) after which production/receiving/variance logs move to the archive
+# tables (`manage.py archive_logs`); stores can override it with Store.log_retention_days
+LOG_RETENTION_DAYS = 365
+
+# How long deletions stay visible to ?updated_since= delta syncs (`manage.py prune_tombstones`);
+# clients with an older cursor are told to reload the full collection
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
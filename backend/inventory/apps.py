@@ -6,5 +6,4 @@ class InventoryConfig(AppConfig):
     name = 'inventory'
 
     def ready(self):
-        # import inventory.signals
-        pass
+        import inventory.signals  # noqa: F401
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import LogArchive
+from inventory.services.archive_service import ArchiveService
+from users.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves production, receiving and variance logs older than each store's retention "
+        "horizon into compressed archive rows, keeping monthly rollups. Meant to run on a "
+        "schedule; every chunk is its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only archive this store id.")
+        parser.add_argument('--kind', choices=[kind for kind, _ in LogArchive.KIND_CHOICES], help="Only archive this log kind.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per archive chunk.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be archived without writing anything.")
+
+    def handle(self, *args, **options):
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id=options['store'])
+        kinds = [options['kind']] if options['kind'] else list(ArchiveService.MODELS)
+
+        total = 0
+        for store in stores:
+            for kind in kinds:
+                stats = ArchiveService.archive(store, kind, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+                if stats['rows']:
+                    self.stdout.write(f"{store.name}: {stats['rows']} {kind} rows in {stats['archives']} archives")
+                total += stats['rows']
+
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} log rows."))
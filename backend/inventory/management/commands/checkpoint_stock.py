@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.services.inventory_service import InventoryService
+from inventory.services.ledger_service import LedgerService
+from users.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoints on-hand per store/item/location from the stock movement ledger, so "
+        "point-in-time lookups only sum movements since the last checkpoint. Meant to run "
+        "nightly; defaults to the start of today's business day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only checkpoint this store id.")
+        parser.add_argument('--at', help="ISO datetime to checkpoint at (default: start of today's business day).")
+
+    def handle(self, *args, **options):
+        if options['at']:
+            try:
+                at = datetime.fromisoformat(options['at'])
+            except ValueError:
+                raise CommandError("--at must be an ISO datetime")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        else:
+            at = InventoryService.start_of_business_day()
+
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id=options['store'])
+
+        total = 0
+        for store in stores:
+            rows = LedgerService.checkpoint(store.id, at)
+            if rows:
+                self.stdout.write(f"{store.name}: {rows} positions")
+            total += rows
+
+        self.stdout.write(self.style.SUCCESS(f"Checkpointed {total} positions as of {at.isoformat()}."))
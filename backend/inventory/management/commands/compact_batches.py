@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import Inventory
+from inventory.services.inventory_service import InventoryService
+from users.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes drained (zero quantity) batches and merges same-item, same-location batches "
+        "expiring on the same business day. Production, receiving and stocktakes already do "
+        "this for the items they touch; this catches up whole stores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only compact this store id.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Items per transaction.")
+
+    def handle(self, *args, **options):
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id=options['store'])
+
+        chunk_size = options['chunk_size']
+        totals = {'deleted': 0, 'merged': 0}
+        for store in stores:
+            item_ids = list(
+                Inventory.objects.filter(store=store).order_by('item_id').values_list('item_id', flat=True).distinct()
+            )
+            deleted = merged = 0
+            for start in range(0, len(item_ids), chunk_size):
+                stats = InventoryService.compact_batches(store.id, item_ids[start:start + chunk_size])
+                deleted += stats['deleted']
+                merged += stats['merged']
+            if deleted or merged:
+                self.stdout.write(f"{store.name}: {deleted} drained batches deleted, {merged} batches merged")
+            totals['deleted'] += deleted
+            totals['merged'] += merged
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted inventory: {totals['deleted']} drained batches deleted, {totals['merged']} merged."
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.forecast_service import ForecastService
+
+
+class Command(BaseCommand):
+    help = "Forecasts daily demand from DailyUsage and stores suggested pars."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only forecast this store id.")
+        parser.add_argument('--history-days', type=int, default=56, help="Days of DailyUsage history to fit on.")
+        parser.add_argument('--horizon', type=int, default=7, help="Days ahead to forecast.")
+        parser.add_argument('--coverage-days', type=int, default=2, help="Days of demand a suggested par should cover.")
+        parser.add_argument('--alpha', type=float, default=0.3, help="Smoothing factor (0-1); higher favours recent days.")
+        parser.add_argument('--dry-run', action='store_true', help="Fit and report without writing anything.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        summary = ForecastService.run(
+            store_id=options['store'],
+            history_days=options['history_days'],
+            horizon=options['horizon'],
+            coverage_days=options['coverage_days'],
+            alpha=options['alpha'],
+            dry_run=options['dry_run']
+        )
+        elapsed = time.monotonic() - started
+        verb = "Would write" if options['dry_run'] else "Wrote"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['forecast_rows']} forecasts for {summary['pairs']} store items "
+            f"as of {summary['as_of']} in {elapsed:.2f}s."
+        ))
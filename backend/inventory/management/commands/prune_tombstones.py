@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = "Deletes sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS. Meant to run daily."
+
+    def handle(self, *args, **options):
+        removed = Tombstone.prune()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {removed} tombstones."))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from inventory.models import Inventory, OnHand, LocationOnHand, StockMovement
+from users.models import Store
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized on-hand totals from Inventory batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only rebuild this store id.")
+        parser.add_argument('--check', action='store_true', help="Report mismatches without writing anything.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Items refreshed per transaction.")
+
+    def handle(self, *args, **options):
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id=options['store'])
+
+        mismatches = 0
+        for store in stores:
+            actual = dict(
+                Inventory.objects.filter(store=store).values('item_id').annotate(total=Sum('quantity')).values_list('item_id', 'total')
+            )
+            actual_by_location = {
+                (row['item_id'], row['location_id']): row['total']
+                for row in Inventory.objects.filter(store=store).values('item_id', 'location_id').annotate(total=Sum('quantity'))
+            }
+            stored = dict(OnHand.objects.filter(store=store).values_list('item_id', 'quantity'))
+            stored_by_location = {
+                (item_id, location_id): quantity
+                for item_id, location_id, quantity in LocationOnHand.objects.filter(store=store).values_list('item_id', 'location_id', 'quantity')
+            }
+
+            drifted = set()
+            for item_id in set(actual) | set(stored):
+                if (actual.get(item_id) or 0.0) != stored.get(item_id, 0.0):
+                    drifted.add(item_id)
+            for key in set(actual_by_location) | set(stored_by_location):
+                if key not in stored_by_location or key not in actual_by_location:
+                    drifted.add(key[0])
+                elif (actual_by_location[key] or 0.0) != stored_by_location[key]:
+                    drifted.add(key[0])
+            drifted = sorted(drifted)
+            mismatches += len(drifted)
+
+            if options['check']:
+                for item_id in drifted:
+                    self.stdout.write(
+                        f"{store.name}: item {item_id} on hand {stored.get(item_id, 0.0)}, batches total {actual.get(item_id) or 0.0}"
+                    )
+                continue
+
+            item_ids = sorted(set(actual) | set(stored))
+            chunk_size = options['chunk_size']
+            for start in range(0, len(item_ids), chunk_size):
+                # Corrections land in the ledger as rebuild movements
+                with transaction.atomic(), StockMovement.recording(StockMovement.REBUILD):
+                    OnHand.refresh(store.id, item_ids[start:start + chunk_size])
+            self.stdout.write(f"{store.name}: refreshed {len(item_ids)} items ({len(drifted)} had drifted)")
+
+        if options['check']:
+            style = self.style.WARNING if mismatches else self.style.SUCCESS
+            self.stdout.write(style(f"{mismatches} mismatched items"))
+        else:
+            self.stdout.write(self.style.SUCCESS("On-hand totals rebuilt."))
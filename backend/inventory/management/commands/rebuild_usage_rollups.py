@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import UsageRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the weekly/monthly usage rollups from DailyUsage rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only rebuild this store id.")
+
+    def handle(self, *args, **options):
+        written = UsageRollup.rebuild(options['store'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} usage rollups."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services.inventory_service import InventoryService
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-projects batch expirations for items whose shelf-life change was queued "
+        "(ExpirationRecompute), retrying earlier failures. Meant to run on a schedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--item', type=int, action='append', help="Only run the job for this item id (repeatable).")
+
+    def handle(self, *args, **options):
+        stats = InventoryService.run_expiration_recomputes(options['item'])
+        message = f"Recomputed expirations for {stats['done']} items."
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(f"{message} {stats['failed']} failed and stay queued."))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
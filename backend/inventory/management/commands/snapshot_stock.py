@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.services.ledger_service import LedgerService
+from users.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes per-store stock snapshots (on-hand per item and location at the start of a "
+        "business day) from the stock movement ledger. Meant to run nightly after midnight; "
+        "use --days to backfill."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only snapshot this store id.")
+        parser.add_argument('--date', help="Business date (YYYY-MM-DD) to snapshot; defaults to today.")
+        parser.add_argument('--days', type=int, default=1, help="Number of days ending at --date to (re)write.")
+
+    def handle(self, *args, **options):
+        try:
+            last = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        days = [last - timedelta(days=offset) for offset in range(max(options['days'], 1) - 1, -1, -1)]
+
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id=options['store'])
+
+        total = 0
+        for store in stores:
+            rows = sum(LedgerService.snapshot(store.id, day) for day in days)
+            if rows:
+                self.stdout.write(f"{store.name}: {rows} rows")
+            total += rows
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} snapshot rows for {days[0]} to {days[-1]}."))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.services.inventory_service import InventoryService
+from users.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Disposes of batches that expired before today's business day (TIME_ZONE): "
+        "logs them to ExpiredItemLog and deletes them. Meant to run on a schedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="Only sweep this store id.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Batches per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be swept without writing anything.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        before = InventoryService.start_of_business_day(today)
+
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id=options['store'])
+
+        totals = {'batches': 0, 'logged': 0}
+        for store in stores:
+            stats = InventoryService.sweep_expired(store.id, before, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+            if stats['batches']:
+                self.stdout.write(
+                    f"{store.name}: {stats['batches']} expired batches, {stats['logged']} logged "
+                    f"({stats['quantity']:g} base units)"
+                )
+            totals['batches'] += stats['batches']
+            totals['logged'] += stats['logged']
+
+        verb = "Would sweep" if options['dry_run'] else "Swept"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['batches']} batches ({totals['logged']} logged) expired before {today}."
+        ))
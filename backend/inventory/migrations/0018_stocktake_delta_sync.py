@@ -0,0 +1,48 @@
+# Generated by Django 6.1.2 on 2026-10-19 03:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_alter_recipestep_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktakerecord',
+            name='client_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='stocktakerecord',
+            name='device_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='stocktakerecord',
+            name='server_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='stocktakerecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='stocktakesession',
+            name='sync_cursor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='inventory',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='stocktakerecord',
+            index=models.Index(fields=['session', 'server_seq'], name='stocktake_record_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-19 03:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_stocktake_sub_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variancelog',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='variance_logs', to='inventory.stocktakesession'),
+        ),
+        migrations.CreateModel(
+            name='StocktakeReportLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=255)),
+                ('start_quantity', models.FloatField()),
+                ('system_quantity', models.FloatField()),
+                ('received_quantity', models.FloatField()),
+                ('end_quantity', models.FloatField()),
+                ('actual_usage', models.FloatField()),
+                ('theoretical_usage', models.FloatField()),
+                ('variance', models.FloatField()),
+                ('unit', models.CharField(max_length=50)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.item')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_lines', to='inventory.stocktakesession')),
+            ],
+            options={
+                'unique_together': {('session', 'item')},
+            },
+        ),
+    ]
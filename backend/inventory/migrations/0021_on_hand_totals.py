@@ -0,0 +1,64 @@
+# Generated by Django 6.1.2 on 2026-10-19 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_on_hand(apps, schema_editor):
+    Inventory = apps.get_model('inventory', 'Inventory')
+    OnHand = apps.get_model('inventory', 'OnHand')
+    LocationOnHand = apps.get_model('inventory', 'LocationOnHand')
+
+    by_item = {}
+    location_rows = []
+    totals = Inventory.objects.values('store_id', 'item_id', 'location_id').annotate(total=models.Sum('quantity'))
+    for row in totals.iterator():
+        quantity = row['total'] or 0.0
+        location_rows.append(LocationOnHand(store_id=row['store_id'], item_id=row['item_id'], location_id=row['location_id'], quantity=quantity))
+        key = (row['store_id'], row['item_id'])
+        by_item[key] = by_item.get(key, 0.0) + quantity
+
+    LocationOnHand.objects.bulk_create(location_rows, batch_size=500)
+    OnHand.objects.bulk_create(
+        [OnHand(store_id=store_id, item_id=item_id, quantity=quantity) for (store_id, item_id), quantity in by_item.items()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0020_stocktake_report'),
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationOnHand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_on_hand', to='inventory.item')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='on_hand', to='inventory.location')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_on_hand', to='users.store')),
+            ],
+            options={
+                'unique_together': {('store', 'item', 'location')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OnHand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='on_hand', to='inventory.item')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='on_hand', to='users.store')),
+            ],
+            options={
+                'unique_together': {('store', 'item')},
+            },
+        ),
+        migrations.RunPython(populate_on_hand, migrations.RunPython.noop),
+    ]
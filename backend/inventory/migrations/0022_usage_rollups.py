@@ -0,0 +1,50 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def populate_usage_rollups(apps, schema_editor):
+    DailyUsage = apps.get_model('inventory', 'DailyUsage')
+    UsageRollup = apps.get_model('inventory', 'UsageRollup')
+
+    rows = []
+    for granularity, trunc in (('week', TruncWeek), ('month', TruncMonth)):
+        totals = DailyUsage.objects.filter(implied_consumption__gt=0).values('store_id', 'item_id', period=trunc('date')).annotate(
+            total=models.Sum('implied_consumption'), days=models.Count('id')
+        ).order_by()
+        for row in totals.iterator():
+            rows.append(UsageRollup(
+                store_id=row['store_id'], item_id=row['item_id'], granularity=granularity,
+                period_start=row['period'], implied_consumption=row['total'] or 0.0, days=row['days']
+            ))
+    UsageRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_on_hand_totals'),
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('implied_consumption', models.FloatField(default=0.0)),
+                ('days', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='inventory.item')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='users.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'granularity', 'period_start'], name='usage_rollup_period_idx')],
+                'unique_together': {('store', 'item', 'granularity', 'period_start')},
+            },
+        ),
+        migrations.RunPython(populate_usage_rollups, migrations.RunPython.noop),
+    ]
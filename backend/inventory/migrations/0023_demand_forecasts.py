@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0022_usage_rollups'),
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeitemsettings',
+            name='suggested_par',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='storeitemsettings',
+            name='suggested_par_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.FloatField()),
+                ('generated_at', models.DateTimeField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='inventory.item')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='users.store')),
+            ],
+            options={
+                'unique_together': {('store', 'item', 'date')},
+            },
+        ),
+    ]
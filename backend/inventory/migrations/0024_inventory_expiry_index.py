@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0023_demand_forecasts'),
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['store', 'expiration_date'], name='inventory_in_stock_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0024_inventory_expiry_index'),
+        ('users', '0002_alter_customuser_role'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyusage',
+            index=models.Index(fields=['store', 'date', 'item'], name='daily_usage_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expireditemlog',
+            index=models.Index(fields=['store', 'disposed_at'], name='expired_log_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['store', 'item', 'expiration_date'], name='inventory_fifo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionlog',
+            index=models.Index(fields=['store', 'timestamp'], name='production_store_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionlog',
+            index=models.Index(fields=['store', 'recipe', 'timestamp'], name='production_recipe_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receivinglog',
+            index=models.Index(fields=['store', 'item', 'timestamp'], name='receiving_item_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktakesession',
+            index=models.Index(fields=['store', 'status', 'completed_at'], name='stocktake_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    # Current on-hand becomes the opening balance, so ledger sums match OnHand from day one
+    LocationOnHand = apps.get_model('inventory', 'LocationOnHand')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    now = timezone.now()
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(store_id=row.store_id, item_id=row.item_id, location_id=row.location_id,
+                          quantity=row.quantity, reason='opening', timestamp=now)
+            for row in LocationOnHand.objects.exclude(quantity=0).iterator()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0025_composite_indexes'),
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.FloatField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='inventory.item')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='inventory.location')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='users.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'taken_at'], name='stock_checkpoint_time_idx')],
+                'unique_together': {('store', 'item', 'location', 'taken_at')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.FloatField()),
+                ('reason', models.CharField(choices=[('opening', 'Opening Balance'), ('receiving', 'Receiving'), ('production', 'Production'), ('stocktake', 'Stocktake'), ('disposal', 'Disposal'), ('adjustment', 'Adjustment'), ('rebuild', 'On-hand Rebuild')], default='adjustment', max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=64)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.item')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.location')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='users.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'item', 'location', 'timestamp'], name='stock_movement_key_idx'), models.Index(fields=['store', 'timestamp'], name='stock_movement_time_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0027_stock_snapshots'),
+        ('users', '0003_store_log_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('production', 'Production Logs'), ('receiving', 'Receiving Logs'), ('variance', 'Variance Logs')], max_length=20)),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_archives', to='users.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'kind', 'last_timestamp'], name='log_archive_range_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('production', 'Production Logs'), ('receiving', 'Receiving Logs'), ('variance', 'Variance Logs')], max_length=20)),
+                ('month', models.DateField()),
+                ('unit', models.CharField(blank=True, max_length=50)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('quantity', models.FloatField(default=0.0)),
+                ('value', models.FloatField(default=0.0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_rollups', to='inventory.item')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_rollups', to='users.store')),
+            ],
+            options={
+                'unique_together': {('store', 'kind', 'item', 'month', 'unit')},
+            },
+        ),
+    ]
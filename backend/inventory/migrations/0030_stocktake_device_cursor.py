@@ -0,0 +1,27 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0029_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StocktakeDeviceCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=64)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_cursors', to='inventory.stocktakesession')),
+                ('sub_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='device_cursors', to='inventory.stocktakesubsession')),
+            ],
+            options={
+                'unique_together': {('session', 'sub_session', 'device_id')},
+            },
+        ),
+    ]
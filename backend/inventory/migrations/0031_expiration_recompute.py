@@ -0,0 +1,25 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0030_stocktake_device_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpirationRecompute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='expiration_recompute', to='inventory.item')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+def ranges_from_last_seq(apps, schema_editor):
+    # Everything up to the old high-water mark counted as applied
+    StocktakeDeviceCursor = apps.get_model('inventory', 'StocktakeDeviceCursor')
+    for cursor in StocktakeDeviceCursor.objects.filter(last_seq__gt=0).iterator():
+        cursor.applied_seqs = [[1, cursor.last_seq]]
+        cursor.save(update_fields=['applied_seqs'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0031_expiration_recompute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktakedevicecursor',
+            name='applied_seqs',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(ranges_from_last_seq, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='stocktakedevicecursor',
+            name='last_seq',
+        ),
+    ]
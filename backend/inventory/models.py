@@ -1,4 +1,9 @@
-from django.db import models
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils import timezone
 
 # --- Organizational & Item Logic ---
@@ -7,6 +12,7 @@ class Location(models.Model):
     store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='locations')
     name = models.CharField(max_length=100)
     is_sales_floor = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.store.name} - {self.name}"
@@ -30,6 +36,7 @@ class Item(models.Model):
     # Global items might have a shelf life (Products), or not (Ingredients/Raw Materials).
     # If null, it means it doesn't expire or tracking isn't required globally.
     shelf_life_days = models.IntegerField(default=1, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -42,13 +49,22 @@ class Item(models.Model):
         if quantity == 0:
             return 0, self.base_unit
 
+        # Use prefetch_related('conversions') when formatting many items to avoid per-item queries
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('conversions')
+
         # 1. Check for Default Display Unit
-        default_conversion = self.conversions.filter(is_default_display=True).first()
+        if prefetched is not None:
+            default_conversion = min((c for c in prefetched if c.is_default_display), key=lambda c: c.pk, default=None)
+        else:
+            default_conversion = self.conversions.filter(is_default_display=True).first()
         if default_conversion and default_conversion.factor > 0:
              return quantity / default_conversion.factor, default_conversion.unit_name
 
         # 2. Fetch conversions sorted by factor descending to try largest units first
-        conversions = self.conversions.all().order_by('-factor')
+        if prefetched is not None:
+            conversions = sorted(prefetched, key=lambda c: -c.factor)
+        else:
+            conversions = self.conversions.all().order_by('-factor')
         
         for conversion in conversions:
             if conversion.factor > 0:
@@ -70,6 +86,10 @@ class StoreItemSettings(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='store_settings')
     default_location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True)
     par = models.FloatField(default=0.0)
+    # Written by `manage.py forecast_demand`; `par` stays under the store's control
+    suggested_par = models.FloatField(null=True, blank=True)
+    suggested_par_updated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('store', 'item')
@@ -82,6 +102,7 @@ class UnitConversion(models.Model):
     unit_name = models.CharField(max_length=50) # e.g., 'Box'
     factor = models.FloatField() # e.g., 28.0 (1 Box = 28.0 Base Units)
     is_default_display = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.unit_name} ({self.factor} x {self.item.base_unit})"
@@ -94,6 +115,7 @@ class Recipe(models.Model):
     yield_unit = models.ForeignKey(UnitConversion, on_delete=models.SET_NULL, null=True, blank=True)
     # instructions field is deprecated in favor of RecipeStep model, but kept for backward compatibility/summary if needed.
     instructions = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def save(self, *args, **kwargs):
         if self.yield_unit and self.yield_unit.item != self.item:
@@ -145,6 +167,8 @@ class RecipeIngredient(models.Model):
 
 # --- Inventory & Logs ---
 
+_bulk_batch_writes = ContextVar('inventory_bulk_batch_writes', default=False)
+
 class Inventory(models.Model):
     store = models.ForeignKey('users.Store', on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
@@ -152,10 +176,269 @@ class Inventory(models.Model):
     quantity = models.FloatField() # Always in Base Units
     expiration_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # Delta sync cursor; queryset updates and bulk_update must set it explicitly
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Expiry lookups are ranges over in-stock batches of one store; drained batches
+            # are left out of the index (partial where the backend supports it).
+            models.Index(fields=['store', 'expiration_date'], condition=models.Q(quantity__gt=0), name='inventory_in_stock_expiry_idx'),
+            # FIFO scans: a store's batches of some items, soonest expiry first
+            models.Index(fields=['store', 'item', 'expiration_date'], name='inventory_fifo_idx'),
+            models.Index(fields=['store', 'updated_at'], name='inventory_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The post_save on-hand refresh (signals.py) must commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    @staticmethod
+    @contextmanager
+    def bulk_writes():
+        """
+        For set-based paths that refresh OnHand and record tombstones themselves once for
+        the whole set: the per-row signal upkeep is skipped inside the block.
+        """
+        token = _bulk_batch_writes.set(True)
+        try:
+            yield
+        finally:
+            _bulk_batch_writes.reset(token)
+
+    @staticmethod
+    def in_bulk_write():
+        return _bulk_batch_writes.get()
 
     def __str__(self):
         return f"{self.item.name} at {self.location.name}: {self.quantity}"
 
+class ExpirationRecompute(models.Model):
+    """
+    Pending re-projection of an item's batch expirations after a shelf-life change too large
+    to run inside the request. One row per item; a newer edit bumps requested_at. Rows stay
+    (with the last error) until a run finishes, so `manage.py recompute_expirations` retries them.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, related_name='expiration_recompute')
+    requested_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Recompute expirations for item {self.item_id} (requested {self.requested_at})"
+
+class OnHand(models.Model):
+    """
+    Materialized on-hand total of an Item in a store (sum of its Inventory batches).
+    Maintained in the same transaction as every batch mutation (signals.py for row saves and
+    deletes, including cascades and queryset deletes; explicit calls on bulk paths); rebuild with
+    `manage.py rebuild_on_hand` if it ever drifts.
+    """
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='on_hand')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='on_hand')
+    quantity = models.FloatField(default=0.0) # Base Units
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('store', 'item')
+
+    def __str__(self):
+        return f"{self.item.name} on hand: {self.quantity}"
+
+    @classmethod
+    def refresh(cls, store_id, item_ids):
+        """
+        Recomputes the store-level and location-level on-hand rows for the given items
+        from their batches: one grouped read, then bulk upserts.
+        Returns {(item_id, location_id): (old_quantity, new_quantity)} for locations that changed.
+        """
+        item_ids = set(item_ids)
+        if not store_id or not item_ids:
+            return {}
+
+        new_by_location = {}
+        new_by_item = {item_id: 0.0 for item_id in item_ids}
+        totals = Inventory.objects.filter(store_id=store_id, item_id__in=item_ids).values('item_id', 'location_id').annotate(total=models.Sum('quantity'))
+        for row in totals:
+            quantity = row['total'] or 0.0
+            new_by_location[(row['item_id'], row['location_id'])] = quantity
+            new_by_item[row['item_id']] += quantity
+
+        old_rows = LocationOnHand.objects.filter(store_id=store_id, item_id__in=item_ids).values_list('id', 'item_id', 'location_id', 'quantity')
+        old_by_location = {}
+        stale_ids = []
+        for row_id, item_id, location_id, quantity in old_rows:
+            old_by_location[(item_id, location_id)] = quantity
+            if (item_id, location_id) not in new_by_location:
+                stale_ids.append(row_id)
+
+        changes = {}
+        for key in set(old_by_location) | set(new_by_location):
+            old, new = old_by_location.get(key, 0.0), new_by_location.get(key, 0.0)
+            if old != new:
+                changes[key] = (old, new)
+
+        now = timezone.now()
+        if stale_ids:
+            LocationOnHand.objects.filter(id__in=stale_ids).delete()
+        if new_by_location:
+            LocationOnHand.objects.bulk_create(
+                [
+                    LocationOnHand(store_id=store_id, item_id=item_id, location_id=location_id, quantity=quantity, updated_at=now)
+                    for (item_id, location_id), quantity in new_by_location.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['store', 'item', 'location'],
+                update_fields=['quantity', 'updated_at'],
+                batch_size=500
+            )
+        cls.objects.bulk_create(
+            [cls(store_id=store_id, item_id=item_id, quantity=quantity, updated_at=now) for item_id, quantity in new_by_item.items()],
+            update_conflicts=True,
+            unique_fields=['store', 'item'],
+            update_fields=['quantity', 'updated_at'],
+            batch_size=500
+        )
+
+        # Every stock movement funnels through here: append it to the ledger, and this is
+        # also where dashboards go stale
+        StockMovement.record(store_id, changes)
+        from .services.dashboard_cache import DashboardCache
+        DashboardCache.invalidate(store_id)
+        return changes
+
+class LocationOnHand(models.Model):
+    """
+    Materialized on-hand total of an Item at one Location. Maintained alongside OnHand.
+    """
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='location_on_hand')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='location_on_hand')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='on_hand')
+    quantity = models.FloatField(default=0.0) # Base Units
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('store', 'item', 'location')
+
+    def __str__(self):
+        return f"{self.item.name} at {self.location.name} on hand: {self.quantity}"
+
+# (reason, reference) for movements recorded inside a StockMovement.recording() block
+_movement_context = ContextVar('stock_movement_context', default=None)
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of signed on-hand changes per (store, item, location).
+    Rows are appended by OnHand.refresh from the before/after location totals, so every
+    batch mutation is covered; the reason comes from the enclosing recording() block
+    (plain adjustments otherwise). Never updated or deleted.
+    """
+    OPENING = 'opening'
+    RECEIVING = 'receiving'
+    PRODUCTION = 'production'
+    STOCKTAKE = 'stocktake'
+    DISPOSAL = 'disposal'
+    ADJUSTMENT = 'adjustment'
+    REBUILD = 'rebuild'
+    REASON_CHOICES = (
+        (OPENING, 'Opening Balance'),
+        (RECEIVING, 'Receiving'),
+        (PRODUCTION, 'Production'),
+        (STOCKTAKE, 'Stocktake'),
+        (DISPOSAL, 'Disposal'),
+        (ADJUSTMENT, 'Adjustment'),
+        (REBUILD, 'On-hand Rebuild'),
+    )
+
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='stock_movements')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_movements')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='stock_movements')
+    quantity = models.FloatField() # Signed, Base Units
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default=ADJUSTMENT)
+    reference = models.CharField(max_length=64, blank=True) # e.g. "production:12"
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'item', 'location', 'timestamp'], name='stock_movement_key_idx'),
+            # Range sums across a store between checkpoints
+            models.Index(fields=['store', 'timestamp'], name='stock_movement_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reason} {self.quantity:+g} {self.item.name} at {self.location.name}"
+
+    @staticmethod
+    @contextmanager
+    def recording(reason, reference=''):
+        """
+        Labels the movements appended by any batch mutation inside the block.
+        """
+        token = _movement_context.set((reason, reference))
+        try:
+            yield
+        finally:
+            _movement_context.reset(token)
+
+    @classmethod
+    def record(cls, store_id, changes):
+        """
+        Appends one movement per changed location. `changes` is OnHand.refresh's
+        {(item_id, location_id): (old_quantity, new_quantity)}.
+        """
+        if not changes:
+            return []
+        reason, reference = _movement_context.get() or (cls.ADJUSTMENT, '')
+        now = timezone.now()
+        return cls.objects.bulk_create([
+            cls(store_id=store_id, item_id=item_id, location_id=location_id, quantity=new - old,
+                reason=reason, reference=reference, timestamp=now)
+            for (item_id, location_id), (old, new) in changes.items()
+        ], batch_size=500)
+
+class StockCheckpoint(models.Model):
+    """
+    On-hand per (store, item, location) as of `taken_at`, folded from the previous
+    checkpoint plus the StockMovement rows since. Bounds point-in-time lookups to one
+    checkpoint read plus a short ledger range sum. Written by `manage.py checkpoint_stock`.
+    """
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='stock_checkpoints')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_checkpoints')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='stock_checkpoints')
+    taken_at = models.DateTimeField()
+    quantity = models.FloatField() # Base Units
+
+    class Meta:
+        unique_together = ('store', 'item', 'location', 'taken_at')
+        indexes = [
+            models.Index(fields=['store', 'taken_at'], name='stock_checkpoint_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} at {self.location.name} as of {self.taken_at}: {self.quantity}"
+
+class StockSnapshot(models.Model):
+    """
+    On-hand of an Item at a Location at the start of business day `date` (i.e. the close
+    of the day before). Written nightly by `manage.py snapshot_stock`; reports read
+    historical positions from here instead of replaying logs.
+    """
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='stock_snapshots')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_snapshots')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    quantity = models.FloatField() # Base Units
+
+    class Meta:
+        unique_together = ('store', 'item', 'location', 'date')
+        indexes = [
+            models.Index(fields=['store', 'date', 'item'], name='stock_snapshot_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} at {self.location.name} opening {self.date}: {self.quantity}"
+
 class ProductionLog(models.Model):
     store = models.ForeignKey('users.Store', on_delete=models.CASCADE)
     user = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True)
@@ -165,12 +448,20 @@ class ProductionLog(models.Model):
     target_location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True) # Where the result goes
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'timestamp'], name='production_store_time_idx'),
+            models.Index(fields=['store', 'recipe', 'timestamp'], name='production_recipe_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} made {self.quantity_made} {self.unit_type} of {self.recipe.item.name}"
 
 class VarianceLog(models.Model):
     store = models.ForeignKey('users.Store', on_delete=models.CASCADE)
     user = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True)
+    # Set when written by a stocktake session finalize (null for the legacy single-shot stocktake)
+    session = models.ForeignKey('StocktakeSession', on_delete=models.SET_NULL, null=True, blank=True, related_name='variance_logs')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     expected_quantity = models.FloatField()
@@ -183,6 +474,8 @@ class VarianceLog(models.Model):
 
 # --- Analytics ---
 
+_bulk_usage_writes = ContextVar('daily_usage_bulk_writes', default=False)
+
 class DailyUsage(models.Model):
     store = models.ForeignKey('users.Store', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
@@ -195,10 +488,254 @@ class DailyUsage(models.Model):
 
     class Meta:
         unique_together = ('store', 'item', 'date')
+        indexes = [
+            # Date-range reads across all of a store's items (the unique key leads with item)
+            models.Index(fields=['store', 'date', 'item'], name='daily_usage_date_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         self.implied_consumption = self.starting_count + self.made_count + self.received_count - self.ending_count
-        super().save(*args, **kwargs)
+        # The weekly/monthly rollups are kept in step by signals.py; commit them with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    @staticmethod
+    @contextmanager
+    def bulk_writes():
+        """
+        For bulk paths that call UsageRollup.rebuild afterwards: the per-row rollup refresh
+        is skipped inside the block. bulk_create and queryset updates never trigger it.
+        """
+        token = _bulk_usage_writes.set(True)
+        try:
+            yield
+        finally:
+            _bulk_usage_writes.reset(token)
+
+    @staticmethod
+    def in_bulk_write():
+        return _bulk_usage_writes.get()
+
+class UsageRollup(models.Model):
+    """
+    DailyUsage summed per store, item and calendar week (Monday start) or month.
+    Only days with positive implied consumption are summed (analytics has always ignored
+    the rest), so long analytics ranges can read these instead of scanning daily rows.
+    Rebuild with `manage.py rebuild_usage_rollups`.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    GRANULARITY_CHOICES = [
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    ]
+
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='usage_rollups')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='usage_rollups')
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    implied_consumption = models.FloatField(default=0.0)
+    days = models.PositiveIntegerField(default=0) # Summed DailyUsage rows in the period
+
+    class Meta:
+        unique_together = ('store', 'item', 'granularity', 'period_start')
+        indexes = [
+            models.Index(fields=['store', 'granularity', 'period_start'], name='usage_rollup_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} {self.granularity} of {self.period_start}: {self.implied_consumption}"
+
+    @staticmethod
+    def period_bounds(granularity, day):
+        """
+        First and last date of the week/month containing `day`.
+        """
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        elif isinstance(day, datetime):
+            day = day.date()
+        if granularity == UsageRollup.WEEK:
+            start = day - timedelta(days=day.weekday())
+            return start, start + timedelta(days=6)
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+
+    @classmethod
+    def refresh(cls, store_id, item_id, day):
+        """
+        Recomputes the week and month rollups containing `day` from the daily rows.
+        """
+        rows = []
+        empty = models.Q()
+        for granularity, _ in cls.GRANULARITY_CHOICES:
+            start, end = cls.period_bounds(granularity, day)
+            totals = DailyUsage.objects.filter(
+                store_id=store_id, item_id=item_id, date__range=(start, end), implied_consumption__gt=0
+            ).aggregate(total=models.Sum('implied_consumption'), days=models.Count('id'))
+            if totals['days']:
+                rows.append(cls(
+                    store_id=store_id, item_id=item_id, granularity=granularity, period_start=start,
+                    implied_consumption=totals['total'] or 0.0, days=totals['days']
+                ))
+            else:
+                empty |= models.Q(granularity=granularity, period_start=start)
+
+        if empty:
+            cls.objects.filter(empty, store_id=store_id, item_id=item_id).delete()
+        if rows:
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['store', 'item', 'granularity', 'period_start'],
+                update_fields=['implied_consumption', 'days']
+            )
+
+    @classmethod
+    def rebuild(cls, store_id=None):
+        """
+        Recomputes every rollup (optionally for one store) from the daily rows.
+        Returns the number of rollup rows written.
+        """
+        daily = DailyUsage.objects.filter(implied_consumption__gt=0)
+        existing = cls.objects.all()
+        if store_id:
+            daily = daily.filter(store_id=store_id)
+            existing = existing.filter(store_id=store_id)
+
+        rows = []
+        for granularity, trunc in ((cls.WEEK, TruncWeek), (cls.MONTH, TruncMonth)):
+            totals = daily.values('store_id', 'item_id', period=trunc('date')).annotate(
+                total=models.Sum('implied_consumption'), days=models.Count('id')
+            ).order_by()
+            for row in totals.iterator():
+                rows.append(cls(
+                    store_id=row['store_id'], item_id=row['item_id'], granularity=granularity,
+                    period_start=row['period'], implied_consumption=row['total'] or 0.0, days=row['days']
+                ))
+
+        with transaction.atomic():
+            existing.delete()
+            cls.objects.bulk_create(rows, batch_size=500)
+        return len(rows)
+
+class DemandForecast(models.Model):
+    """
+    Forecast demand (base units) of an Item at a store for one future day.
+    Regenerated by `manage.py forecast_demand`.
+    """
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='demand_forecasts')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='demand_forecasts')
+    date = models.DateField()
+    quantity = models.FloatField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('store', 'item', 'date')
+
+    def __str__(self):
+        return f"{self.item.name} forecast for {self.date}: {self.quantity}"
+
+# --- Sync ---
+
+class Tombstone(models.Model):
+    """
+    Marks a deleted catalog or inventory row so delta-syncing clients (?updated_since=)
+    can drop it from their cache. Recorded by post_delete signals, or once per set by the
+    Inventory.bulk_writes() paths. Batches removed by cascade from an Item or Location
+    delete are implied by that tombstone.
+    Pruned after SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    model = models.CharField(max_length=50) # _meta.label_lower, e.g. "inventory.item"
+    object_id = models.PositiveBigIntegerField()
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, null=True, blank=True) # None for global rows
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} deleted {self.deleted_at}"
+
+    @classmethod
+    def record(cls, model, rows):
+        """
+        Bulk-records deletions of `model` rows given as (id, store_id) pairs.
+        """
+        if not rows:
+            return []
+        label = model._meta.label_lower
+        now = timezone.now()
+        return cls.objects.bulk_create(
+            [cls(model=label, object_id=object_id, store_id=store_id, deleted_at=now) for object_id, store_id in rows],
+            batch_size=500
+        )
+
+    @classmethod
+    def prune(cls, now=None):
+        """
+        Deletes tombstones past the retention window. Returns the number removed.
+        """
+        days = getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+        horizon = (now or timezone.now()) - timedelta(days=days)
+        return cls.objects.filter(deleted_at__lt=horizon).delete()[0]
+
+# --- Archive ---
+
+class LogArchive(models.Model):
+    """
+    One chunk of archived log rows (ProductionLog, ReceivingLog or VarianceLog) as
+    zlib-compressed JSON, moved out of the live tables by `manage.py archive_logs`.
+    Read back through ArchiveService.
+    """
+    PRODUCTION = 'production'
+    RECEIVING = 'receiving'
+    VARIANCE = 'variance'
+    KIND_CHOICES = (
+        (PRODUCTION, 'Production Logs'),
+        (RECEIVING, 'Receiving Logs'),
+        (VARIANCE, 'Variance Logs'),
+    )
+
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='log_archives')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    row_count = models.PositiveIntegerField()
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'kind', 'last_timestamp'], name='log_archive_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.row_count} {self.kind} rows ({self.first_timestamp:%Y-%m-%d} to {self.last_timestamp:%Y-%m-%d})"
+
+class LogRollup(models.Model):
+    """
+    Monthly per-item totals of archived log rows, kept so summaries survive archival.
+    `quantity` is quantity made (in `unit`), received (base units) or net variance;
+    `value` is the received cost (receiving only).
+    """
+    store = models.ForeignKey('users.Store', on_delete=models.CASCADE, related_name='log_rollups')
+    kind = models.CharField(max_length=20, choices=LogArchive.KIND_CHOICES)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='log_rollups')
+    month = models.DateField() # First day of the month
+    unit = models.CharField(max_length=50, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    quantity = models.FloatField(default=0.0)
+    value = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('store', 'kind', 'item', 'month', 'unit')
+
+    def __str__(self):
+        return f"{self.kind} {self.item.name} {self.month:%Y-%m}: {self.quantity}"
 
 # --- Receiving & Stocktake ---
 
@@ -210,6 +747,11 @@ class ReceivingLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'item', 'timestamp'], name='receiving_item_time_idx'),
+        ]
+
     def __str__(self):
         return f"Received {self.quantity} of {self.item.name}"
 
@@ -229,19 +771,114 @@ class StocktakeSession(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='FULL')
     user = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True)
+    # Last server sequence handed out to a record change (see StocktakeRecord.server_seq)
+    sync_cursor = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # "Previous completed session" lookups
+            models.Index(fields=['store', 'status', 'completed_at'], name='stocktake_completed_idx'),
+        ]
 
     def __str__(self):
         return f"Stocktake {self.id} ({self.status}) - {self.started_at}"
 
+class StocktakeSubSession(models.Model):
+    """
+    One location's share of a StocktakeSession.
+    Each sub-session owns the records for its location (and its own sync cursor), so several
+    counters can save in parallel without writing to the same rows. Merged at finalize.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SUBMITTED', 'Submitted'),
+    )
+    session = models.ForeignKey(StocktakeSession, on_delete=models.CASCADE, related_name='sub_sessions')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    user = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    sync_cursor = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('session', 'location')
+
+    def __str__(self):
+        return f"Stocktake {self.session_id} - {self.location.name} ({self.status})"
+
 class StocktakeRecord(models.Model):
     session = models.ForeignKey(StocktakeSession, on_delete=models.CASCADE, related_name='records')
+    sub_session = models.ForeignKey(StocktakeSubSession, on_delete=models.CASCADE, null=True, blank=True, related_name='records')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     quantity_counted = models.FloatField()
+    # Delta sync bookkeeping: which device last wrote this count and at what client sequence,
+    # and the sequence assigned when the server applied it (scoped to the sub-session if any).
+    device_id = models.CharField(max_length=64, blank=True)
+    client_seq = models.BigIntegerField(default=0)
+    server_seq = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', 'server_seq'], name='stocktake_record_seq_idx'),
+        ]
 
     def __str__(self):
         return f"Record {self.id} for {self.item.name}"
 
+class StocktakeDeviceCursor(models.Model):
+    """
+    Client sequence numbers applied from one device to a session (or one of its
+    sub-sessions), kept as merged [first, last] ranges. Replays are skipped against this,
+    whichever device last wrote the row; a batch resent out of order still applies.
+    """
+    session = models.ForeignKey(StocktakeSession, on_delete=models.CASCADE, related_name='device_cursors')
+    sub_session = models.ForeignKey(StocktakeSubSession, on_delete=models.CASCADE, null=True, blank=True, related_name='device_cursors')
+    device_id = models.CharField(max_length=64)
+    applied_seqs = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ('session', 'sub_session', 'device_id')
+
+    def __str__(self):
+        return f"{self.device_id} in stocktake {self.session_id}: {self.applied_seqs}"
+
+    def has_applied(self, seq):
+        return any(first <= seq <= last for first, last in self.applied_seqs)
+
+    def mark_applied(self, seqs):
+        merged = []
+        for first, last in sorted([list(r) for r in self.applied_seqs] + [[seq, seq] for seq in seqs]):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.applied_seqs = merged
+
+class StocktakeReportLine(models.Model):
+    """
+    One row of a finalized stocktake's usage/variance report, stored as it was at finalize.
+    """
+    session = models.ForeignKey(StocktakeSession, on_delete=models.CASCADE, related_name='report_lines')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    item_name = models.CharField(max_length=255)
+    start_quantity = models.FloatField()
+    system_quantity = models.FloatField()
+    received_quantity = models.FloatField()
+    end_quantity = models.FloatField()
+    actual_usage = models.FloatField()
+    theoretical_usage = models.FloatField()
+    variance = models.FloatField()
+    unit = models.CharField(max_length=50)
+
+    class Meta:
+        unique_together = ('session', 'item')
+
+    def __str__(self):
+        return f"Report line for {self.item_name} (Stocktake {self.session_id})"
+
 class ExpiredItemLog(models.Model):
     store = models.ForeignKey('users.Store', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
@@ -250,5 +887,10 @@ class ExpiredItemLog(models.Model):
     user = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'disposed_at'], name='expired_log_time_idx'),
+        ]
+
     def __str__(self):
         return f"Expired: {self.quantity_expired} of {self.item.name}"
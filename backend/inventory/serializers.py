@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Item, Location, Inventory, UnitConversion, Recipe, RecipeIngredient, RecipeStep, RecipeStepIngredient, ProductionLog, VarianceLog, StoreItemSettings, ReceivingLog, StocktakeSession, StocktakeRecord, ExpiredItemLog
+from .models import Item, Location, Inventory, UnitConversion, Recipe, RecipeIngredient, RecipeStep, RecipeStepIngredient, ProductionLog, VarianceLog, StoreItemSettings, ReceivingLog, StocktakeSession, StocktakeSubSession, StocktakeRecord, StocktakeReportLine, ExpiredItemLog, DemandForecast, StockMovement, StockSnapshot
 import base64
 import uuid
 from django.core.files.base import ContentFile
@@ -168,6 +168,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class ItemSerializer(serializers.ModelSerializer):
     par = serializers.SerializerMethodField()
+    suggested_par = serializers.SerializerMethodField()
     default_location = serializers.SerializerMethodField()
     conversions = UnitConversionSerializer(many=True, read_only=True)
     store_name = serializers.CharField(source='store.name', read_only=True)
@@ -175,27 +176,32 @@ class ItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'type', 'base_unit', 'shelf_life_days', 'par', 'default_location', 'conversions', 'store', 'store_name', 'is_global']
+        fields = ['id', 'name', 'type', 'base_unit', 'shelf_life_days', 'par', 'suggested_par', 'default_location', 'conversions', 'store', 'store_name', 'is_global']
         read_only_fields = ['store']
 
+    def _store_settings(self, obj):
+        # One settings lookup per item, shared by par/suggested_par/default_location
+        cache = self.context.setdefault('_store_settings', {})
+        if obj.pk not in cache:
+            user = self.context.get('request').user if self.context.get('request') else None
+            store = getattr(user, 'store', None) if user else None
+            cache[obj.pk] = StoreItemSettings.objects.filter(store=store, item=obj).first() if store else None
+        return cache[obj.pk]
+
     def get_par(self, obj):
-        user = self.context.get('request').user if self.context.get('request') else None
-        store = getattr(user, 'store', None) if user else None
-        
-        if store:
-            settings = StoreItemSettings.objects.filter(store=store, item=obj).first()
-            if settings:
-                return settings.par
+        settings = self._store_settings(obj)
+        if settings:
+            return settings.par
         return 0.0
 
+    def get_suggested_par(self, obj):
+        settings = self._store_settings(obj)
+        return settings.suggested_par if settings else None
+
     def get_default_location(self, obj):
-        user = self.context.get('request').user if self.context.get('request') else None
-        store = getattr(user, 'store', None) if user else None
-        
-        if store:
-            settings = StoreItemSettings.objects.filter(store=store, item=obj).first()
-            if settings and settings.default_location:
-                return settings.default_location.id
+        settings = self._store_settings(obj)
+        if settings and settings.default_location_id:
+            return settings.default_location_id
         return None
 
     def get_is_global(self, obj):
@@ -250,8 +256,8 @@ class VarianceLogSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = VarianceLog
-        fields = ['id', 'store', 'user', 'user_name', 'item', 'item_name', 'location', 'location_name', 'expected_quantity', 'actual_quantity', 'variance', 'timestamp']
-        read_only_fields = ['store', 'user', 'timestamp']
+        fields = ['id', 'store', 'user', 'user_name', 'session', 'item', 'item_name', 'location', 'location_name', 'expected_quantity', 'actual_quantity', 'variance', 'timestamp']
+        read_only_fields = ['store', 'user', 'session', 'timestamp']
 
     def get_user_name(self, obj):
         return obj.user.username if obj.user else None
@@ -275,20 +281,40 @@ class StocktakeRecordSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = StocktakeRecord
-        fields = ['id', 'session', 'item', 'item_name', 'base_unit', 'location', 'location_name', 'quantity_counted']
-        read_only_fields = ['session']
+        fields = ['id', 'session', 'item', 'item_name', 'base_unit', 'location', 'location_name', 'quantity_counted', 'device_id', 'client_seq', 'server_seq', 'updated_at']
+        read_only_fields = ['session', 'device_id', 'client_seq', 'server_seq', 'updated_at']
 
 class StocktakeSessionSerializer(serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
     
     class Meta:
         model = StocktakeSession
-        fields = ['id', 'store', 'user', 'user_name', 'started_at', 'completed_at', 'status', 'type']
-        read_only_fields = ['store', 'user', 'started_at', 'completed_at', 'status']
+        fields = ['id', 'store', 'user', 'user_name', 'started_at', 'completed_at', 'status', 'type', 'sync_cursor']
+        read_only_fields = ['store', 'user', 'started_at', 'completed_at', 'status', 'sync_cursor']
 
     def get_user_name(self, obj):
         return obj.user.username if obj.user else None
 
+class StocktakeSubSessionSerializer(serializers.ModelSerializer):
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    user_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StocktakeSubSession
+        fields = ['id', 'session', 'location', 'location_name', 'user', 'user_name', 'status', 'started_at', 'submitted_at', 'sync_cursor']
+        read_only_fields = fields
+
+    def get_user_name(self, obj):
+        return obj.user.username if obj.user else None
+
+class StocktakeReportLineSerializer(serializers.ModelSerializer):
+    item_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = StocktakeReportLine
+        fields = ['item_id', 'item_name', 'start_quantity', 'system_quantity', 'received_quantity', 'end_quantity', 'actual_usage', 'theoretical_usage', 'variance', 'unit']
+        read_only_fields = fields
+
 class ExpiredItemLogSerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source='item.name', read_only=True)
     user_name = serializers.SerializerMethodField()
@@ -301,3 +327,26 @@ class ExpiredItemLogSerializer(serializers.ModelSerializer):
     def get_user_name(self, obj):
         return obj.user.username if obj.user else None
 
+class DemandForecastSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    base_unit = serializers.CharField(source='item.base_unit', read_only=True)
+
+    class Meta:
+        model = DemandForecast
+        fields = ['id', 'store', 'item', 'item_name', 'base_unit', 'date', 'quantity', 'generated_at']
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'store', 'item', 'item_name', 'location', 'location_name', 'quantity', 'reason', 'reference', 'timestamp']
+
+class StockSnapshotSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+
+    class Meta:
+        model = StockSnapshot
+        fields = ['id', 'store', 'item', 'item_name', 'location', 'location_name', 'date', 'quantity']
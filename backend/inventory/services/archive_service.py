@@ -0,0 +1,172 @@
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from inventory.models import LogArchive, LogRollup, ProductionLog, ReceivingLog, Recipe, StocktakeSession, VarianceLog
+from inventory.services.dashboard_cache import DashboardCache
+
+
+class ArchiveService:
+    """
+    Retention for the append-only log tables. Rows older than a store's horizon are moved,
+    a chunk at a time, into compressed LogArchive rows, with monthly LogRollup totals kept
+    alongside, so hot-path queries only ever scan recent rows.
+    """
+    MODELS = {
+        LogArchive.PRODUCTION: ProductionLog,
+        LogArchive.RECEIVING: ReceivingLog,
+        LogArchive.VARIANCE: VarianceLog,
+    }
+
+    @staticmethod
+    def cutoff(store, now=None):
+        """
+        Rows with a timestamp before this are archived: the store's retention horizon, but
+        never later than its last completed stocktake, since usage since the previous count
+        is computed from the live rows. None (nothing archived) until the store has one.
+        """
+        now = now or timezone.now()
+        days = store.log_retention_days or getattr(settings, 'LOG_RETENTION_DAYS', 365)
+        cutoff = now - timedelta(days=days)
+        last_count = StocktakeSession.objects.filter(store=store, status='COMPLETED').aggregate(last=Max('completed_at'))['last']
+        return min(cutoff, last_count) if last_count else None
+
+    @staticmethod
+    def archive(store, kind, chunk_size=1000, dry_run=False, now=None):
+        """
+        Archives one kind of log for a store. Each chunk (oldest first) is compressed into a
+        LogArchive row, folded into the rollups and deleted in its own transaction, with one
+        dashboard invalidation per chunk rather than one per row.
+        Variance rows linked to a stocktake session stay live: the session report reads them.
+        Returns {'rows': archived rows, 'archives': archive rows written}.
+        """
+        model = ArchiveService.MODELS[kind]
+        cutoff = ArchiveService.cutoff(store, now)
+        stats = {'rows': 0, 'archives': 0}
+        if cutoff is None:
+            return stats
+
+        old_rows = model.objects.filter(store=store, timestamp__lt=cutoff)
+        if kind == LogArchive.VARIANCE:
+            old_rows = old_rows.filter(session__isnull=True)
+        if dry_run:
+            stats['rows'] = old_rows.count()
+            return stats
+
+        while True:
+            with transaction.atomic():
+                rows = list(old_rows.select_for_update().order_by('timestamp', 'id').values()[:chunk_size])
+                if not rows:
+                    break
+                LogArchive.objects.create(
+                    store=store,
+                    kind=kind,
+                    first_timestamp=rows[0]['timestamp'],
+                    last_timestamp=rows[-1]['timestamp'],
+                    row_count=len(rows),
+                    # isoformat keeps full timestamp precision
+                    payload=zlib.compress(json.dumps(rows, default=lambda value: value.isoformat()).encode())
+                )
+                ArchiveService.roll_up(store.id, kind, rows)
+                with DashboardCache.bulk_writes():
+                    model.objects.filter(id__in=[row['id'] for row in rows]).delete()
+                DashboardCache.invalidate(store.id)
+
+            stats['rows'] += len(rows)
+            stats['archives'] += 1
+        return stats
+
+    @staticmethod
+    def roll_up(store_id, kind, rows):
+        """
+        Adds archived rows into the monthly rollups (read-modify-write of the touched keys).
+        """
+        recipe_items = {}
+        if kind == LogArchive.PRODUCTION:
+            recipe_items = dict(Recipe.objects.filter(id__in={row['recipe_id'] for row in rows}).values_list('id', 'item_id'))
+
+        totals = {}
+        for row in rows:
+            if kind == LogArchive.PRODUCTION:
+                item_id, unit, quantity, value = recipe_items.get(row['recipe_id']), row['unit_type'], row['quantity_made'], 0.0
+            elif kind == LogArchive.RECEIVING:
+                item_id, unit, quantity = row['item_id'], '', row['quantity']
+                value = row['quantity'] * (row['unit_cost'] or 0.0)
+            else:
+                item_id, unit, quantity, value = row['item_id'], '', row['variance'], 0.0
+            if item_id is None:
+                continue # Production log whose recipe was deleted
+            month = timezone.localtime(row['timestamp']).date().replace(day=1)
+            entry = totals.setdefault((item_id, month, unit), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += quantity
+            entry[2] += value
+
+        existing = {
+            (rollup.item_id, rollup.month, rollup.unit): rollup
+            for rollup in LogRollup.objects.filter(
+                store_id=store_id, kind=kind, item_id__in={key[0] for key in totals}, month__in={key[1] for key in totals}
+            )
+        }
+        to_create, to_update = [], []
+        for key, (count, quantity, value) in totals.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                to_create.append(LogRollup(store_id=store_id, kind=kind, item_id=key[0], month=key[1], unit=key[2], rows=count, quantity=quantity, value=value))
+            else:
+                rollup.rows += count
+                rollup.quantity += quantity
+                rollup.value += value
+                to_update.append(rollup)
+        LogRollup.objects.bulk_create(to_create, batch_size=500)
+        LogRollup.objects.bulk_update(to_update, ['rows', 'quantity', 'value'], batch_size=500)
+
+    @staticmethod
+    def read(store_id, kind, start=None, end=None, item_id=None, limit=None):
+        """
+        Archived rows of one kind with start <= timestamp < end (either bound optional),
+        oldest first, as dicts shaped like the live table's values(). Only archives whose
+        time span overlaps the range are decompressed. `item_id` matches the row's item
+        (or, for production logs, its recipe's item).
+        Returns (rows, truncated).
+        """
+        archives = LogArchive.objects.filter(store_id=store_id, kind=kind)
+        if start:
+            archives = archives.filter(last_timestamp__gte=start)
+        if end:
+            archives = archives.filter(first_timestamp__lt=end)
+
+        def matches_item(row):
+            if kind == LogArchive.PRODUCTION:
+                return row['recipe_id'] in recipe_ids
+            return row['item_id'] == item_id
+
+        if item_id and kind == LogArchive.PRODUCTION:
+            recipe_ids = set(Recipe.objects.filter(item_id=item_id).values_list('id', flat=True))
+
+        rows = []
+        for payload in archives.order_by('first_timestamp', 'id').values_list('payload', flat=True).iterator():
+            for row in json.loads(zlib.decompress(bytes(payload))):
+                timestamp = datetime.fromisoformat(row['timestamp'])
+                if (start and timestamp < start) or (end and timestamp >= end):
+                    continue
+                if item_id and not matches_item(row):
+                    continue
+                row['timestamp'] = timestamp
+                rows.append(row)
+                if limit and len(rows) > limit:
+                    return rows[:limit], True
+        return rows, False
+
+    @staticmethod
+    def rollups(store_id, kind, start_month=None, end_month=None):
+        qs = LogRollup.objects.filter(store_id=store_id, kind=kind)
+        if start_month:
+            qs = qs.filter(month__gte=date(start_month.year, start_month.month, 1))
+        if end_month:
+            qs = qs.filter(month__lte=end_month)
+        return qs.select_related('item').order_by('month', 'item__name', 'unit')
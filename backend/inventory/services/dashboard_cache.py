@@ -0,0 +1,121 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+
+# Set inside DashboardCache.bulk_writes(); the per-row invalidate_dashboard receiver skips
+_bulk_log_writes = ContextVar('dashboard_bulk_log_writes', default=False)
+
+
+class DashboardCache:
+    """
+    Caches the dashboard stats payload per store and business date.
+
+    Each store has a version number that is bumped after any write affecting its
+    dashboard commits; cache keys embed the version, so stale payloads are never read
+    and simply age out. The global (all stores) payload has its own version, bumped
+    alongside every store's. Versions, payloads and hit/miss counts live in the shared
+    cache backend, so bumps from management commands and other workers are seen by all.
+    """
+    PREFIX = 'dashboard'
+    GLOBAL = 'all'
+
+    @staticmethod
+    def _timeout():
+        return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60 * 60)
+
+    @staticmethod
+    def _version_key(scope):
+        return f"{DashboardCache.PREFIX}:version:{scope}"
+
+    @staticmethod
+    def _version(scope):
+        return cache.get_or_set(DashboardCache._version_key(scope), 1, None)
+
+    @staticmethod
+    def _bump(scope):
+        key = DashboardCache._version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted or never read; any fresh value orphans the old payload keys
+            cache.set(key, int(timezone.now().timestamp() * 1000), None)
+
+    @staticmethod
+    def key(store_id):
+        scope = store_id or DashboardCache.GLOBAL
+        business_date = timezone.localdate().isoformat()
+        return f"{DashboardCache.PREFIX}:stats:{scope}:{business_date}:v{DashboardCache._version(scope)}"
+
+    @staticmethod
+    def get_or_build(store_id, build):
+        """
+        Returns (payload, hit). `build` is called on a miss and its result stored.
+        """
+        key = DashboardCache.key(store_id)
+        payload = cache.get(key)
+        if payload is not None:
+            DashboardCache._count('hits')
+            return payload, True
+
+        DashboardCache._count('misses')
+        payload = build()
+        cache.set(key, payload, DashboardCache._timeout())
+        return payload, False
+
+    @staticmethod
+    def invalidate(store_id=None):
+        """
+        Invalidates a store's payload (and the global one) once the current transaction
+        commits. With no store_id every store is invalidated.
+        """
+        def bump():
+            if store_id:
+                DashboardCache._bump(store_id)
+            else:
+                from users.models import Store
+                for scope in Store.objects.values_list('id', flat=True):
+                    DashboardCache._bump(scope)
+            DashboardCache._bump(DashboardCache.GLOBAL)
+
+        transaction.on_commit(bump)
+
+    @staticmethod
+    @contextmanager
+    def bulk_writes():
+        """
+        For set-based log writes that call invalidate() once for the whole set: the
+        per-row invalidation from the save/delete signals is skipped inside the block.
+        """
+        token = _bulk_log_writes.set(True)
+        try:
+            yield
+        finally:
+            _bulk_log_writes.reset(token)
+
+    @staticmethod
+    def in_bulk_write():
+        return _bulk_log_writes.get()
+
+    @staticmethod
+    def _count(name):
+        key = f"{DashboardCache.PREFIX}:{name}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    @staticmethod
+    def stats():
+        hits = cache.get(f"{DashboardCache.PREFIX}:hits", 0)
+        misses = cache.get(f"{DashboardCache.PREFIX}:misses", 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None
+        }
@@ -0,0 +1,151 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from inventory.models import DailyUsage, DemandForecast, StoreItemSettings
+
+
+class ForecastService:
+    """
+    Day-of-week aware exponential smoothing over DailyUsage, fitted for every
+    (store, item) pair at once with NumPy.
+
+    History is laid out as a pairs x days matrix (NaN where no DailyUsage row exists).
+    Per pair, weekday factors are the weekday mean over the overall mean; the level is an
+    exponentially weighted mean of the deseasonalized history. A day's forecast is
+    level x that weekday's factor.
+    """
+
+    @staticmethod
+    def fit(pair_index, day_index, quantities, days, first_weekday, horizon, alpha=0.3, min_days=7):
+        """
+        Pure NumPy part. `pair_index`/`day_index` place each quantity in the history matrix
+        (`days` columns, column 0 falling on `first_weekday`).
+        Returns (forecasts [pairs x horizon], residual std [pairs], usable mask [pairs]).
+        """
+        pairs = int(pair_index.max()) + 1 if len(pair_index) else 0
+        history = np.full((pairs, days), np.nan)
+        history[pair_index, day_index] = np.maximum(quantities, 0.0)
+        observed = ~np.isnan(history)
+
+        weekdays = (first_weekday + np.arange(days)) % 7
+        filled = np.where(observed, history, 0.0)
+
+        def mean(columns):
+            # Mean over observed days only; NaN where a pair has none
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return filled[:, columns].sum(axis=1) / observed[:, columns].sum(axis=1)
+
+        overall = mean(slice(None))
+        factors = np.ones((pairs, 7))
+        for weekday in range(7):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                factors[:, weekday] = mean(weekdays == weekday) / overall
+        # Weekdays never observed, or items that never sold, fall back to a flat profile
+        factors = np.where(np.isfinite(factors), factors, 1.0)
+
+        seasonal = factors[:, weekdays]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            deseasonalized = np.where(observed & (seasonal > 0), history / seasonal, np.nan)
+
+        weights = alpha * (1 - alpha) ** (days - 1 - np.arange(days))
+        used = ~np.isnan(deseasonalized)
+        weight_sums = (used * weights).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            level = np.where(used, deseasonalized, 0.0) @ weights / weight_sums
+        level = np.where(np.isfinite(level), level, 0.0)
+
+        residuals = np.where(observed, history - level[:, None] * seasonal, np.nan)
+        spread = np.zeros(pairs)
+        enough = observed.sum(axis=1) >= min_days
+        if enough.any():
+            spread[enough] = np.nanstd(residuals[enough], axis=1)
+
+        future_weekdays = (first_weekday + days + np.arange(horizon)) % 7
+        forecasts = level[:, None] * factors[:, future_weekdays]
+        return forecasts, spread, enough
+
+    @staticmethod
+    def run(store_id=None, as_of=None, history_days=56, horizon=7, coverage_days=2, alpha=0.3,
+            service_level_z=1.65, min_days=7, dry_run=False):
+        """
+        Forecasts the `horizon` days after `as_of` (default: today's business date) for
+        every store/item with at least `min_days` of usage in the last `history_days`.
+        Suggested par covers `coverage_days` of forecast demand plus safety stock.
+        Forecasts dated before the history window are pruned in the same run.
+        Returns a summary dict.
+        """
+        as_of = as_of or timezone.localdate()
+        start = as_of - timedelta(days=history_days - 1)
+
+        usage = DailyUsage.objects.filter(date__range=(start, as_of))
+        if store_id:
+            usage = usage.filter(store_id=store_id)
+        rows = usage.values_list('store_id', 'item_id', 'date', 'implied_consumption').order_by()
+
+        store_ids, item_ids, offsets, quantities = [], [], [], []
+        origin = start.toordinal()
+        for row_store_id, row_item_id, day, quantity in rows.iterator(chunk_size=5000):
+            store_ids.append(row_store_id)
+            item_ids.append(row_item_id)
+            offsets.append(day.toordinal() - origin)
+            quantities.append(quantity)
+
+        expired = DemandForecast.objects.filter(date__lt=start)
+        if store_id:
+            expired = expired.filter(store_id=store_id)
+
+        summary = {'pairs': 0, 'forecast_rows': 0, 'as_of': as_of}
+        if not store_ids:
+            if not dry_run:
+                expired.delete()
+            return summary
+
+        keys = np.stack([np.asarray(store_ids, dtype=np.int64), np.asarray(item_ids, dtype=np.int64)], axis=1)
+        pairs, pair_index = np.unique(keys, axis=0, return_inverse=True)
+        forecasts, spread, enough = ForecastService.fit(
+            pair_index.ravel(), np.asarray(offsets), np.asarray(quantities, dtype=float),
+            history_days, start.weekday(), horizon, alpha=alpha, min_days=min_days
+        )
+
+        covered = forecasts[:, :coverage_days].sum(axis=1)
+        # Rounded before ceil so float noise doesn't add a whole unit
+        suggested = np.ceil(np.round(covered + service_level_z * spread * math.sqrt(coverage_days), 6))
+
+        now = timezone.now()
+        forecast_rows = []
+        settings_rows = []
+        for index in np.flatnonzero(enough):
+            pair_store_id, pair_item_id = int(pairs[index][0]), int(pairs[index][1])
+            for step in range(horizon):
+                forecast_rows.append(DemandForecast(
+                    store_id=pair_store_id, item_id=pair_item_id, date=as_of + timedelta(days=step + 1),
+                    quantity=round(float(forecasts[index, step]), 4), generated_at=now
+                ))
+            settings_rows.append(StoreItemSettings(
+                store_id=pair_store_id, item_id=pair_item_id,
+                suggested_par=float(suggested[index]), suggested_par_updated_at=now
+            ))
+
+        summary.update(pairs=len(settings_rows), forecast_rows=len(forecast_rows))
+        if dry_run:
+            return summary
+
+        with transaction.atomic():
+            stale = DemandForecast.objects.filter(date__gt=as_of)
+            if store_id:
+                stale = stale.filter(store_id=store_id)
+            stale.delete()
+            expired.delete()
+            DemandForecast.objects.bulk_create(forecast_rows, batch_size=1000)
+            # Creates settings rows (par 0) where a store has none yet; never touches par itself
+            StoreItemSettings.objects.bulk_create(
+                settings_rows,
+                update_conflicts=True,
+                unique_fields=['store', 'item'],
+                update_fields=['suggested_par', 'suggested_par_updated_at', 'updated_at'],
+                batch_size=1000
+            )
+        return summary
@@ -1,10 +1,287 @@
 from django.db import transaction
-from django.db.models import F, Sum
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Lower, NullIf, TruncDate
 from django.utils import timezone
-from datetime import timedelta
-from inventory.models import Inventory, ProductionLog, Recipe, RecipeIngredient, VarianceLog, Item, UnitConversion, Location, ReceivingLog, StocktakeSession, StocktakeRecord
+from datetime import datetime, time, timedelta
+import base64
+from inventory.models import Inventory, ProductionLog, Recipe, RecipeIngredient, VarianceLog, Item, UnitConversion, Location, ReceivingLog, StocktakeSession, StocktakeRecord, StocktakeReportLine, StoreItemSettings, OnHand, LocationOnHand, ExpiredItemLog, StockMovement, Tombstone, ExpirationRecompute
 
 class InventoryService:
+    @staticmethod
+    def low_stock_settings(store_id=None):
+        """
+        StoreItemSettings rows whose on-hand total is below par, annotated with
+        `total_qty` and `deficit` and ordered by largest deficit first.
+        Totals are read from the materialized OnHand rows (one unique-key lookup per setting
+        inside the same query), so this is a single query for one store or for every store
+        at once (store_id=None).
+        """
+        totals = OnHand.objects.filter(
+            store_id=OuterRef('store_id'),
+            item_id=OuterRef('item_id')
+        ).values('quantity')[:1]
+
+        qs = StoreItemSettings.objects.filter(par__gt=0)
+        if store_id:
+            qs = qs.filter(store_id=store_id)
+
+        return qs.annotate(
+            total_qty=Coalesce(Subquery(totals), Value(0.0), output_field=FloatField())
+        ).filter(
+            total_qty__lt=F('par')
+        ).annotate(
+            deficit=F('par') - F('total_qty')
+        ).order_by('-deficit', 'item__name')
+
+    @staticmethod
+    def expiry_counts(inventory_qs, today):
+        """
+        Expiring-today, expired and total batch counts in one conditional-aggregation query.
+        Drained (zero quantity) batches don't count as expiring or expired.
+        """
+        return inventory_qs.aggregate(**InventoryService.expiry_count_expressions(today))
+
+    @staticmethod
+    def expiry_count_expressions(today):
+        """
+        The conditional Count expressions behind expiry_counts(), for use in annotate() too.
+        """
+        in_stock = Q(quantity__gt=0)
+        return {
+            'expiring_today_count': Count('id', filter=in_stock & InventoryService.expiring_on(today)),
+            'expired_count': Count('id', filter=in_stock & InventoryService.expired_before(today)),
+            'total_inventory_items': Count('id')
+        }
+
+    @staticmethod
+    def expired_before(day=None):
+        """
+        Batches that expired before business day `day` (default: today).
+        A plain range on the column (no __date cast) so the (store, expiration_date) index applies.
+        """
+        start, _ = InventoryService.business_day_bounds(day)
+        return Q(expiration_date__lt=start)
+
+    @staticmethod
+    def expiring_on(day=None):
+        """
+        Batches expiring during business day `day` (default: today), as a half-open range.
+        """
+        start, end = InventoryService.business_day_bounds(day)
+        return Q(expiration_date__gte=start, expiration_date__lt=end)
+
+    @staticmethod
+    def expiry_page(qs, limit, cursor=None):
+        """
+        Keyset page of batches ordered by (expiration_date, id), soonest first.
+        `cursor` is the opaque value returned as `next` by the previous page.
+        Returns (batches, next_cursor); next_cursor is None on the last page.
+        Raises ValueError for a malformed cursor.
+        """
+        qs = qs.filter(expiration_date__isnull=False)
+        if cursor:
+            try:
+                expiration, pk = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+                expiration, pk = datetime.fromisoformat(expiration), int(pk)
+            except (TypeError, ValueError, UnicodeDecodeError) as e:
+                raise ValueError("Invalid cursor") from e
+            qs = qs.filter(Q(expiration_date__gt=expiration) | Q(expiration_date=expiration, id__gt=pk))
+
+        batches = list(qs.order_by('expiration_date', 'id')[:limit + 1])
+        next_cursor = None
+        if len(batches) > limit:
+            batches = batches[:limit]
+            last = batches[-1]
+            next_cursor = base64.urlsafe_b64encode(f"{last.expiration_date.isoformat()}|{last.id}".encode()).decode()
+        return batches, next_cursor
+
+    @staticmethod
+    def start_of_business_day(day=None):
+        """
+        Aware datetime of local midnight (TIME_ZONE) starting `day` (default: today).
+        Batches expiring before it are expired.
+        """
+        day = day or timezone.localdate()
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    @staticmethod
+    def business_day_bounds(day=None):
+        """
+        [start, end) of business day `day` (default: today) as aware datetimes.
+        """
+        day = day or timezone.localdate()
+        return InventoryService.start_of_business_day(day), InventoryService.start_of_business_day(day + timedelta(days=1))
+
+    @staticmethod
+    def expiry_calendar(inventory_qs, start_day, days):
+        """
+        In-stock quantity expiring on each business day of [start_day, start_day + days),
+        per item, from one grouped query (batches bucketed by local expiration date).
+        Every day of the horizon is present, empty or not.
+        """
+        start, _ = InventoryService.business_day_bounds(start_day)
+        end, _ = InventoryService.business_day_bounds(start_day + timedelta(days=days))
+        rows = inventory_qs.filter(
+            quantity__gt=0, expiration_date__gte=start, expiration_date__lt=end
+        ).annotate(
+            day=TruncDate('expiration_date', tzinfo=timezone.get_current_timezone())
+        ).order_by().values(
+            'day', 'item_id', 'item__name', 'item__base_unit'
+        ).annotate(
+            quantity=Sum('quantity'), batches=Count('id')
+        ).order_by('day', 'item__name')
+
+        calendar = {
+            start_day + timedelta(days=offset): {'date': start_day + timedelta(days=offset), 'batches': 0, 'items': []}
+            for offset in range(days)
+        }
+        for row in rows:
+            bucket = calendar[row['day']]
+            bucket['batches'] += row['batches']
+            bucket['items'].append({
+                'item_id': row['item_id'],
+                'item_name': row['item__name'],
+                'base_unit': row['item__base_unit'],
+                'quantity': row['quantity'],
+                'batches': row['batches']
+            })
+        return list(calendar.values())
+
+    @staticmethod
+    def sweep_expired(store_id, before, chunk_size=1000, dry_run=False):
+        """
+        Disposes of a store's batches that expired before `before`: logs an ExpiredItemLog
+        per batch still holding stock and deletes the batches, one chunked transaction at a
+        time (keyset over id, so memory stays flat however many batches there are).
+        Returns stats for the store.
+        """
+        expired_qs = Inventory.objects.filter(store_id=store_id, expiration_date__lt=before)
+        if dry_run:
+            stats = expired_qs.aggregate(
+                batches=Count('id'),
+                logged=Count('id', filter=Q(quantity__gt=0)),
+                quantity=Sum('quantity', filter=Q(quantity__gt=0))
+            )
+            stats['quantity'] = stats['quantity'] or 0.0
+            return stats
+
+        stats = {'batches': 0, 'logged': 0, 'quantity': 0.0}
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    expired_qs.select_for_update().filter(id__gt=last_id).order_by('id').values_list('id', 'item_id', 'quantity')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                last_id = chunk[-1][0]
+
+                logs = InventoryService.dispose_batches(
+                    [(batch_id, store_id, item_id, quantity) for batch_id, item_id, quantity in chunk],
+                    notes='Expired sweep'
+                )
+
+            stats['batches'] += len(chunk)
+            stats['logged'] += len(logs)
+            stats['quantity'] += sum(log.quantity_expired for log in logs)
+        return stats
+
+    @staticmethod
+    def compact_batches(store_id, item_ids=None):
+        """
+        Keeps batch counts small: deletes drained (zero quantity) batches and folds in-stock
+        batches of the same item and location that expire on the same business day into one
+        (the oldest row survives, taking the earliest expiration and creation time, so FIFO
+        order and re-projected expirations stay conservative).
+        Quantities per item/location are unchanged, so on-hand totals need no refresh.
+        Scoped to `item_ids` when given (online use after a mutation), else the whole store.
+        Returns {'deleted': drained batches removed, 'merged': batches folded into another}.
+        """
+        batches = Inventory.objects.select_for_update().filter(store_id=store_id)
+        if item_ids is not None:
+            if not item_ids:
+                return {'deleted': 0, 'merged': 0}
+            batches = batches.filter(item_id__in=item_ids)
+
+        with transaction.atomic():
+            drained = []
+            groups = {}
+            rows = batches.order_by('id').values_list('id', 'item_id', 'location_id', 'quantity', 'expiration_date', 'created_at')
+            for batch_id, item_id, location_id, quantity, expiration_date, created_at in rows:
+                if quantity == 0:
+                    drained.append(batch_id)
+                elif quantity > 0 and expiration_date is not None:
+                    day = timezone.localtime(expiration_date).date()
+                    groups.setdefault((item_id, location_id, day), []).append((batch_id, quantity, expiration_date, created_at))
+
+            now = timezone.now()
+            survivors = []
+            folded = []
+            for group in groups.values():
+                if len(group) < 2:
+                    continue
+                survivors.append(Inventory(
+                    id=group[0][0],
+                    quantity=sum(quantity for _, quantity, _, _ in group),
+                    expiration_date=min(expiration for _, _, expiration, _ in group),
+                    created_at=min(created for _, _, _, created in group),
+                    updated_at=now
+                ))
+                folded.extend(batch_id for batch_id, _, _, _ in group[1:])
+
+            if survivors:
+                Inventory.objects.bulk_update(survivors, ['quantity', 'expiration_date', 'created_at', 'updated_at'], batch_size=500)
+            if drained or folded:
+                with Inventory.bulk_writes():
+                    Inventory.objects.filter(id__in=drained + folded).delete()
+                Tombstone.record(Inventory, [(batch_id, store_id) for batch_id in drained + folded])
+                from inventory.services.dashboard_cache import DashboardCache
+                DashboardCache.invalidate(store_id)
+
+        return {'deleted': len(drained), 'merged': len(folded)}
+
+    @staticmethod
+    def dispose_batches(batches, user=None, notes=''):
+        """
+        Set-based disposal. `batches` are (id, store_id, item_id, quantity) rows already
+        scoped and locked by the caller. Logs an ExpiredItemLog for each batch still holding
+        stock, deletes all of them and refreshes on-hand totals. Returns the logs.
+        """
+        logs = [
+            ExpiredItemLog(store_id=store_id, item_id=item_id, quantity_expired=quantity, user=user, notes=notes)
+            for _, store_id, item_id, quantity in batches if quantity > 0
+        ]
+        with transaction.atomic(), StockMovement.recording(StockMovement.DISPOSAL):
+            ExpiredItemLog.objects.bulk_create(logs, batch_size=500)
+            with Inventory.bulk_writes():
+                Inventory.objects.filter(id__in=[row[0] for row in batches]).delete()
+            Tombstone.record(Inventory, [(batch_id, store_id) for batch_id, store_id, _, _ in batches])
+            items_by_store = {}
+            for _, store_id, item_id, _ in batches:
+                items_by_store.setdefault(store_id, set()).add(item_id)
+            for store_id, item_ids in items_by_store.items():
+                OnHand.refresh(store_id, item_ids)
+        return logs
+
+    @staticmethod
+    def default_receiving_locations(store, item_ids):
+        """
+        Where received stock goes, per item id: the item's default location for the store,
+        else the store's first back-of-house location, else its first location (a "Back of
+        House" location is created for stores with none). Two queries for any number of items.
+        """
+        defaults = dict(
+            StoreItemSettings.objects.filter(store=store, item_id__in=item_ids, default_location__isnull=False)
+            .values_list('item_id', 'default_location')
+        )
+        fallback = None
+        if len(defaults) < len(set(item_ids)):
+            # Back-of-house locations sort first, then creation order
+            fallback = Location.objects.filter(store=store).order_by('is_sales_floor', 'id').first()
+            if not fallback:
+                fallback = Location.objects.create(store=store, name="Back of House")
+        return {item_id: defaults.get(item_id, fallback.id if fallback else None) for item_id in item_ids}
+
     @staticmethod
     def process_receiving_log(receiving_log: ReceivingLog):
         """
@@ -13,77 +290,100 @@ class InventoryService:
         """
         store = receiving_log.store
         item = receiving_log.item
-        quantity = receiving_log.quantity
-        
-        # Find default location
-        location = None
-        if hasattr(item, 'store_settings'):
-            settings = item.store_settings.filter(store=store).first()
-            if settings:
-                location = settings.default_location
-        
-        if not location:
-            location = Location.objects.filter(store=store, is_sales_floor=False).first()
-        
-        if not location:
-            location = Location.objects.filter(store=store).first()
-            
-        if not location:
-            location = Location.objects.create(store=store, name="Back of House")
+        location_id = InventoryService.default_receiving_locations(store, [item.id])[item.id]
 
-        # Create NEW Inventory Batch
-        # We try to match an existing batch with the SAME expiration date (to avoid fragmentation)
-        # OR create new if none exists.
-        
+        # Create a new batch; compaction folds it into an existing batch expiring the same
+        # business day, so repeated receipts don't fragment the table.
         expiration_date = None
         if item.shelf_life_days is not None:
              expiration_date = timezone.now() + timedelta(days=item.shelf_life_days)
 
-        # Look for existing batch with approximate expiration (same day)
-        # Since expiration_date is DateTime, we need to be careful.
-        # Ideally we'd strip time or use a small window, but for now exact match or new is safer for FIFO.
-        # To avoid infinite rows, let's try to match strict date if possible or just create new.
-        # Given the requirements, creating new is safest to guarantee we don't mix old/new.
-        # However, to prevent database explosion, maybe we check if there is a batch created "today"?
-        # For now, let's just Create New or Update EXACT Match.
-        
-        inventory = None
-        if expiration_date:
-            # Try to find one with very close expiration (e.g. created today/same expiry)
-            # This is tricky with exact timestamps.
-            # Simplified approach: Create new record.
-            pass
-        
-        # Actually, let's try to reuse if it has NO expiration date and we are adding one?
-        # No, "Receiving" implies new stock. New stock = New Expiration.
-        
-        inventory = Inventory.objects.create(
-            store=store,
-            item=item,
-            location=location,
-            quantity=quantity,
-            expiration_date=expiration_date
-        )
+        with transaction.atomic(), StockMovement.recording(StockMovement.RECEIVING, f"receiving:{receiving_log.id}"):
+            Inventory.objects.create(
+                store=store,
+                item=item,
+                location_id=location_id,
+                quantity=receiving_log.quantity,
+                expiration_date=expiration_date
+            )
+            InventoryService.compact_batches(store.id, [item.id])
+
+    @staticmethod
+    def receive_delivery(store, lines, user=None):
+        """
+        Receives a whole delivery at once. `lines` are (item, quantity, unit_cost) with Item
+        instances. Logs and batches are bulk inserted in one transaction, then on-hand,
+        ledger and compaction run once for all the delivered items.
+        Returns the ReceivingLog rows.
+        """
+        item_ids = [item.id for item, _, _ in lines]
+        locations = InventoryService.default_receiving_locations(store, item_ids)
+        now = timezone.now()
+
+        logs = [ReceivingLog(store=store, item=item, quantity=quantity, unit_cost=unit_cost, user=user) for item, quantity, unit_cost in lines]
+        batches = [
+            Inventory(
+                store=store, item=item, location_id=locations[item.id], quantity=quantity,
+                expiration_date=now + timedelta(days=item.shelf_life_days) if item.shelf_life_days is not None else None
+            )
+            for item, quantity, _ in lines
+        ]
+        with transaction.atomic():
+            ReceivingLog.objects.bulk_create(logs, batch_size=500)
+            reference = f"receiving:{logs[0].id}-{logs[-1].id}" if len(logs) > 1 else f"receiving:{logs[0].id}"
+            with StockMovement.recording(StockMovement.RECEIVING, reference):
+                Inventory.objects.bulk_create(batches, batch_size=500)
+                OnHand.refresh(store.id, set(item_ids))
+                InventoryService.compact_batches(store.id, set(item_ids))
+            # bulk_create skips the ReceivingLog signal
+            from inventory.services.dashboard_cache import DashboardCache
+            DashboardCache.invalidate(store.id)
+        return logs
 
     @staticmethod
-    def finalize_stocktake_session(session: StocktakeSession):
+    def finalize_stocktake_session(session: StocktakeSession, user=None):
         """
         Finalizes a stocktake session.
         Calculates variances and updates inventory.
+        Every figure is computed with grouped queries over all counted items at once, and the
+        report plus per-location VarianceLog rows are bulk-written against the session so past
+        counts can be read back later without recomputing.
         Returns a report of usage and variance.
         """
         if session.status == 'COMPLETED':
              return None # Already processed
 
         store = session.store
-        records = session.records.all()
-        
+        user = user or session.user
         report_data = []
-        
-        with transaction.atomic():
-            # Get all items counted
-            counted_items = set(records.values_list('item_id', flat=True))
-            
+
+        with transaction.atomic(), StockMovement.recording(StockMovement.STOCKTAKE, f"stocktake:{session.id}"):
+            # Session-level saves hold this lock while writing and re-check the status under it
+            if StocktakeSession.objects.select_for_update().values_list('status', flat=True).get(pk=session.pk) == 'COMPLETED':
+                return None
+
+            # Fold per-location sub-session counts into the session first
+            from inventory.services.stocktake_service import StocktakeService
+            StocktakeService.merge_sub_sessions(session)
+
+            # Counted quantity per (item, location) and per item
+            counted = {}
+            counted_by_item = {}
+            for row in session.records.values('item_id', 'location_id').annotate(total=Sum('quantity_counted')):
+                counted[(row['item_id'], row['location_id'])] = row['total'] or 0.0
+                counted_by_item[row['item_id']] = counted_by_item.get(row['item_id'], 0.0) + (row['total'] or 0.0)
+
+            item_ids = set(counted_by_item)
+            items = Item.objects.in_bulk(item_ids)
+
+            # Current System Quantity (Expected), per item and per location
+            system_by_key = {}
+            system_by_item = {}
+            system_rows = LocationOnHand.objects.filter(store=store, item_id__in=item_ids).values_list('item_id', 'location_id', 'quantity')
+            for item_id, location_id, quantity in system_rows:
+                system_by_key[(item_id, location_id)] = quantity
+                system_by_item[item_id] = system_by_item.get(item_id, 0.0) + quantity
+
             # Find previous session for usage calc
             last_session = StocktakeSession.objects.filter(
                 store=store, 
@@ -92,67 +392,50 @@ class InventoryService:
             ).order_by('-completed_at').first()
             
             start_date = last_session.completed_at if last_session else None
-            
-            for item_id in counted_items:
-                item = Item.objects.get(id=item_id)
-                
-                # Get total counted for this item (could be across multiple locations)
-                item_records = records.filter(item_id=item_id)
-                
-                total_counted = item_records.aggregate(Sum('quantity_counted'))['quantity_counted__sum'] or 0.0
-                
-                # Current System Quantity (Expected)
-                current_inventory = Inventory.objects.filter(store=store, item_id=item_id).aggregate(Sum('quantity'))['quantity__sum'] or 0.0
-                
-                variance = total_counted - current_inventory
-                
-                # Usage Calculation
-                start_qty = 0.0
-                if last_session:
-                    last_records = StocktakeRecord.objects.filter(session=last_session, item_id=item_id)
-                    start_qty = last_records.aggregate(Sum('quantity_counted'))['quantity_counted__sum'] or 0.0
-                
-                received_qty = 0.0
-                # Received Logic
-                recv_query = ReceivingLog.objects.filter(store=store, item_id=item_id, timestamp__lte=session.started_at)
-                if start_date:
-                    recv_query = recv_query.filter(timestamp__gte=start_date)
-                
-                received_qty = recv_query.aggregate(Sum('quantity'))['quantity__sum'] or 0.0
-                    
-                actual_usage = start_qty + received_qty - total_counted
-                
-                # Theoretical Usage (from Prep Logs)
-                theoretical_usage = 0.0
-                
-                # Find recipes that use this item as ingredient
-                usage_recipes = RecipeIngredient.objects.filter(ingredient_item=item).select_related('recipe')
-                
-                # We need ProductionLogs in the period
-                logs_query = ProductionLog.objects.filter(store=store, timestamp__lte=session.started_at)
-                if start_date:
-                    logs_query = logs_query.filter(timestamp__gte=start_date)
-                
-                for ri in usage_recipes:
-                    recipe = ri.recipe
-                    # Find logs for this recipe
-                    recipe_logs = logs_query.filter(recipe=recipe)
-                    
-                    for log in recipe_logs:
-                         # Calculate batches
-                         batches = 0.0
-                         recipe_yield_unit_name = recipe.yield_unit.unit_name if recipe.yield_unit else recipe.item.base_unit
-                         if log.unit_type.lower() in ['batch', 'batches']:
-                             batches = log.quantity_made
-                         elif log.unit_type == recipe_yield_unit_name:
-                             batches = log.quantity_made / recipe.yield_quantity
-                         else:
-                             # Try conversion
-                             # Simplification for report: 
-                             batches = log.quantity_made / recipe.yield_quantity 
-                         
-                         theoretical_usage += batches * ri.quantity_required
-                
+
+            start_by_item = {}
+            if last_session:
+                last_records = StocktakeRecord.objects.filter(session=last_session, item_id__in=item_ids)
+                start_by_item = {
+                    row['item_id']: row['total'] or 0.0
+                    for row in last_records.values('item_id').annotate(total=Sum('quantity_counted'))
+                }
+
+            # Received Logic
+            recv_query = ReceivingLog.objects.filter(store=store, item_id__in=item_ids, timestamp__lte=session.started_at)
+            if start_date:
+                recv_query = recv_query.filter(timestamp__gte=start_date)
+            received_by_item = {
+                row['item_id']: row['total'] or 0.0
+                for row in recv_query.values('item_id').annotate(total=Sum('quantity'))
+            }
+
+            # Theoretical Usage (from Prep Logs): batches made * quantity required, per ingredient.
+            # Logs in 'batch' units count batches directly; anything else is scaled by the recipe yield.
+            usage_query = RecipeIngredient.objects.filter(
+                ingredient_item_id__in=item_ids,
+                recipe__productionlog__store=store,
+                recipe__productionlog__timestamp__lte=session.started_at,
+                **({'recipe__productionlog__timestamp__gte': start_date} if start_date else {})
+            ).annotate(
+                log_unit=Lower('recipe__productionlog__unit_type')
+            ).values('ingredient_item_id').annotate(
+                total=Sum(
+                    Case(
+                        When(log_unit__in=['batch', 'batches'], then=F('recipe__productionlog__quantity_made')),
+                        default=F('recipe__productionlog__quantity_made') / NullIf(F('recipe__yield_quantity'), 0.0),
+                        output_field=FloatField()
+                    ) * F('quantity_required')
+                )
+            )
+            theoretical_by_item = {row['ingredient_item_id']: row['total'] or 0.0 for row in usage_query}
+
+            variance_logs = []
+            for item_id in sorted(item_ids):
+                item = items[item_id]
+                total_counted = counted_by_item[item_id]
+                current_inventory = system_by_item.get(item_id, 0.0)
+
                 # Report Data Construction
                 if session.type == 'ADDITION':
                     # For addition, we just show what was added
@@ -169,6 +452,9 @@ class InventoryService:
                         'unit': item.base_unit
                     })
                 else:
+                    start_qty = start_by_item.get(item_id, 0.0)
+                    received_qty = received_by_item.get(item_id, 0.0)
+
                     # FULL stocktake: include system quantity (expected before reconciliation)
                     report_data.append({
                         'item_id': item_id,
@@ -177,94 +463,50 @@ class InventoryService:
                         'system_quantity': current_inventory,
                         'received_quantity': received_qty,
                         'end_quantity': total_counted,
-                        'actual_usage': actual_usage,
-                        'theoretical_usage': theoretical_usage,
-                        'variance': variance,
+                        'actual_usage': start_qty + received_qty - total_counted,
+                        'theoretical_usage': theoretical_by_item.get(item_id, 0.0),
+                        'variance': total_counted - current_inventory,
                         'unit': item.base_unit
                     })
 
-                # Update Inventory to match Count (or Add)
-                
-                # Update Inventory to match Count (or Add)
-                
-                for record in item_records:
-                    if session.type == 'ADDITION':
-                        # For Addition, we just add a NEW batch with "fresh" expiration (or none)
-                        # We don't mess with existing batches
-                        expiration_date = None
-                        if item.shelf_life_days is not None:
-                             expiration_date = timezone.now() + timedelta(days=item.shelf_life_days)
-                        
-                        Inventory.objects.create(
+            if session.type == 'ADDITION':
+                # For Addition, we just add NEW batches with "fresh" expiration (or none)
+                # We don't mess with existing batches
+                Inventory.objects.bulk_create([
+                    Inventory(
+                        store=store,
+                        item_id=item_id,
+                        location_id=location_id,
+                        quantity=quantity,
+                        expiration_date=InventoryService.fresh_expiration(items[item_id])
+                    )
+                    for (item_id, location_id), quantity in counted.items()
+                ], batch_size=500)
+                OnHand.refresh(store.id, item_ids)
+                InventoryService.compact_batches(store.id, item_ids)
+            else:
+                # FULL Stocktake: FIFO Reconciliation per location, newest batches kept
+                InventoryService.reconcile_batches(store, counted, items)
+
+                for (item_id, location_id), quantity in counted.items():
+                    expected_quantity = system_by_key.get((item_id, location_id), 0.0)
+                    if quantity != expected_quantity:
+                        variance_logs.append(VarianceLog(
                             store=store,
+                            user=user,
+                            session=session,
                             item_id=item_id,
-                            location=record.location,
-                            quantity=record.quantity_counted,
-                            expiration_date=expiration_date
-                        )
-                    else:
-                        # FULL Stocktake: FIFO Reconciliation
-                        # We have total_counted. We want to keep batches that sum up to this, newest first.
-                        
-                        target_quantity = record.quantity_counted
-                        
-                        # Fetch existing batches sorted NEWEST to OLDEST (descending expiration)
-                        # Null expiration dates: Assume they are oldest? Or newest?
-                        # Usually non-perishables (null exp) don't matter, but if mixed:
-                        # Let's assume Null expiration is "Infinite Shelf Life" -> Keep them?
-                        # Or assume user wants to keep the valid dated ones?
-                        # Let's sort by expiration_date DESC (Newest first). Nulls last?
-                        # F(expiration_date).desc(nulls_last=True)
-                        
-                        # Fetch existing batches sorted NEWEST to OLDEST (descending expiration)
-                        # We want to keep:
-                        # 1. Items with NO expiration (Infinite shelf life) -> nulls_first=True
-                        # 2. Items with Future expiration (Newest)
-                        # 3. Items with Past expiration (Oldest)
-                        
-                        batches = Inventory.objects.filter(
-                            store=store, 
-                            item_id=item_id, 
-                            location=record.location
-                        ).order_by(F('expiration_date').desc(nulls_first=True))
-
-                        batches = list(batches)
-                        # Wait, standard SQL: NULL < Values.
-                        # DESC: Values (Future) -> Values (Past) -> NULL.
-                        # Actually we want to keep FUTURE expiration dates.
-                        
-                        remaining_needed = target_quantity
-                        
-                        for batch in batches:
-                            if remaining_needed <= 0:
-                                # We have filled our count, this batch is extra (old/phantom), delete it
-                                batch.delete()
-                            else:
-                                if batch.quantity <= remaining_needed:
-                                    # Keep this whole batch
-                                    remaining_needed -= batch.quantity
-                                    # Batch stays as is (quantity matches)
-                                else:
-                                    # This batch is partially needed
-                                    batch.quantity = remaining_needed
-                                    batch.save()
-                                    remaining_needed = 0
-                        
-                        if remaining_needed > 0:
-                            # We still need more items than we had on shelf.
-                            # Create a NEW batch for the surplus.
-                            # Expiration? New/Fresh.
-                            expiration_date = None
-                            if item.shelf_life_days is not None:
-                                 expiration_date = timezone.now() + timedelta(days=item.shelf_life_days)
-                            
-                            Inventory.objects.create(
-                                store=store,
-                                item_id=item_id,
-                                location=record.location,
-                                quantity=remaining_needed,
-                                expiration_date=expiration_date
-                            )
+                            location_id=location_id,
+                            expected_quantity=expected_quantity,
+                            actual_quantity=quantity,
+                            variance=quantity - expected_quantity
+                        ))
+                VarianceLog.objects.bulk_create(variance_logs, batch_size=500)
+
+            StocktakeReportLine.objects.bulk_create(
+                [StocktakeReportLine(session=session, **line) for line in report_data],
+                batch_size=500
+            )
 
             session.status = 'COMPLETED'
             session.completed_at = timezone.now()
@@ -273,88 +515,274 @@ class InventoryService:
         return report_data
 
     @staticmethod
-    def process_stocktake(store, user, stock_data):
-        # Legacy single-shot stocktake
-        processed_logs = []
-        with transaction.atomic():
-            for entry in stock_data:
-                item_id = entry.get('item_id')
-                location_id = entry.get('location_id')
-                
-                if not item_id or not location_id:
+    def fresh_expiration(item):
+        """
+        Expiration for a batch created right now, or None if the item doesn't expire.
+        """
+        if item.shelf_life_days is None:
+            return None
+        return timezone.now() + timedelta(days=item.shelf_life_days)
+
+    @staticmethod
+    def recompute_expirations(item_id, shelf_life_days):
+        """
+        Re-projects every batch of an item to created_at + shelf life in a single UPDATE.
+        F() + timedelta compiles per backend (native interval arithmetic on Postgres,
+        Django's dtdelta function on SQLite). Returns the number of batches updated.
+        """
+        updated = Inventory.objects.filter(item_id=item_id).update(
+            expiration_date=F('created_at') + timedelta(days=shelf_life_days),
+            updated_at=timezone.now()
+        )
+        if updated:
+            from inventory.services.dashboard_cache import DashboardCache
+            DashboardCache.invalidate()
+        return updated
+
+    @staticmethod
+    def schedule_expiration_recompute(item):
+        """
+        Re-projects the item's batch expirations from its shelf_life_days. Items with more
+        batches than EXPIRATION_RECOMPUTE_INLINE_LIMIT are queued as an ExpirationRecompute row
+        in the same transaction instead, so the request doesn't wait on the UPDATE; a background
+        thread picks the job up after commit and `manage.py recompute_expirations` retries
+        anything it didn't finish. Returns True if the work was deferred.
+        """
+        if item.shelf_life_days is None:
+            return False
+
+        from django.conf import settings
+        limit = getattr(settings, 'EXPIRATION_RECOMPUTE_INLINE_LIMIT', 5000)
+        item_id, shelf_life_days = item.id, item.shelf_life_days
+
+        if limit is None or not Inventory.objects.filter(item_id=item_id)[limit:limit + 1].exists():
+            InventoryService.recompute_expirations(item_id, shelf_life_days)
+            return False
+
+        ExpirationRecompute.objects.update_or_create(
+            item_id=item_id, defaults={'requested_at': timezone.now(), 'attempts': 0, 'last_error': ''}
+        )
+
+        import threading
+        from django.db import connection
+
+        def run():
+            try:
+                InventoryService.run_expiration_recomputes([item_id])
+            finally:
+                connection.close()
+
+        transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
+        return True
+
+    @staticmethod
+    def run_expiration_recomputes(item_ids=None):
+        """
+        Works through queued ExpirationRecompute jobs (all, or those for item_ids). Each job
+        re-reads the item's current shelf_life_days, so an older edit can't win a race with a
+        newer one, and is only removed if no newer request arrived while it ran. Failures are
+        kept on the row (attempts, last_error) for the next run.
+        Returns {'done': n, 'failed': n}.
+        """
+        jobs = ExpirationRecompute.objects.order_by('requested_at')
+        if item_ids is not None:
+            jobs = jobs.filter(item_id__in=item_ids)
+
+        stats = {'done': 0, 'failed': 0}
+        for job in jobs:
+            try:
+                shelf_life_days = Item.objects.filter(id=job.item_id).values_list('shelf_life_days', flat=True).first()
+                if shelf_life_days is not None:
+                    InventoryService.recompute_expirations(job.item_id, shelf_life_days)
+            except Exception as exc:
+                ExpirationRecompute.objects.filter(id=job.id).update(attempts=F('attempts') + 1, last_error=str(exc))
+                stats['failed'] += 1
+                continue
+            ExpirationRecompute.objects.filter(id=job.id, requested_at=job.requested_at).delete()
+            stats['done'] += 1
+        return stats
+
+    @staticmethod
+    def conversion_factors(item_ids):
+        """
+        Loads every UnitConversion for the given items in one query.
+        Returns {(item_id, unit_name): factor}; the lowest id wins on duplicate unit names.
+        """
+        factors = {}
+        conversions = UnitConversion.objects.filter(item_id__in=item_ids).order_by('id')
+        for item_id, unit_name, factor in conversions.values_list('item_id', 'unit_name', 'factor'):
+            factors.setdefault((item_id, unit_name), factor)
+        return factors
+
+    @staticmethod
+    def to_base_quantity(item, quantity, unit_name, factors):
+        """
+        Converts a counted quantity to base units using a map from conversion_factors().
+        Unknown units are treated as base units.
+        """
+        if unit_name and unit_name != item.base_unit:
+            factor = factors.get((item.id, unit_name))
+            if factor:
+                return quantity * factor
+        return quantity
+
+    @staticmethod
+    def reconcile_batches(store, targets, items, fill_missing_expiration=False):
+        """
+        Brings the batches at each (item_id, location_id) in `targets` to the target quantity.
+
+        Batches are kept newest first (no expiration, then latest expiration); older batches
+        are trimmed or deleted, and any surplus becomes one fresh batch. Everything is read in
+        one query and written with bulk operations, so cost doesn't grow per counted line.
+        `items` maps item_id -> Item for every item referenced in `targets`.
+        """
+        if not targets:
+            return
+
+        item_ids = {item_id for item_id, _ in targets}
+        location_ids = {location_id for _, location_id in targets}
+
+        batches_by_key = {}
+        existing = Inventory.objects.filter(
+            store=store,
+            item_id__in=item_ids,
+            location_id__in=location_ids
+        ).order_by('item_id', 'location_id', F('expiration_date').desc(nulls_first=True), 'id')
+        for batch in existing:
+            key = (batch.item_id, batch.location_id)
+            if key in targets:
+                batches_by_key.setdefault(key, []).append(batch)
+
+        to_update = []
+        to_delete = []
+        to_create = []
+
+        for key, target_quantity in targets.items():
+            item = items[key[0]]
+            remaining_needed = target_quantity
+
+            for batch in batches_by_key.get(key, []):
+                if remaining_needed <= 0:
+                    # Count already satisfied; this batch is old/phantom stock
+                    to_delete.append(batch.id)
                     continue
 
-                try:
-                    raw_quantity = float(entry.get('actual_quantity', 0))
-                except (ValueError, TypeError):
-                    raw_quantity = 0.0
+                changed = False
+                if batch.quantity <= remaining_needed:
+                    remaining_needed -= batch.quantity
+                else:
+                    batch.quantity = remaining_needed
+                    remaining_needed = 0
+                    changed = True
 
-                unit_name = entry.get('unit_name')
-                actual_quantity_base = raw_quantity
-                
-                if unit_name:
-                    try:
-                        item = Item.objects.get(id=item_id)
-                        if unit_name != item.base_unit:
-                            conversion = UnitConversion.objects.filter(item_id=item_id, unit_name=unit_name).first()
-                            if conversion:
-                                actual_quantity_base = raw_quantity * conversion.factor
-                    except Item.DoesNotExist:
-                        continue
-
-                try:
-                    inventory = Inventory.objects.get(
-                        store=store,
-                        item_id=item_id,
-                        location_id=location_id
-                    )
-                    expected_quantity = inventory.quantity
-                    
-                    # Auto-set expiration if missing and item has shelf life
-                    if inventory.expiration_date is None:
-                         # Ensure we have the item
-                         try:
-                             item_obj = Item.objects.get(id=item_id)
-                             if item_obj.shelf_life_days is not None:
-                                 inventory.expiration_date = timezone.now() + timedelta(days=item_obj.shelf_life_days)
-                         except Item.DoesNotExist:
-                             pass
-
-                except Inventory.DoesNotExist:
-                    expected_quantity = 0.0
-                    try:
-                        expiration_date = None
-                        item = Item.objects.get(id=item_id)
-                        if item.shelf_life_days is not None:
-                            expiration_date = timezone.now() + timedelta(days=item.shelf_life_days)
-
-                        inventory = Inventory.objects.create(
-                            store=store,
-                            item_id=item_id,
-                            location_id=location_id,
-                            quantity=actual_quantity_base,
-                            expiration_date=expiration_date
-                        )
-                    except Exception:
-                        continue
+                if fill_missing_expiration and batch.expiration_date is None and item.shelf_life_days is not None:
+                    batch.expiration_date = InventoryService.fresh_expiration(item)
+                    changed = True
+
+                if changed:
+                    to_update.append(batch)
+
+            if remaining_needed > 0:
+                to_create.append(Inventory(
+                    store=store,
+                    item_id=key[0],
+                    location_id=key[1],
+                    quantity=remaining_needed,
+                    expiration_date=InventoryService.fresh_expiration(item)
+                ))
+
+        if to_delete:
+            with Inventory.bulk_writes():
+                Inventory.objects.filter(id__in=to_delete).delete()
+            Tombstone.record(Inventory, [(batch_id, store.id) for batch_id in to_delete])
+        if to_update:
+            now = timezone.now()
+            for batch in to_update:
+                batch.updated_at = now
+            Inventory.objects.bulk_update(to_update, ['quantity', 'expiration_date', 'updated_at'], batch_size=500)
+        if to_create:
+            Inventory.objects.bulk_create(to_create, batch_size=500)
+
+        OnHand.refresh(store.id, item_ids)
+        InventoryService.compact_batches(store.id, item_ids)
+
+    @staticmethod
+    def process_stocktake(store, user, stock_data):
+        """
+        Legacy single-shot stocktake.
+        Reconciles each counted (item, location) against the sum of its batches and logs variances.
+        Items, conversions, locations and current totals are loaded up front, so the number of
+        queries is fixed regardless of how many lines are submitted.
+        Returns the created VarianceLog rows.
+        """
+        # Parse entries; a later line for the same item/location replaces an earlier one
+        parsed = {}
+        for entry in stock_data:
+            item_id = entry.get('item_id')
+            location_id = entry.get('location_id')
+
+            if not item_id or not location_id:
+                continue
+
+            try:
+                key = (int(item_id), int(location_id))
+            except (ValueError, TypeError):
+                continue
 
+            try:
+                raw_quantity = float(entry.get('actual_quantity', 0))
+            except (ValueError, TypeError):
+                raw_quantity = 0.0
+
+            parsed.pop(key, None)
+            parsed[key] = (raw_quantity, entry.get('unit_name'))
+
+        if not parsed:
+            return []
+
+        item_ids = {item_id for item_id, _ in parsed}
+        location_ids = {location_id for _, location_id in parsed}
+
+        items = Item.objects.in_bulk(item_ids)
+        locations = Location.objects.filter(store=store).in_bulk(location_ids)
+        factors = InventoryService.conversion_factors(item_ids)
+
+        targets = {}
+        for key, (raw_quantity, unit_name) in parsed.items():
+            item = items.get(key[0])
+            if item is None or key[1] not in locations:
+                continue
+            targets[key] = InventoryService.to_base_quantity(item, raw_quantity, unit_name, factors)
+
+        variance_logs = []
+        with transaction.atomic(), StockMovement.recording(StockMovement.STOCKTAKE):
+            totals = LocationOnHand.objects.filter(
+                store=store,
+                item_id__in=item_ids,
+                location_id__in=location_ids
+            ).values_list('item_id', 'location_id', 'quantity')
+            expected = {(item_id, location_id): quantity for item_id, location_id, quantity in totals}
+
+            InventoryService.reconcile_batches(store, targets, items, fill_missing_expiration=True)
+
+            for key, actual_quantity_base in targets.items():
+                expected_quantity = expected.get(key, 0.0)
                 variance = actual_quantity_base - expected_quantity
-                
-                inventory.quantity = actual_quantity_base
-                inventory.save()
-                
                 if variance != 0:
-                    VarianceLog.objects.create(
+                    variance_logs.append(VarianceLog(
                         store=store,
                         user=user,
-                        item_id=item_id,
-                        location_id=location_id,
+                        item=items[key[0]],
+                        location=locations[key[1]],
                         expected_quantity=expected_quantity,
                         actual_quantity=actual_quantity_base,
                         variance=variance
-                    )
-                    
-        return processed_logs
+                    ))
+
+            if variance_logs:
+                variance_logs = VarianceLog.objects.bulk_create(variance_logs, batch_size=500)
+
+        return variance_logs
 
     @staticmethod
     def process_production_log(production_log: ProductionLog, force=False):
@@ -393,17 +821,20 @@ class InventoryService:
              except Exception:
                  batches = quantity_made / recipe.yield_quantity
 
-        # Check availability first
+        ingredients = list(recipe.ingredients.select_related('ingredient_item'))
+        ingredient_item_ids = {ingredient.ingredient_item_id for ingredient in ingredients}
+
+        # Check availability first (materialized on-hand, one lookup for all ingredients)
         missing_ingredients = []
         if not force:
-            for ingredient in recipe.ingredients.all():
+            available = dict(
+                OnHand.objects.filter(store=store, item_id__in=ingredient_item_ids).values_list('item_id', 'quantity')
+            )
+            for ingredient in ingredients:
                 total_ingredient_needed = ingredient.quantity_required * batches
                 ingredient_item = ingredient.ingredient_item
                 
-                total_available = Inventory.objects.filter(
-                    store=store, 
-                    item=ingredient_item
-                ).aggregate(Sum('quantity'))['quantity__sum'] or 0.0
+                total_available = available.get(ingredient_item.id, 0.0)
                 
                 if total_available < total_ingredient_needed:
                     # Calculate display units
@@ -423,36 +854,44 @@ class InventoryService:
             if missing_ingredients:
                 return {'missing_ingredients': missing_ingredients}
 
-        with transaction.atomic():
-            for ingredient in recipe.ingredients.all():
-                total_ingredient_needed = ingredient.quantity_required * batches
-                ingredient_item = ingredient.ingredient_item
-                
-                inventory_records = Inventory.objects.filter(
-                    store=store, 
-                    item=ingredient_item
-                ).order_by('expiration_date', 'id')
-                
-                remaining_to_deduct = total_ingredient_needed
+        with transaction.atomic(), StockMovement.recording(StockMovement.PRODUCTION, f"production:{production_log.id}"):
+            # Deduct FIFO (earliest expiration first) across all ingredient batches loaded at once
+            batches_by_item = {}
+            inventory_records = Inventory.objects.select_for_update().filter(
+                store=store, 
+                item_id__in=ingredient_item_ids
+            ).order_by('expiration_date', 'id')
+            for inv in inventory_records:
+                batches_by_item.setdefault(inv.item_id, []).append(inv)
+
+            deducted_batches = {}
+            for ingredient in ingredients:
+                remaining_to_deduct = ingredient.quantity_required * batches
                 
-                for inv in inventory_records:
+                for inv in batches_by_item.get(ingredient.ingredient_item_id, []):
                     if remaining_to_deduct <= 0:
                         break
                     
                     if inv.quantity >= remaining_to_deduct:
-                        inv.quantity = F('quantity') - remaining_to_deduct
-                        inv.save()
+                        inv.quantity -= remaining_to_deduct
                         remaining_to_deduct = 0
                     else:
                         deducted = inv.quantity
                         inv.quantity = 0
-                        inv.save()
                         remaining_to_deduct -= deducted
+                    deducted_batches[inv.id] = inv
                 
                 if remaining_to_deduct > 0:
                     # Force logic handled here if needed (e.g. tracking negative usage)
                     pass
 
+            if deducted_batches:
+                now = timezone.now()
+                for inv in deducted_batches.values():
+                    inv.updated_at = now
+                Inventory.objects.bulk_update(list(deducted_batches.values()), ['quantity', 'updated_at'], batch_size=500)
+                OnHand.refresh(store.id, ingredient_item_ids)
+
             if production_log.target_location:
                  produced_item = recipe.item
                  quantity_to_add_base = 0.0
@@ -474,5 +913,9 @@ class InventoryService:
                      quantity=quantity_to_add_base,
                      expiration_date=expiration_date
                  )
+                 ingredient_item_ids = ingredient_item_ids | {produced_item.id}
+
+            # Drop drained ingredient batches; same-day output folds into one batch
+            InventoryService.compact_batches(store.id, ingredient_item_ids)
         
         return None
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from inventory.models import StockCheckpoint, StockMovement, StockSnapshot
+
+
+class LedgerService:
+    """
+    Point-in-time stock from the StockMovement ledger: the latest StockCheckpoint at or
+    before the moment, plus the movements between the two.
+    """
+
+    @staticmethod
+    def latest_checkpoint(store_id, at):
+        return StockCheckpoint.objects.filter(store_id=store_id, taken_at__lte=at).aggregate(latest=Max('taken_at'))['latest']
+
+    @staticmethod
+    def stock_at(store_id, at, item_ids=None, location_id=None):
+        """
+        On-hand per (item_id, location_id) at `at` (inclusive). Three queries regardless of
+        history length: checkpoint lookup, checkpoint rows, ledger range sum.
+        Keys that net to zero are left out.
+        """
+        checkpoint_at = LedgerService.latest_checkpoint(store_id, at)
+
+        def scoped(qs):
+            if item_ids is not None:
+                qs = qs.filter(item_id__in=item_ids)
+            if location_id:
+                qs = qs.filter(location_id=location_id)
+            return qs
+
+        positions = {}
+        if checkpoint_at:
+            rows = scoped(StockCheckpoint.objects.filter(store_id=store_id, taken_at=checkpoint_at))
+            for item_id, row_location_id, quantity in rows.values_list('item_id', 'location_id', 'quantity'):
+                positions[(item_id, row_location_id)] = quantity
+
+        movements = scoped(StockMovement.objects.filter(store_id=store_id, timestamp__lte=at))
+        if checkpoint_at:
+            movements = movements.filter(timestamp__gt=checkpoint_at)
+        for row in movements.values('item_id', 'location_id').annotate(total=Sum('quantity')).order_by():
+            key = (row['item_id'], row['location_id'])
+            positions[key] = positions.get(key, 0.0) + (row['total'] or 0.0)
+
+        return {key: quantity for key, quantity in positions.items() if abs(quantity) > 1e-9}
+
+    @staticmethod
+    def checkpoint(store_id, at):
+        """
+        Writes a checkpoint of every non-zero position at `at`, folded from the previous
+        checkpoint and the movements since. Idempotent for the same `at`.
+        Returns the number of rows written.
+        """
+        previous = LedgerService.latest_checkpoint(store_id, at)
+        if previous == at:
+            return 0
+
+        positions = {}
+        if previous:
+            for item_id, location_id, quantity in StockCheckpoint.objects.filter(
+                store_id=store_id, taken_at=previous
+            ).values_list('item_id', 'location_id', 'quantity'):
+                positions[(item_id, location_id)] = quantity
+
+        movements = StockMovement.objects.filter(store_id=store_id, timestamp__lte=at)
+        if previous:
+            movements = movements.filter(timestamp__gt=previous)
+        for row in movements.values('item_id', 'location_id').annotate(total=Sum('quantity')).order_by():
+            key = (row['item_id'], row['location_id'])
+            positions[key] = positions.get(key, 0.0) + (row['total'] or 0.0)
+
+        positions = {key: quantity for key, quantity in positions.items() if abs(quantity) > 1e-9}
+        if not positions:
+            return 0
+        with transaction.atomic():
+            StockCheckpoint.objects.bulk_create([
+                StockCheckpoint(store_id=store_id, item_id=item_id, location_id=location_id, taken_at=at, quantity=quantity)
+                for (item_id, location_id), quantity in positions.items()
+            ], batch_size=1000)
+        return len(positions)
+
+    @staticmethod
+    def snapshot(store_id, day):
+        """
+        Writes the store's StockSnapshot rows for business day `day`: positions at its start
+        (from the ledger, so past days can be backfilled), bulk inserted; re-runs replace
+        the day. Returns the number of rows written.
+        """
+        from inventory.services.inventory_service import InventoryService
+        positions = LedgerService.stock_at(store_id, InventoryService.start_of_business_day(day) - timedelta(microseconds=1))
+        with transaction.atomic():
+            # Replace the whole day so positions that went to zero disappear too
+            StockSnapshot.objects.filter(store_id=store_id, date=day).delete()
+            StockSnapshot.objects.bulk_create([
+                StockSnapshot(store_id=store_id, item_id=item_id, location_id=location_id, date=day, quantity=quantity)
+                for (item_id, location_id), quantity in positions.items()
+            ], batch_size=1000)
+        return len(positions)
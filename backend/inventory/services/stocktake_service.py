@@ -0,0 +1,189 @@
+from django.db import transaction
+from django.utils import timezone
+from inventory.models import Item, Location, StocktakeSession, StocktakeSubSession, StocktakeRecord, StocktakeDeviceCursor
+from inventory.services.inventory_service import InventoryService
+
+class StocktakeClosedError(ValueError):
+    """The session or sub-session stopped accepting counts (finalized, merged or submitted)."""
+
+class StocktakeService:
+    @staticmethod
+    def apply_counts(session: StocktakeSession, changes, device_id='', sub_session: StocktakeSubSession = None):
+        """
+        Applies counted quantities to a pending session, or to one of its sub-sessions.
+        `changes` is a list of {item_id, location_id, quantity_counted, unit_name (opt), seq (opt)}.
+
+        Writes are idempotent per device: the `seq`s applied from each device are kept per
+        session (or sub-session) and a change already applied is skipped, whoever last wrote
+        the row, so a client can replay its outbox after a dropped connection without
+        double-applying anything or overwriting another device's newer count. A batch that
+        never arrived and is resent after later ones still applies, except where the same
+        device has since counted that row with a higher `seq`.
+        Every applied change gets the next sequence number (`server_seq`) of the session, or of
+        the sub-session when one is given; sub-session writes never touch the session row and
+        only accept counts for the sub-session's location.
+
+        The open status is re-checked once the owner row is locked, so a save racing
+        finalize or a merge fails instead of writing counts nobody will read: raises
+        StocktakeClosedError.
+
+        Returns (applied_records, skipped_count, cursor).
+        """
+        parsed = {}
+        skipped = 0
+        for data in changes:
+            item_id = data.get('item_id')
+            location_id = data.get('location_id')
+
+            if not item_id or not location_id:
+                skipped += 1
+                continue
+
+            try:
+                key = (int(item_id), int(location_id))
+                qty = float(data.get('quantity_counted'))
+                seq = int(data.get('seq') or 0)
+            except (ValueError, TypeError):
+                skipped += 1
+                continue
+
+            # Within one request only the newest change per (item, location) matters
+            if key in parsed:
+                skipped += 1
+                if parsed[key][2] > seq:
+                    continue
+            parsed[key] = (qty, data.get('unit_name'), seq)
+
+        if not parsed:
+            return [], skipped, (sub_session or session).sync_cursor
+
+        item_ids = {item_id for item_id, _ in parsed}
+        location_ids = {location_id for _, location_id in parsed}
+
+        items = Item.objects.in_bulk(item_ids)
+        locations = Location.objects.filter(store=session.store_id)
+        if sub_session is not None:
+            locations = locations.filter(id=sub_session.location_id)
+        locations = locations.in_bulk(location_ids)
+        factors = InventoryService.conversion_factors(item_ids)
+
+        # Sequence numbers come from the sub-session when counting one, otherwise the session
+        owner = sub_session if sub_session is not None else session
+        owner_model = type(owner)
+
+        with transaction.atomic():
+            # Lock the owner row so sequence numbers are handed out in order
+            cursor, status = owner_model.objects.select_for_update().values_list('sync_cursor', 'status').get(pk=owner.pk)
+            if sub_session is not None and status == 'PENDING':
+                status = StocktakeSession.objects.filter(pk=session.pk).values_list('status', flat=True).get()
+            if status != 'PENDING':
+                raise StocktakeClosedError("Session is not open for counting.")
+
+            device_cursor = None
+            if device_id:
+                device_cursor, _ = StocktakeDeviceCursor.objects.get_or_create(session=session, sub_session=sub_session, device_id=device_id)
+
+            existing = {}
+            scoped = StocktakeRecord.objects.filter(session=session, sub_session=sub_session, item_id__in=item_ids, location_id__in=location_ids)
+            for record in scoped.order_by('id'):
+                existing.setdefault((record.item_id, record.location_id), record)
+
+            now = timezone.now()
+            to_update = []
+            to_create = []
+
+            for key, (qty, unit_name, seq) in parsed.items():
+                item = items.get(key[0])
+                if item is None or key[1] not in locations:
+                    skipped += 1
+                    continue
+
+                if device_cursor and seq and device_cursor.has_applied(seq):
+                    # Replay of a change that already went through
+                    skipped += 1
+                    continue
+
+                record = existing.get(key)
+                if record is not None and seq and record.device_id == device_id and (record.client_seq or 0) > seq:
+                    # This device has counted the row again since
+                    skipped += 1
+                    continue
+
+                cursor += 1
+                if record is None:
+                    record = StocktakeRecord(session=session, sub_session=sub_session, item_id=key[0], location_id=key[1])
+                    to_create.append(record)
+                else:
+                    to_update.append(record)
+
+                record.quantity_counted = InventoryService.to_base_quantity(item, qty, unit_name, factors)
+                record.device_id = device_id
+                record.client_seq = seq
+                record.server_seq = cursor
+                record.updated_at = now
+
+            if to_update:
+                StocktakeRecord.objects.bulk_update(
+                    to_update,
+                    ['quantity_counted', 'device_id', 'client_seq', 'server_seq', 'updated_at'],
+                    batch_size=500
+                )
+            if to_create:
+                StocktakeRecord.objects.bulk_create(to_create, batch_size=500)
+
+            owner_model.objects.filter(pk=owner.pk).update(sync_cursor=cursor)
+            applied_seqs = [record.client_seq for record in to_update + to_create if record.client_seq]
+            if device_cursor and applied_seqs:
+                device_cursor.mark_applied(applied_seqs)
+                device_cursor.save(update_fields=['applied_seqs'])
+            owner.sync_cursor = cursor
+
+        return to_update + to_create, skipped, cursor
+
+    @staticmethod
+    def changes_since(session: StocktakeSession, since, sub_session: StocktakeSubSession = None):
+        """
+        Records changed after the given server cursor, oldest change first.
+        Cursors are scoped: session-level records and each sub-session have their own sequence.
+        """
+        return StocktakeRecord.objects.filter(
+            session=session,
+            sub_session=sub_session,
+            server_seq__gt=since
+        ).select_related('item', 'location').order_by('server_seq')
+
+    @staticmethod
+    def split_session(session: StocktakeSession, location_ids=None):
+        """
+        Creates one sub-session per location of the session's store (or per given location).
+        Existing sub-sessions are kept. Returns all sub-sessions of the session.
+        """
+        locations = Location.objects.filter(store=session.store_id)
+        if location_ids is not None:
+            locations = locations.filter(id__in=location_ids)
+
+        StocktakeSubSession.objects.bulk_create(
+            [StocktakeSubSession(session=session, location_id=location_id) for location_id in locations.values_list('id', flat=True)],
+            ignore_conflicts=True
+        )
+        return session.sub_sessions.select_related('location', 'user').order_by('location__name')
+
+    @staticmethod
+    def merge_sub_sessions(session: StocktakeSession):
+        """
+        Folds sub-session counts into the session in one set-based pass.
+        A location counted through a sub-session replaces any session-level records saved for it,
+        and every sub-session is closed. Must run inside the finalize transaction.
+        """
+        sub_sessions = StocktakeSubSession.objects.filter(session=session)
+        # Wait out in-flight sub-session saves; later ones see the closed status and fail
+        list(sub_sessions.select_for_update().values_list('id', flat=True))
+        counted_locations = sub_sessions.filter(records__isnull=False).values('location_id')
+
+        StocktakeRecord.objects.filter(
+            session=session,
+            sub_session__isnull=True,
+            location_id__in=counted_locations
+        ).delete()
+
+        sub_sessions.filter(status='PENDING').update(status='SUBMITTED', submitted_at=timezone.now())
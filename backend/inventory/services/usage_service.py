@@ -0,0 +1,135 @@
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from inventory.models import DailyUsage, UsageRollup
+
+
+class UsageService:
+    """
+    Answers DailyUsage questions over arbitrary date ranges by reading whole months and
+    weeks from UsageRollup and only the leftover edge days from DailyUsage.
+    """
+    GRANULARITIES = ('day', UsageRollup.WEEK, UsageRollup.MONTH)
+
+    @staticmethod
+    def decompose(start, end):
+        """
+        Splits [start, end] (inclusive) into whole months, whole weeks and leftover day ranges
+        that together cover each day exactly once, preferring the coarsest piece that fits.
+        Returns (day_ranges, week_starts, month_starts).
+        """
+        day_ranges, weeks, months = [], [], []
+        cursor = start
+        while cursor <= end:
+            month_start, month_end = UsageRollup.period_bounds(UsageRollup.MONTH, cursor)
+            if cursor == month_start and month_end <= end:
+                months.append(cursor)
+                cursor = month_end + timedelta(days=1)
+                continue
+
+            week_start, week_end = UsageRollup.period_bounds(UsageRollup.WEEK, cursor)
+            # Don't let a week swallow the start of a month that could be read whole
+            blocks_month = any(
+                (week_start + timedelta(days=i)).day == 1
+                and UsageRollup.period_bounds(UsageRollup.MONTH, week_start + timedelta(days=i))[1] <= end
+                for i in range(1, 7)
+            )
+            if cursor == week_start and week_end <= end and not blocks_month:
+                weeks.append(cursor)
+                cursor = week_end + timedelta(days=1)
+                continue
+
+            if day_ranges and day_ranges[-1][1] == cursor - timedelta(days=1):
+                day_ranges[-1] = (day_ranges[-1][0], cursor)
+            else:
+                day_ranges.append((cursor, cursor))
+            cursor += timedelta(days=1)
+        return day_ranges, weeks, months
+
+    @staticmethod
+    def sources(store, start, end):
+        """
+        Querysets (DailyUsage and/or UsageRollup) that together cover [start, end] exactly once.
+        Both models expose `item` and `implied_consumption`, so callers can run the same
+        values()/annotate() over each and add the results up.
+        """
+        day_ranges, weeks, months = UsageService.decompose(start, end)
+        sources = []
+        if day_ranges:
+            sources.append(DailyUsage.objects.filter(
+                reduce(or_, [Q(date__range=day_range) for day_range in day_ranges]),
+                store=store
+            ))
+        periods = []
+        if weeks:
+            periods.append(Q(granularity=UsageRollup.WEEK, period_start__in=weeks))
+        if months:
+            periods.append(Q(granularity=UsageRollup.MONTH, period_start__in=months))
+        if periods:
+            sources.append(UsageRollup.objects.filter(reduce(or_, periods), store=store))
+        return sources
+
+    @staticmethod
+    def grouped(store, start, end, fields, filters=None, **aggregates):
+        """
+        values(*fields).annotate(**aggregates) over [start, end], summed across sources.
+        Aggregates must be additive (Sum). Returns {tuple(field values): {name: total}}.
+        """
+        results = {}
+        for source in UsageService.sources(store, start, end):
+            if filters:
+                source = source.filter(**filters)
+            for row in source.values(*fields).annotate(**aggregates).order_by():
+                key = tuple(row[field] for field in fields)
+                totals = results.setdefault(key, {name: 0.0 for name in aggregates})
+                for name in aggregates:
+                    totals[name] += row[name] or 0.0
+        return results
+
+    @staticmethod
+    def series(store, start, end, granularity, fields, filters=None, **aggregates):
+        """
+        Like grouped(), bucketed by day, week or month. Whole buckets are read from the rollup
+        of that granularity; buckets cut by the range edges are summed from daily rows.
+        Returns {bucket_start: {tuple(field values): {name: total}}}.
+        """
+        buckets = {}
+
+        def add(bucket, rows):
+            for row in rows:
+                key = tuple(row[field] for field in fields)
+                totals = buckets.setdefault(bucket(row), {}).setdefault(key, {name: 0.0 for name in aggregates})
+                for name in aggregates:
+                    totals[name] += row[name] or 0.0
+
+        daily = DailyUsage.objects.filter(store=store)
+        if filters:
+            daily = daily.filter(**filters)
+
+        if granularity == 'day':
+            rows = daily.filter(date__range=(start, end)).values('date', *fields).annotate(**aggregates).order_by()
+            add(lambda row: row['date'], rows)
+            return buckets
+
+        first_start, _ = UsageRollup.period_bounds(granularity, start)
+        last_start, last_end = UsageRollup.period_bounds(granularity, end)
+        whole_from = start if first_start == start else UsageRollup.period_bounds(granularity, first_start)[1] + timedelta(days=1)
+        whole_to = end if last_end == end else last_start - timedelta(days=1)
+
+        if whole_from <= whole_to:
+            rollups = UsageRollup.objects.filter(store=store, granularity=granularity, period_start__range=(whole_from, whole_to))
+            if filters:
+                rollups = rollups.filter(**filters)
+            add(lambda row: row['period_start'], rollups.values('period_start', *fields).annotate(**aggregates).order_by())
+
+        edges = []
+        if start < whole_from:
+            edges.append(Q(date__range=(start, min(end, whole_from - timedelta(days=1)))))
+        if whole_to < end and whole_to + timedelta(days=1) >= whole_from:
+            edges.append(Q(date__range=(max(start, whole_to + timedelta(days=1)), end)))
+        if edges:
+            rows = daily.filter(reduce(or_, edges)).values('date', *fields).annotate(**aggregates).order_by()
+            add(lambda row: UsageRollup.period_bounds(granularity, row['date'])[0], rows)
+        return buckets
@@ -0,0 +1,108 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ProductionLog, ReceivingLog, StoreItemSettings, ExpiredItemLog, Item, Recipe, UnitConversion, Location, Tombstone, Inventory, OnHand, DailyUsage, UsageRollup
+from .services.dashboard_cache import DashboardCache
+
+
+@receiver([post_save, post_delete], sender=ProductionLog)
+@receiver([post_save, post_delete], sender=ReceivingLog)
+@receiver([post_save, post_delete], sender=StoreItemSettings)
+@receiver([post_save, post_delete], sender=ExpiredItemLog)
+def invalidate_dashboard(sender, instance, **kwargs):
+    # Only the owning store's dashboard is affected. Inventory batch writes are covered
+    # by OnHand.refresh, which also catches the bulk paths that skip signals.
+    if DashboardCache.in_bulk_write():
+        return
+    DashboardCache.invalidate(instance.store_id)
+
+
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=UnitConversion)
+@receiver(post_delete, sender=Location)
+def record_tombstone(sender, instance, **kwargs):
+    # Also fires for cascaded deletes. Recipes and conversions follow their item's
+    # visibility, so they are recorded without a store.
+    Tombstone.record(sender, [(instance.pk, getattr(instance, 'store_id', None))])
+
+
+def deleted_directly(origin, model):
+    # post_delete also fires for cascaded rows; `origin` is what the delete was called on
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is model
+
+
+@receiver(post_delete, sender=StoreItemSettings)
+def resend_item_after_settings_delete(sender, instance, origin=None, **kwargs):
+    # Settings are synced as part of the item, so a delta sync resends it with the defaults.
+    # Item and Store deletes take the settings with them and are tombstoned on their own.
+    if deleted_directly(origin, StoreItemSettings):
+        Item.objects.filter(pk=instance.item_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Inventory)
+def remember_batch_owner(sender, instance, raw=False, **kwargs):
+    # A batch moved to another store or item must refresh the old totals too
+    instance._previous_owner = None
+    if instance.pk and not raw:
+        instance._previous_owner = Inventory.objects.filter(pk=instance.pk).values_list('store_id', 'item_id').first()
+
+
+@receiver(post_save, sender=Inventory)
+def refresh_on_hand_after_save(sender, instance, raw=False, **kwargs):
+    if raw or Inventory.in_bulk_write():
+        return
+    previous = getattr(instance, '_previous_owner', None)
+    if previous and previous != (instance.store_id, instance.item_id):
+        OnHand.refresh(previous[0], [previous[1]])
+    OnHand.refresh(instance.store_id, [instance.item_id])
+
+
+@receiver(post_delete, sender=Inventory)
+def refresh_on_hand_after_delete(sender, instance, origin=None, **kwargs):
+    # Instance and queryset deletes (admin bulk delete included). Location cascades are
+    # folded in once by refresh_on_hand_after_location_delete; Item and Store cascades
+    # take the on-hand rows with them.
+    if Inventory.in_bulk_write() or not deleted_directly(origin, Inventory):
+        return
+    OnHand.refresh(instance.store_id, [instance.item_id])
+    Tombstone.record(Inventory, [(instance.pk, instance.store_id)])
+
+
+@receiver(post_delete, sender=Location)
+def refresh_on_hand_after_location_delete(sender, instance, origin=None, **kwargs):
+    # Its batches and location totals are gone by cascade; bring the store totals down
+    if not deleted_directly(origin, Location):
+        return
+    item_ids = OnHand.objects.filter(store_id=instance.store_id).values_list('item_id', flat=True)
+    OnHand.refresh(instance.store_id, list(item_ids))
+
+
+@receiver(pre_save, sender=DailyUsage)
+def remember_usage_key(sender, instance, raw=False, **kwargs):
+    # A row moved to another store, item or date must refresh the old periods too
+    instance._previous_key = None
+    if instance.pk and not raw:
+        instance._previous_key = DailyUsage.objects.filter(pk=instance.pk).values_list('store_id', 'item_id', 'date').first()
+
+
+@receiver(post_save, sender=DailyUsage)
+def refresh_rollups_after_save(sender, instance, raw=False, **kwargs):
+    if raw or DailyUsage.in_bulk_write():
+        return
+    previous = getattr(instance, '_previous_key', None)
+    if previous and previous != (instance.store_id, instance.item_id, instance.date):
+        UsageRollup.refresh(*previous)
+    UsageRollup.refresh(instance.store_id, instance.item_id, instance.date)
+
+
+@receiver(post_delete, sender=DailyUsage)
+def refresh_rollups_after_delete(sender, instance, origin=None, **kwargs):
+    # Instance and queryset deletes (admin bulk delete included); Item and Store cascades
+    # take the rollups with them
+    if DailyUsage.in_bulk_write() or not deleted_directly(origin, DailyUsage):
+        return
+    UsageRollup.refresh(instance.store_id, instance.item_id, instance.date)
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import (
+    Item, Location, Inventory, Recipe, RecipeIngredient, UnitConversion, DailyUsage, ExpiredItemLog, UsageRollup
+)
+from inventory.services.usage_service import UsageService
+
+
+class AnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g")
+        UnitConversion.objects.create(item=self.flour, unit_name="kg", factor=1000)
+        self.butter = Item.objects.create(name="Butter", type="ingredient", base_unit="g")
+        self.today = timezone.localdate()
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _product(self, name, sold, flour_per_batch=1000, yield_quantity=10):
+        product = Item.objects.create(name=name, type="product", base_unit="ea")
+        recipe = Recipe.objects.create(item=product, yield_quantity=yield_quantity)
+        RecipeIngredient.objects.create(recipe=recipe, ingredient_item=self.flour, quantity_required=flour_per_batch)
+        RecipeIngredient.objects.create(recipe=recipe, ingredient_item=self.butter, quantity_required=100)
+        DailyUsage.objects.create(store=self.store, item=product, date=self.today, starting_count=sold, ending_count=0)
+        Inventory.objects.create(store=self.store, item=product, location=self.shelf, quantity=3)
+        ExpiredItemLog.objects.create(store=self.store, item=product, quantity_expired=1, user=self.user)
+        return product
+
+    def test_ingredient_usage_from_first_recipe(self):
+        bread = self._product("Bread", sold=20)
+        # A later recipe for the same product is ignored
+        other = Recipe.objects.create(item=bread, yield_quantity=1)
+        RecipeIngredient.objects.create(recipe=other, ingredient_item=self.flour, quantity_required=99999)
+        DailyUsage.objects.create(store=self.store, item=bread, date=self.today - timedelta(days=1), starting_count=10, ending_count=0)
+
+        resp = self.client.get('/api/inventory/analytics/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        usage = {row['name']: (row['quantity'], row['unit']) for row in resp.data['ingredient_usage']}
+        # 30 sold / 10 per batch = 3 batches
+        self.assertEqual(usage['Flour'], (3, 'kg'))
+        self.assertEqual(usage['Butter'], (300, 'g'))
+        self.assertEqual(resp.data['popular_products'][0], {'recipe__item__name': 'Bread', 'total_made': 30})
+        self.assertEqual(resp.data['current_stock'][0]['total_quantity'], 3)
+        self.assertEqual(resp.data['expired_waste'][0]['total_expired'], 1)
+
+    def test_query_count_independent_of_product_count(self):
+        def run():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/api/inventory/analytics/')
+            return len(ctx.captured_queries)
+
+        self._product("Bread", sold=5)
+        few = run()
+        for i in range(10):
+            self._product(f"Roll {i}", sold=i + 1)
+        self.assertEqual(run(), few)
+
+
+class UsageRollupTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="ea")
+        # 2025-01-01 .. 2025-03-31: 2 sold every day
+        self.rows = [
+            DailyUsage.objects.create(store=self.store, item=self.bread, date=date(2025, 1, 1) + timedelta(days=i), starting_count=2, ending_count=0)
+            for i in range(90)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_rollups_follow_daily_rows(self):
+        january = UsageRollup.objects.get(item=self.bread, granularity=UsageRollup.MONTH, period_start=date(2025, 1, 1))
+        self.assertEqual((january.implied_consumption, january.days), (62, 31))
+
+        row = self.rows[0]
+        row.ending_count = 2 # now sold nothing; no longer counted
+        row.save()
+        january.refresh_from_db()
+        self.assertEqual((january.implied_consumption, january.days), (60, 30))
+
+        self.rows[1].delete()
+        january.refresh_from_db()
+        self.assertEqual(january.days, 29)
+        # 2025-01-01 is a Wednesday; its week also starts in December
+        self.assertEqual(UsageRollup.objects.get(granularity=UsageRollup.WEEK, period_start=date(2024, 12, 30)).days, 3)
+
+        UsageRollup.objects.all().delete()
+        call_command('rebuild_usage_rollups', stdout=StringIO())
+        january = UsageRollup.objects.get(item=self.bread, granularity=UsageRollup.MONTH, period_start=date(2025, 1, 1))
+        self.assertEqual((january.implied_consumption, january.days), (58, 29))
+
+    def test_queryset_delete_clears_rollups(self):
+        DailyUsage.objects.filter(date__month=2).delete()
+        self.assertFalse(UsageRollup.objects.filter(granularity=UsageRollup.MONTH, period_start=date(2025, 2, 1)).exists())
+        # The week spanning Jan/Feb keeps only its January days
+        self.assertEqual(UsageRollup.objects.get(granularity=UsageRollup.WEEK, period_start=date(2025, 1, 27)).days, 5)
+
+        DailyUsage.objects.all().delete()
+        self.assertFalse(UsageRollup.objects.exists())
+
+    def test_decompose_prefers_coarsest_pieces(self):
+        days, weeks, months = UsageService.decompose(date(2025, 1, 20), date(2025, 3, 5))
+        self.assertEqual(months, [date(2025, 2, 1)])
+        self.assertEqual(weeks, [date(2025, 1, 20)])
+        self.assertEqual(days, [(date(2025, 1, 27), date(2025, 1, 31)), (date(2025, 3, 1), date(2025, 3, 5))])
+
+    def test_long_range_reads_rollups_only(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/api/inventory/analytics/', {'start': '2025-01-01', 'end': '2025-03-31', 'granularity': 'month'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('inventory_dailyusage' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(resp.data['popular_products'][0]['total_made'], 180)
+        self.assertEqual([row['Bread'] for row in resp.data['production_trends']], [62, 56, 62])
+
+    def test_partial_weeks_and_last_year_comparison(self):
+        resp = self.client.get('/api/inventory/analytics/', {
+            'start': '2026-01-03', 'end': '2026-01-14', 'granularity': 'week', 'compare': 'last_year'
+        })
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['date'] for row in resp.data['production_trends']], ['2025-12-29', '2026-01-05', '2026-01-12'])
+        self.assertEqual(resp.data['comparison']['start'], date(2025, 1, 3))
+        self.assertEqual(resp.data['comparison']['popular_products'][0]['total_made'], 24)
+
+        bad = self.client.get('/api/inventory/analytics/', {'granularity': 'hour'})
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,59 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, ExpiredItemLog, OnHand
+
+
+class BulkDisposeTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.other_store = Store.objects.create(name="Other Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.walk_in = Location.objects.create(store=self.store, name="Walk-in")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.other_shelf = Location.objects.create(store=self.other_store, name="Shelf")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+
+        past = timezone.now() - timedelta(days=2)
+        self.expired = [
+            Inventory.objects.create(store=self.store, item=self.milk, location=self.walk_in, quantity=5, expiration_date=past)
+            for _ in range(3)
+        ]
+        self.shelf_expired = Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=2, expiration_date=past)
+        self.fresh = Inventory.objects.create(store=self.store, item=self.milk, location=self.walk_in, quantity=9, expiration_date=timezone.now() + timedelta(days=3))
+        self.foreign = Inventory.objects.create(store=self.other_store, item=self.milk, location=self.other_shelf, quantity=1, expiration_date=past)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/inventory/inventory/bulk_dispose/'
+
+    def test_dispose_by_ids(self):
+        ids = [b.id for b in self.expired[:2]]
+        resp = self.client.post(self.url, {"ids": ids, "notes": "Expired"}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['disposed'], 2)
+        self.assertFalse(Inventory.objects.filter(id__in=ids).exists())
+        logs = ExpiredItemLog.objects.filter(store=self.store)
+        self.assertEqual(logs.count(), 2)
+        self.assertEqual(logs[0].user, self.user)
+        self.assertEqual(OnHand.objects.get(store=self.store, item=self.milk).quantity, 5 + 2 + 9)
+
+    def test_foreign_ids_reject_whole_request(self):
+        resp = self.client.post(self.url, {"ids": [self.expired[0].id, self.foreign.id]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(resp.data['missing'], [self.foreign.id])
+        self.assertTrue(Inventory.objects.filter(id=self.expired[0].id).exists())
+
+    def test_all_expired_at_location(self):
+        # The batch delete fetches its rows first now that Inventory has delete signals
+        with self.assertNumQueries(14):
+            resp = self.client.post(self.url, {"location": self.walk_in.id, "all_expired": True}, format='json')
+        self.assertEqual(resp.data['disposed'], 3)
+        remaining = set(Inventory.objects.filter(store=self.store).values_list('id', flat=True))
+        self.assertEqual(remaining, {self.shelf_expired.id, self.fresh.id})
+
+    def test_requires_selection(self):
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
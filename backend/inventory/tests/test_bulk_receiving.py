@@ -0,0 +1,97 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, ReceivingLog, StoreItemSettings, StockMovement, OnHand
+
+
+class BulkReceivingTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.floor = Location.objects.create(store=self.store, name="Floor", is_sales_floor=True)
+        self.walk_in = Location.objects.create(store=self.store, name="Walk-in")
+        self.freezer = Location.objects.create(store=self.store, name="Freezer")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml", shelf_life_days=7)
+        self.peas = Item.objects.create(name="Peas", type="ingredient", base_unit="g")
+        StoreItemSettings.objects.create(store=self.store, item=self.peas, default_location=self.freezer)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/inventory/receiving-logs/bulk/'
+
+    def test_receives_all_lines(self):
+        resp = self.client.post(self.url, {"lines": [
+            {"item": self.milk.id, "quantity": 1000, "unit_cost": 0.002},
+            {"item": self.peas.id, "quantity": 500},
+            {"item": self.milk.id, "quantity": 500},
+        ]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([line['item_name'] for line in resp.data], ["Milk", "Peas", "Milk"])
+
+        self.assertEqual(ReceivingLog.objects.filter(store=self.store, user=self.user).count(), 3)
+        # Milk goes to the first back-of-house location; both milk lines share an expiry day
+        milk = Inventory.objects.get(item=self.milk)
+        self.assertEqual((milk.location_id, milk.quantity), (self.walk_in.id, 1500))
+        self.assertIsNotNone(milk.expiration_date)
+        peas = Inventory.objects.get(item=self.peas)
+        self.assertEqual((peas.location_id, peas.quantity), (self.freezer.id, 500))
+
+        self.assertEqual(OnHand.objects.get(store=self.store, item=self.milk).quantity, 1500)
+        reasons = set(StockMovement.objects.values_list('reason', flat=True))
+        self.assertEqual(reasons, {StockMovement.RECEIVING})
+
+    def test_query_count_does_not_grow_with_lines(self):
+        items = Item.objects.bulk_create([Item(name=f"Item {i}", type="ingredient", base_unit="g") for i in range(40)])
+
+        def receive(batch):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.post(self.url, {"lines": [{"item": item.id, "quantity": 1} for item in batch]}, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(receive(items[:4]), receive(items[4:]))
+        self.assertEqual(Inventory.objects.filter(item__in=items).count(), 40)
+
+    def test_rejects_bad_lines_without_writing(self):
+        resp = self.client.post(self.url, {"lines": [
+            {"item": self.milk.id, "quantity": 5},
+            {"item": 99999, "quantity": 5},
+        ]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resp.data['missing'], [99999])
+
+        resp = self.client.post(self.url, {"lines": [{"item": self.milk.id, "quantity": 0}]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.post(self.url, {"lines": []}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(ReceivingLog.objects.exists())
+        self.assertFalse(Inventory.objects.exists())
+
+    def test_rejects_other_store_items(self):
+        other_store = Store.objects.create(name="Other Store")
+        theirs = Item.objects.create(name="House Sauce", type="product", base_unit="ml", store=other_store)
+        ours = Item.objects.create(name="Our Sauce", type="product", base_unit="ml", store=self.store)
+
+        resp = self.client.post(self.url, {"lines": [
+            {"item": ours.id, "quantity": 5},
+            {"item": theirs.id, "quantity": 5},
+        ]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resp.data['missing'], [theirs.id])
+        self.assertFalse(Inventory.objects.exists())
+
+        resp = self.client.post(self.url, {"lines": [{"item": ours.id, "quantity": 5}]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+    def test_creates_location_for_store_without_any(self):
+        store = Store.objects.create(name="New Store")
+        user = CustomUser.objects.create_user(username="new", password="password", store=store)
+        self.client.force_authenticate(user=user)
+
+        resp = self.client.post(self.url, {"lines": [{"item": self.milk.id, "quantity": 3}]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Inventory.objects.get(store=store).location.name, "Back of House")
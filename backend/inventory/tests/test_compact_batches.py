@@ -0,0 +1,59 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, OnHand, ReceivingLog
+from inventory.services.inventory_service import InventoryService
+
+
+class CompactBatchesTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.walk_in = Location.objects.create(store=self.store, name="Walk-in")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml", shelf_life_days=7)
+        self.today = timezone.localdate()
+
+    def at(self, day_offset, hour):
+        return timezone.make_aware(datetime.combine(self.today + timedelta(days=day_offset), time(hour)))
+
+    def batch(self, quantity, expiration_date, location=None):
+        return Inventory.objects.create(store=self.store, item=self.milk, location=location or self.walk_in,
+                                        quantity=quantity, expiration_date=expiration_date)
+
+    def test_drops_drained_and_merges_same_day(self):
+        first = self.batch(2, self.at(3, 18))
+        self.batch(3, self.at(3, 9))
+        self.batch(0, self.at(1, 9))
+        other_day = self.batch(4, self.at(4, 9))
+        other_location = self.batch(5, self.at(3, 9), location=self.shelf)
+
+        stats = InventoryService.compact_batches(self.store.id)
+        self.assertEqual(stats, {'deleted': 1, 'merged': 1})
+
+        first.refresh_from_db()
+        self.assertEqual(first.quantity, 5)
+        self.assertEqual(first.expiration_date, self.at(3, 9))
+        self.assertEqual(
+            set(Inventory.objects.values_list('id', flat=True)),
+            {first.id, other_day.id, other_location.id}
+        )
+        self.assertEqual(OnHand.objects.get(store=self.store, item=self.milk).quantity, 14)
+
+    def test_receiving_same_day_reuses_batch(self):
+        for quantity in (10, 15):
+            log = ReceivingLog.objects.create(store=self.store, user=self.user, item=self.milk, quantity=quantity)
+            InventoryService.process_receiving_log(log)
+        self.assertEqual(list(Inventory.objects.filter(item=self.milk).values_list('quantity', flat=True)), [25])
+
+    def test_command(self):
+        self.batch(0, None)
+        self.batch(1, self.at(2, 9))
+        self.batch(1, self.at(2, 10))
+        out = StringIO()
+        call_command('compact_batches', '--store', str(self.store.id), stdout=out)
+        self.assertIn('1 drained batches deleted, 1 merged', out.getvalue())
+        self.assertEqual(Inventory.objects.count(), 1)
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, StoreItemSettings, ProductionLog
+from inventory.services.dashboard_cache import DashboardCache
+
+
+class DashboardCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = Store.objects.create(name="Store A")
+        self.other_store = Store.objects.create(name="Store B")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.other_shelf = Location.objects.create(store=self.other_store, name="Shelf")
+        self.manager = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.it_user = CustomUser.objects.create_user(username="it", password="password", role='it')
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g")
+        StoreItemSettings.objects.create(store=self.store, item=self.flour, par=100)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.manager)
+
+    def _get(self):
+        resp = self.client.get('/api/inventory/dashboard/stats/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp
+
+    def test_repeat_loads_are_served_from_cache(self):
+        self.assertEqual(self._get()['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            resp = self._get()
+        self.assertEqual(resp['X-Cache'], 'HIT')
+        # Only the shared cache is read; no dashboard queries run
+        table = settings.CACHES['default']['LOCATION']
+        self.assertTrue(all(table in query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']))
+        self.assertEqual(resp.data['low_stock_count'], 1)
+
+        self.assertEqual(DashboardCache.stats()['hits'], 1)
+        self.assertEqual(DashboardCache.stats()['misses'], 1)
+
+    def test_cache_is_shared_across_processes(self):
+        # Commands and other workers bump versions this worker must see
+        self.assertNotIn('locmem', settings.CACHES['default']['BACKEND'])
+
+    def test_store_writes_invalidate_only_that_store(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Inventory.objects.create(store=self.other_store, item=self.flour, location=self.other_shelf, quantity=500)
+        self.assertEqual(self._get()['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=500)
+        resp = self._get()
+        self.assertEqual(resp['X-Cache'], 'MISS')
+        self.assertEqual(resp.data['low_stock_count'], 0)
+
+    def test_settings_and_production_writes_invalidate(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreItemSettings.objects.filter(store=self.store, item=self.flour).get().delete()
+        self.assertEqual(self._get().data['low_stock_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductionLog.objects.create(store=self.store, user=self.manager, quantity_made=1, unit_type="Batch")
+        self.assertEqual(len(self._get().data['recent_activity']), 1)
+
+    def test_global_view_invalidated_by_any_store(self):
+        self.client.force_authenticate(user=self.it_user)
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreItemSettings.objects.create(store=self.other_store, item=self.flour, par=10)
+        self.assertEqual(self._get().data['low_stock_count'], 2)
+
+    def test_cache_stats_endpoint_is_it_only(self):
+        self.assertEqual(self.client.get('/api/inventory/dashboard/cache/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.it_user)
+        resp = self.client.get('/api/inventory/dashboard/cache/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_rate', resp.data)
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory
+
+
+class DashboardExpiryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+
+        now = timezone.now()
+        self.expired = [
+            Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=1, expiration_date=now - timedelta(days=30 - i))
+            for i in range(12)
+        ]
+        # Drained batches are neither listed nor counted
+        Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=0, expiration_date=now - timedelta(days=40))
+        Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=5, expiration_date=now + timedelta(days=5))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_counts_and_capped_lists(self):
+        resp = self.client.get('/api/inventory/dashboard/stats/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['expired_count'], 12)
+        self.assertEqual(resp.data['total_inventory_items'], 14)
+        self.assertEqual(len(resp.data['expired_items']), 10)
+        self.assertEqual(resp.data['expired_items'][0]['id'], self.expired[0].id)
+        self.assertIsNotNone(resp.data['expired_next'])
+        self.assertIsNone(resp.data['expiring_today_next'])
+
+        more = self.client.get('/api/inventory/inventory/expired/', {'cursor': resp.data['expired_next']})
+        self.assertEqual(more.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in more.data['results']], [b.id for b in self.expired[10:]])
+        self.assertIsNone(more.data['next'])
+
+    def test_expired_endpoint_keeps_plain_list_without_paging(self):
+        resp = self.client.get('/api/inventory/inventory/expired/')
+        self.assertEqual(len(resp.data), 12)
+        bad = self.client.get('/api/inventory/inventory/expired/', {'cursor': 'nope'})
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, StoreItemSettings
+from inventory.services.inventory_service import InventoryService
+
+
+class DashboardLowStockTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = Store.objects.create(name="Store A")
+        self.other_store = Store.objects.create(name="Store B")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.other_shelf = Location.objects.create(store=self.other_store, name="Shelf")
+
+        self.manager = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.it_user = CustomUser.objects.create_user(username="it", password="password", role='it')
+
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g")
+        self.sugar = Item.objects.create(name="Sugar", type="ingredient", base_unit="g")
+        self.salt = Item.objects.create(name="Salt", type="ingredient", base_unit="g")
+
+        # Flour: 300 of 1000 across two batches (deficit 700)
+        StoreItemSettings.objects.create(store=self.store, item=self.flour, par=1000)
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=200)
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=100)
+        # Sugar: none on hand (deficit 50)
+        StoreItemSettings.objects.create(store=self.store, item=self.sugar, par=50)
+        # Salt: above par
+        StoreItemSettings.objects.create(store=self.store, item=self.salt, par=10)
+        Inventory.objects.create(store=self.store, item=self.salt, location=self.shelf, quantity=20)
+        # Other store's stock must not count towards Store A
+        Inventory.objects.create(store=self.other_store, item=self.sugar, location=self.other_shelf, quantity=500)
+        StoreItemSettings.objects.create(store=self.other_store, item=self.flour, par=5)
+
+        self.client = APIClient()
+
+    def test_low_stock_for_store_sorted_by_deficit(self):
+        self.client.force_authenticate(user=self.manager)
+        with self.assertNumQueries(1):
+            list(InventoryService.low_stock_settings(self.store.id))
+
+        resp = self.client.get('/api/inventory/dashboard/stats/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['low_stock_count'], 2)
+        self.assertEqual([row['name'] for row in resp.data['low_stock_items']], ['Flour', 'Sugar'])
+        self.assertEqual(resp.data['low_stock_items'][0]['quantity'], 300)
+        self.assertEqual(resp.data['low_stock_items'][0]['deficit'], 700)
+        self.assertEqual(resp.data['low_stock_items'][1]['quantity'], 0)
+
+    def test_global_view_rolls_up_per_store(self):
+        self.client.force_authenticate(user=self.it_user)
+        resp = self.client.get('/api/inventory/dashboard/stats/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['low_stock_count'], 3)
+        counts = {row['store_id']: row['count'] for row in resp.data['low_stock_by_store']}
+        self.assertEqual(counts, {self.store.id: 2, self.other_store.id: 1})
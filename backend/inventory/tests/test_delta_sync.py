@@ -0,0 +1,135 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, UnitConversion, StoreItemSettings, Tombstone
+from inventory.services.inventory_service import InventoryService
+
+
+class DeltaSyncTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.other_store = Store.objects.create(name="Other Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g")
+        self.batch = Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=5)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def age(self, *querysets, days=1):
+        # Push existing rows back in time so only later writes count as changes
+        for qs in querysets:
+            qs.update(updated_at=timezone.now() - timedelta(days=days))
+
+    def sync(self, resource, since):
+        resp = self.client.get(f'/api/inventory/{resource}/', {'updated_since': since.isoformat()})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp.data
+
+    def test_first_sync_resets(self):
+        data = self.sync('items', timezone.now() - timedelta(days=365))
+        self.assertTrue(data['reset'])
+        self.assertEqual({row['name'] for row in data['results']}, {"Milk", "Flour"})
+        self.assertEqual(data['deleted'], [])
+
+    def test_returns_only_changes_and_deletions(self):
+        self.age(Item.objects.all(), Inventory.objects.all())
+        since = timezone.now() - timedelta(hours=1)
+
+        self.assertEqual(self.sync('items', since)['results'], [])
+
+        self.flour.name = "Bread Flour"
+        self.flour.save()
+        doomed = Item.objects.create(name="Doomed", type="ingredient", base_unit="g")
+        doomed_id = doomed.id
+        doomed.delete()
+
+        data = self.sync('items', since)
+        self.assertFalse(data['reset'])
+        self.assertEqual([row['name'] for row in data['results']], ["Bread Flour"])
+        self.assertEqual(data['deleted'], [doomed_id])
+
+    def test_item_resent_when_settings_or_conversions_change(self):
+        self.age(Item.objects.all())
+        since = timezone.now() - timedelta(hours=1)
+
+        StoreItemSettings.objects.create(store=self.store, item=self.milk, par=10)
+        UnitConversion.objects.create(item=self.flour, unit_name="Bag", factor=1000)
+        StoreItemSettings.objects.create(store=self.other_store, item=self.flour, par=3)
+
+        names = {row['name'] for row in self.sync('items', since)['results']}
+        self.assertEqual(names, {"Milk", "Flour"})
+
+    def test_item_resent_when_settings_deleted(self):
+        settings = StoreItemSettings.objects.create(store=self.store, item=self.milk, par=10)
+        self.age(Item.objects.all(), StoreItemSettings.objects.all())
+        since = timezone.now() - timedelta(hours=1)
+
+        settings.delete()
+        data = self.sync('items', since)
+        self.assertEqual([(row['name'], row['par']) for row in data['results']], [("Milk", 0)])
+        # Settings have no sync endpoint of their own, so nothing is tombstoned for them
+        self.assertFalse(Tombstone.objects.filter(model='inventory.storeitemsettings').exists())
+
+    def test_bulk_paths_bump_and_tombstone_batches(self):
+        self.age(Inventory.objects.all())
+        since = timezone.now() - timedelta(hours=1)
+
+        # Same-day batch folds into the existing one via compaction
+        Inventory.objects.filter(id=self.batch.id).update(expiration_date=timezone.now() + timedelta(days=2))
+        self.age(Inventory.objects.all())
+        second = Inventory.objects.create(
+            store=self.store, item=self.milk, location=self.shelf, quantity=3,
+            expiration_date=Inventory.objects.get(id=self.batch.id).expiration_date
+        )
+        InventoryService.compact_batches(self.store.id, [self.milk.id])
+
+        data = self.sync('inventory', since)
+        self.assertEqual([(row['id'], row['quantity']) for row in data['results']], [(self.batch.id, 8)])
+        self.assertEqual(data['deleted'], [second.id])
+
+        InventoryService.recompute_expirations(self.milk.id, 4)
+        self.assertGreater(Inventory.objects.get(id=self.batch.id).updated_at, since)
+
+    def test_other_store_tombstones_hidden(self):
+        other_shelf = Location.objects.create(store=self.other_store, name="Shelf")
+        other_shelf_id = other_shelf.id
+        other_shelf.delete()
+        since = timezone.now() - timedelta(hours=1)
+        self.assertEqual(self.sync('locations', since)['deleted'], [])
+        self.assertTrue(Tombstone.objects.filter(model='inventory.location', object_id=other_shelf_id).exists())
+
+    def test_staff_see_tombstones_from_every_store(self):
+        # Staff see every store's items, so they must also hear about every store's deletions
+        staff = CustomUser.objects.create_user(username="staff", password="password", store=self.store, is_staff=True)
+        self.client.force_authenticate(user=staff)
+        theirs = Item.objects.create(name="House Sauce", type="product", base_unit="ml", store=self.other_store)
+        theirs_id = theirs.id
+        since = timezone.now() - timedelta(hours=1)
+        theirs.delete()
+
+        self.assertEqual(self.sync('items', since)['deleted'], [theirs_id])
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.sync('items', since)['deleted'], [])
+
+    def test_invalid_cursor_and_pruning(self):
+        resp = self.client.get('/api/inventory/items/', {'updated_since': 'yesterday'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.batch.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=60))
+        out = StringIO()
+        call_command('prune_tombstones', stdout=out)
+        self.assertIn("Pruned 1 tombstones", out.getvalue())
+
+    def test_plain_list_unchanged(self):
+        resp = self.client.get('/api/inventory/items/')
+        self.assertEqual(resp.data['count'], 2)
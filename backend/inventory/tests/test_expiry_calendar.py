@@ -0,0 +1,56 @@
+from datetime import datetime, time, timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory
+
+
+class ExpiryCalendarTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.other_store = Store.objects.create(name="Other Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.location = Location.objects.create(store=self.store, name="Walk-in")
+        self.other_location = Location.objects.create(store=self.other_store, name="Walk-in")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+        self.eggs = Item.objects.create(name="Eggs", type="ingredient", base_unit="unit")
+        self.today = timezone.localdate()
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/inventory/inventory/expiry_calendar/'
+
+    def at(self, day_offset, hour):
+        return timezone.make_aware(datetime.combine(self.today + timedelta(days=day_offset), time(hour)))
+
+    def batch(self, item, expiration_date, quantity, store=None, location=None):
+        Inventory.objects.create(store=store or self.store, item=item, location=location or self.location,
+                                 quantity=quantity, expiration_date=expiration_date)
+
+    def test_buckets_by_business_day_and_item(self):
+        self.batch(self.milk, self.at(0, 1), 2)
+        self.batch(self.milk, self.at(0, 23), 3)
+        self.batch(self.eggs, self.at(0, 12), 12)
+        self.batch(self.milk, self.at(2, 8), 4)
+        self.batch(self.milk, self.at(2, 9), 0)  # drained
+        self.batch(self.milk, self.at(-1, 23), 5)  # already expired
+        self.batch(self.milk, self.at(3, 8), 6)  # past the horizon
+        self.batch(self.milk, self.at(1, 8), 7, store=self.other_store, location=self.other_location)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(self.url, {'days': 3})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        days = resp.data['days']
+        self.assertEqual([day['date'] for day in days], [self.today + timedelta(days=i) for i in range(3)])
+        self.assertEqual(
+            [(row['item_name'], row['quantity'], row['batches']) for row in days[0]['items']],
+            [('Eggs', 12, 1), ('Milk', 5, 2)]
+        )
+        self.assertEqual(days[1]['items'], [])
+        self.assertEqual([(row['item_name'], row['quantity']) for row in days[2]['items']], [('Milk', 4)])
+
+    def test_invalid_days(self):
+        self.assertEqual(self.client.get(self.url, {'days': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,46 @@
+from datetime import datetime, time, timedelta
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from users.models import Store
+from inventory.models import Item, Location, Inventory
+from inventory.services.inventory_service import InventoryService
+
+
+class ExpiryPredicateTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.location = Location.objects.create(store=self.store, name="Walk-in")
+        self.item = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+        self.today = timezone.localdate()
+
+    def at(self, day_offset, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.today + timedelta(days=day_offset), time(hour, minute)))
+
+    def batch(self, expiration_date, quantity=1):
+        return Inventory.objects.create(store=self.store, item=self.item, location=self.location, quantity=quantity, expiration_date=expiration_date)
+
+    def test_ranges_match_business_day(self):
+        yesterday_late = self.batch(self.at(-1, 23, 59))
+        today_early = self.batch(self.at(0, 0, 0))
+        today_late = self.batch(self.at(0, 23, 59))
+        tomorrow = self.batch(self.at(1, 0, 0))
+
+        expired = set(Inventory.objects.filter(InventoryService.expired_before()).values_list('id', flat=True))
+        expiring = set(Inventory.objects.filter(InventoryService.expiring_on()).values_list('id', flat=True))
+        self.assertEqual(expired, {yesterday_late.id})
+        self.assertEqual(expiring, {today_early.id, today_late.id})
+        self.assertNotIn(tomorrow.id, expired | expiring)
+
+        # Same answer as the old date-cast lookups
+        self.assertEqual(expired, set(Inventory.objects.filter(expiration_date__date__lt=self.today).values_list('id', flat=True)))
+        self.assertEqual(expiring, set(Inventory.objects.filter(expiration_date__date=self.today).values_list('id', flat=True)))
+
+    def test_expired_query_uses_partial_index(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest("Partial indexes not supported")
+        self.batch(self.at(-2, 9))
+        qs = Inventory.objects.filter(InventoryService.expired_before(), store=self.store, quantity__gt=0)
+        plan = qs.explain()
+        self.assertIn('inventory_in_stock_expiry_idx', plan)
+        self.assertNotIn('django_datetime_cast_date', str(qs.query))
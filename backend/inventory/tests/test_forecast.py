@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+import numpy as np
+from users.models import Store, CustomUser
+from inventory.models import Item, DailyUsage, DemandForecast, StoreItemSettings
+from inventory.services.forecast_service import ForecastService
+
+
+class ForecastTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="loaf")
+        self.cake = Item.objects.create(name="Cake", type="product", base_unit="ea")
+        self.as_of = date(2026, 3, 1) # a Sunday
+
+        # Bread: 10 a day, 30 on Saturdays. Cake: only 3 days of history.
+        for i in range(28):
+            day = self.as_of - timedelta(days=i)
+            sold = 30 if day.weekday() == 5 else 10
+            DailyUsage.objects.create(store=self.store, item=self.bread, date=day, starting_count=sold, ending_count=0)
+        for i in range(3):
+            DailyUsage.objects.create(store=self.store, item=self.cake, date=self.as_of - timedelta(days=i), starting_count=5, ending_count=0)
+        StoreItemSettings.objects.create(store=self.store, item=self.bread, par=12)
+
+    def test_fit_is_weekday_aware(self):
+        # One pair, 14 days starting Monday: 10/day, 30 on Saturdays
+        days = np.arange(14)
+        quantities = np.where(days % 7 == 5, 30.0, 10.0)
+        forecasts, spread, enough = ForecastService.fit(np.zeros(14, dtype=int), days, quantities, 14, 0, 7)
+        self.assertTrue(enough[0])
+        np.testing.assert_allclose(forecasts[0], [10, 10, 10, 10, 10, 30, 10])
+        self.assertAlmostEqual(spread[0], 0)
+
+    def test_run_writes_forecasts_and_suggested_par(self):
+        summary = ForecastService.run(as_of=self.as_of)
+        self.assertEqual(summary['pairs'], 1) # cake has too little history
+
+        forecasts = list(DemandForecast.objects.filter(item=self.bread).order_by('date').values_list('quantity', flat=True))
+        np.testing.assert_allclose(forecasts, [10, 10, 10, 10, 10, 30, 10])
+
+        settings = StoreItemSettings.objects.get(store=self.store, item=self.bread)
+        self.assertEqual(settings.par, 12) # hand-set par is left alone
+        self.assertEqual(settings.suggested_par, 20) # two days of cover
+        self.assertFalse(StoreItemSettings.objects.filter(item=self.cake).exists())
+
+        # Re-running replaces rather than duplicates
+        ForecastService.run(as_of=self.as_of)
+        self.assertEqual(DemandForecast.objects.count(), 7)
+
+        # Past forecasts stay while inside the history window, then are pruned
+        ForecastService.run(as_of=self.as_of + timedelta(days=30))
+        self.assertEqual(DemandForecast.objects.filter(date__lte=self.as_of + timedelta(days=7)).count(), 7)
+        ForecastService.run(as_of=self.as_of + timedelta(days=70))
+        self.assertFalse(DemandForecast.objects.filter(date__lt=self.as_of + timedelta(days=15)).exists())
+        self.assertEqual(DemandForecast.objects.count(), 7) # the +30 run's forecasts, still in the window
+
+    def test_command_dry_run_and_endpoint(self):
+        out = StringIO()
+        call_command('forecast_demand', '--dry-run', stdout=out)
+        self.assertIn('Would write', out.getvalue())
+        self.assertFalse(DemandForecast.objects.exists())
+
+        ForecastService.run(as_of=self.as_of)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        resp = client.get('/api/inventory/forecasts/', {'item': self.bread.id})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['count'], 7)
+        item = client.get(f'/api/inventory/items/{self.bread.id}/')
+        self.assertEqual(item.data['suggested_par'], 20)
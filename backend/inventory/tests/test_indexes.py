@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from users.models import Store
+from inventory.models import Item, Inventory, ProductionLog, ReceivingLog, StocktakeSession
+
+
+class CompositeIndexTestCase(TestCase):
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plan text checked against SQLite's EXPLAIN QUERY PLAN")
+        self.store = Store.objects.create(name="Test Store")
+        self.item = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+
+    def assertUsesIndex(self, qs, index_name):
+        self.assertIn(index_name, qs.explain())
+
+    def test_fifo_scan(self):
+        qs = Inventory.objects.filter(store=self.store, item_id__in=[self.item.id]).order_by('expiration_date', 'id')
+        self.assertUsesIndex(qs, 'inventory_fifo_idx')
+
+    def test_log_queries(self):
+        now = timezone.now()
+        self.assertUsesIndex(ProductionLog.objects.filter(store=self.store).order_by('-timestamp')[:5], 'production_store_time_idx')
+        self.assertUsesIndex(ReceivingLog.objects.filter(store=self.store, item_id__in=[self.item.id], timestamp__gte=now), 'receiving_item_time_idx')
+        self.assertUsesIndex(
+            StocktakeSession.objects.filter(store=self.store, status='COMPLETED', completed_at__lt=now).order_by('-completed_at')[:1],
+            'stocktake_completed_idx'
+        )
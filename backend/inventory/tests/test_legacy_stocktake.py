@@ -0,0 +1,62 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+from django.db.models import Sum
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, UnitConversion, VarianceLog
+from inventory.services.inventory_service import InventoryService
+
+
+class LegacyStocktakeTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.other_store = Store.objects.create(name="Other Store")
+        self.user = CustomUser.objects.create_user(username="counter", password="password", store=self.store)
+        self.walkin = Location.objects.create(store=self.store, name="Walk-in")
+        self.foreign_location = Location.objects.create(store=self.other_store, name="Elsewhere")
+
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml", shelf_life_days=7)
+        UnitConversion.objects.create(item=self.milk, unit_name="Carton", factor=1000)
+
+    def test_multiple_batches_reconciled_against_total(self):
+        now = timezone.now()
+        old = Inventory.objects.create(store=self.store, item=self.milk, location=self.walkin, quantity=500, expiration_date=now + timedelta(days=1))
+        new = Inventory.objects.create(store=self.store, item=self.milk, location=self.walkin, quantity=1000, expiration_date=now + timedelta(days=6))
+
+        logs = InventoryService.process_stocktake(self.store, self.user, [
+            {"item_id": self.milk.id, "location_id": self.walkin.id, "actual_quantity": 1.2, "unit_name": "Carton"}
+        ])
+
+        total = Inventory.objects.filter(store=self.store, item=self.milk, location=self.walkin).aggregate(Sum('quantity'))['quantity__sum']
+        self.assertAlmostEqual(total, 1200)
+        # Newest batch is kept whole, the oldest is trimmed
+        new.refresh_from_db()
+        old.refresh_from_db()
+        self.assertEqual(new.quantity, 1000)
+        self.assertAlmostEqual(old.quantity, 200)
+
+        self.assertEqual(len(logs), 1)
+        self.assertAlmostEqual(logs[0].expected_quantity, 1500)
+        self.assertAlmostEqual(logs[0].variance, -300)
+        self.assertEqual(VarianceLog.objects.filter(store=self.store).count(), 1)
+
+    def test_foreign_location_is_ignored(self):
+        logs = InventoryService.process_stocktake(self.store, self.user, [
+            {"item_id": self.milk.id, "location_id": self.foreign_location.id, "actual_quantity": 5}
+        ])
+        self.assertEqual(logs, [])
+        self.assertFalse(Inventory.objects.exists())
+
+    def test_query_count_independent_of_line_count(self):
+        def run(count):
+            items = [Item.objects.create(name=f"Item {count}-{i}", type="ingredient", base_unit="g") for i in range(count)]
+            for item in items:
+                Inventory.objects.create(store=self.store, item=item, location=self.walkin, quantity=3)
+            data = [{"item_id": item.id, "location_id": self.walkin.id, "actual_quantity": 5} for item in items]
+            with CaptureQueriesContext(connection) as ctx:
+                InventoryService.process_stocktake(self.store, self.user, data)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(run(3), run(30))
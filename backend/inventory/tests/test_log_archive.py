@@ -0,0 +1,160 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Recipe, ProductionLog, ReceivingLog, VarianceLog, LogArchive, LogRollup, StocktakeSession
+from inventory.services.archive_service import ArchiveService
+
+
+class LogArchiveTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g")
+        self.sugar = Item.objects.create(name="Sugar", type="ingredient", base_unit="g")
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="unit")
+        self.recipe = Recipe.objects.create(item=self.bread, yield_quantity=1)
+        self.now = timezone.now()
+
+        self.old_flour = self.receive(self.flour, 100, 2.0, days_ago=400)
+        self.receive(self.flour, 50, 2.0, days_ago=399)
+        self.old_sugar = self.receive(self.sugar, 30, 1.0, days_ago=398)
+        self.recent = self.receive(self.flour, 10, 2.0, days_ago=10)
+        self.produce(5, days_ago=400)
+        self.produce(3, days_ago=5)
+        self.count(days_ago=200)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def receive(self, item, quantity, unit_cost, days_ago):
+        log = ReceivingLog.objects.create(store=self.store, item=item, quantity=quantity, unit_cost=unit_cost)
+        ReceivingLog.objects.filter(id=log.id).update(timestamp=self.now - timedelta(days=days_ago))
+        return log
+
+    def produce(self, quantity, days_ago):
+        log = ProductionLog.objects.create(store=self.store, recipe=self.recipe, quantity_made=quantity, unit_type="Loaf")
+        ProductionLog.objects.filter(id=log.id).update(timestamp=self.now - timedelta(days=days_ago))
+        return log
+
+    def count(self, days_ago):
+        return StocktakeSession.objects.create(store=self.store, status='COMPLETED', completed_at=self.now - timedelta(days=days_ago))
+
+    def test_archives_old_rows_and_keeps_recent(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            stats = ArchiveService.archive(self.store, LogArchive.RECEIVING, chunk_size=2, now=self.now)
+
+        self.assertEqual(stats, {'rows': 3, 'archives': 2})
+        # One dashboard invalidation per chunk, not one per deleted row
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(list(ReceivingLog.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertEqual(LogArchive.objects.filter(kind=LogArchive.RECEIVING).count(), 2)
+
+        # The two flour deliveries may straddle a month boundary, so compare totals
+        totals = {}
+        for rollup in LogRollup.objects.filter(kind=LogArchive.RECEIVING):
+            entry = totals.setdefault(rollup.item_id, [0, 0.0, 0.0])
+            entry[0] += rollup.rows
+            entry[1] += rollup.quantity
+            entry[2] += rollup.value
+        self.assertEqual(totals, {self.flour.id: [2, 150, 300], self.sugar.id: [1, 30, 30]})
+
+    def test_cutoff_is_capped_at_last_stocktake(self):
+        # Counted 200 days ago with a 30 day horizon: rows after the count stay live
+        self.store.log_retention_days = 30
+        self.store.save()
+        middle = self.receive(self.flour, 5, 2.0, days_ago=300)
+        after_count = self.receive(self.flour, 7, 2.0, days_ago=100)
+
+        ArchiveService.archive(self.store, LogArchive.RECEIVING, now=self.now)
+
+        live = set(ReceivingLog.objects.values_list('id', flat=True))
+        self.assertNotIn(middle.id, live)
+        self.assertIn(after_count.id, live)
+
+    def test_no_completed_stocktake_archives_nothing(self):
+        StocktakeSession.objects.all().delete()
+        stats = ArchiveService.archive(self.store, LogArchive.RECEIVING, now=self.now)
+        self.assertEqual(stats['rows'], 0)
+        self.assertEqual(ReceivingLog.objects.count(), 4)
+
+    def test_read_round_trip(self):
+        ArchiveService.archive(self.store, LogArchive.RECEIVING, now=self.now)
+
+        rows, truncated = ArchiveService.read(self.store.id, LogArchive.RECEIVING)
+        self.assertFalse(truncated)
+        self.assertEqual([row['quantity'] for row in rows], [100, 50, 30])
+        self.assertEqual(rows[0]['timestamp'], self.now - timedelta(days=400))
+
+        rows, _ = ArchiveService.read(
+            self.store.id, LogArchive.RECEIVING,
+            start=self.now - timedelta(days=399, hours=12), end=self.now - timedelta(days=1)
+        )
+        self.assertEqual([row['quantity'] for row in rows], [50, 30])
+
+        rows, _ = ArchiveService.read(self.store.id, LogArchive.RECEIVING, item_id=self.sugar.id)
+        self.assertEqual([row['id'] for row in rows], [self.old_sugar.id])
+
+        rows, truncated = ArchiveService.read(self.store.id, LogArchive.RECEIVING, limit=2)
+        self.assertEqual((len(rows), truncated), (2, True))
+
+    def test_production_rollup_and_item_filter(self):
+        ArchiveService.archive(self.store, LogArchive.PRODUCTION, now=self.now)
+
+        self.assertEqual(ProductionLog.objects.count(), 1)
+        rollup = LogRollup.objects.get(kind=LogArchive.PRODUCTION)
+        self.assertEqual((rollup.item_id, rollup.unit, rollup.quantity), (self.bread.id, "Loaf", 5))
+        rows, _ = ArchiveService.read(self.store.id, LogArchive.PRODUCTION, item_id=self.bread.id)
+        self.assertEqual([row['quantity_made'] for row in rows], [5])
+
+    def test_rerun_adds_to_rollups(self):
+        ArchiveService.archive(self.store, LogArchive.RECEIVING, now=self.now)
+        self.receive(self.sugar, 20, 1.0, days_ago=398)
+        ArchiveService.archive(self.store, LogArchive.RECEIVING, now=self.now)
+
+        rollup = LogRollup.objects.get(kind=LogArchive.RECEIVING, item=self.sugar)
+        self.assertEqual((rollup.rows, rollup.quantity), (2, 50))
+
+    def test_command_dry_run_and_run(self):
+        VarianceLog.objects.create(store=self.store, item=self.flour, location=self.shelf, expected_quantity=10, actual_quantity=8, variance=-2)
+        VarianceLog.objects.update(timestamp=self.now - timedelta(days=500))
+
+        out = StringIO()
+        call_command('archive_logs', '--dry-run', stdout=out)
+        self.assertIn("Would archive 5 log rows", out.getvalue())
+        self.assertEqual(LogArchive.objects.count(), 0)
+
+        out = StringIO()
+        call_command('archive_logs', '--kind', 'variance', stdout=out)
+        self.assertIn("Archived 1 log rows", out.getvalue())
+        self.assertEqual(VarianceLog.objects.count(), 0)
+        self.assertEqual(ReceivingLog.objects.count(), 4)
+
+    def test_session_variance_stays_for_report(self):
+        session = StocktakeSession.objects.get()
+        linked = VarianceLog.objects.create(store=self.store, item=self.flour, location=self.shelf, session=session,
+                                            expected_quantity=10, actual_quantity=8, variance=-2)
+        VarianceLog.objects.create(store=self.store, item=self.sugar, location=self.shelf,
+                                   expected_quantity=5, actual_quantity=4, variance=-1)
+        VarianceLog.objects.update(timestamp=self.now - timedelta(days=500))
+
+        stats = ArchiveService.archive(self.store, LogArchive.VARIANCE, now=self.now)
+        self.assertEqual(stats['rows'], 1)
+        self.assertEqual(list(VarianceLog.objects.values_list('id', flat=True)), [linked.id])
+        self.assertEqual(list(session.variance_logs.values_list('id', flat=True)), [linked.id])
+
+    def test_archive_endpoint(self):
+        ArchiveService.archive(self.store, LogArchive.RECEIVING, now=self.now)
+
+        response = self.client.get('/api/inventory/archives/', {'kind': 'receiving', 'item': self.flour.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['quantity'] for row in response.data['rows']], [100, 50])
+        self.assertFalse(response.data['truncated'])
+        self.assertEqual({rollup['item_name'] for rollup in response.data['rollups']}, {"Flour"})
+
+        response = self.client.get('/api/inventory/archives/', {'kind': 'stocktake'})
+        self.assertEqual(response.status_code, 400)
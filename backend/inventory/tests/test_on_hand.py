@@ -0,0 +1,94 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import (
+    Item, Location, Inventory, Recipe, RecipeIngredient, ProductionLog, OnHand, LocationOnHand, StockMovement, Tombstone
+)
+from inventory.services.inventory_service import InventoryService
+
+
+class OnHandTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.fridge = Location.objects.create(store=self.store, name="Fridge")
+
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g", shelf_life_days=None)
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="loaf", shelf_life_days=2)
+        self.recipe = Recipe.objects.create(item=self.bread, yield_quantity=10)
+        RecipeIngredient.objects.create(recipe=self.recipe, ingredient_item=self.flour, quantity_required=1000)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _on_hand(self, item):
+        row = OnHand.objects.filter(store=self.store, item=item).first()
+        return row.quantity if row else 0.0
+
+    def test_batch_writes_keep_totals_in_step(self):
+        first = Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=1500)
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.fridge, quantity=500)
+        self.assertEqual(self._on_hand(self.flour), 2000)
+        self.assertEqual(LocationOnHand.objects.get(item=self.flour, location=self.fridge).quantity, 500)
+
+        first.quantity = 1000
+        first.save()
+        self.assertEqual(self._on_hand(self.flour), 1500)
+
+        resp = self.client.post(f'/api/inventory/inventory/{first.id}/dispose/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._on_hand(self.flour), 500)
+        self.assertFalse(LocationOnHand.objects.filter(item=self.flour, location=self.shelf).exists())
+
+    def test_queryset_and_cascade_deletes_keep_totals_in_step(self):
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=7)
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.fridge, quantity=3)
+        Inventory.objects.create(store=self.store, item=self.bread, location=self.fridge, quantity=2)
+
+        self.shelf.delete()
+        self.assertEqual(self._on_hand(self.flour), 3)
+
+        Inventory.objects.filter(item=self.flour).delete()
+        self.assertEqual(self._on_hand(self.flour), 0)
+        self.assertEqual(self._on_hand(self.bread), 2)
+        self.assertEqual(StockMovement.objects.filter(item=self.flour, location=self.fridge).aggregate(total=Sum('quantity'))['total'], 0)
+        self.assertTrue(Tombstone.objects.filter(model='inventory.inventory').exists())
+
+    def test_production_deducts_and_adds_output(self):
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=1500)
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.fridge, quantity=1000)
+
+        log = ProductionLog.objects.create(
+            store=self.store, user=self.user, recipe=self.recipe, quantity_made=2, unit_type="Batch", target_location=self.shelf
+        )
+        self.assertIsNone(InventoryService.process_production_log(log))
+
+        self.assertEqual(self._on_hand(self.flour), 500)
+        self.assertEqual(self._on_hand(self.bread), 20)
+        # The drained batch is compacted away
+        self.assertEqual(list(Inventory.objects.filter(item=self.flour).values_list('quantity', flat=True)), [500])
+
+    def test_production_reports_missing_from_on_hand(self):
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=300)
+        log = ProductionLog.objects.create(store=self.store, user=self.user, recipe=self.recipe, quantity_made=1, unit_type="Batch")
+        result = InventoryService.process_production_log(log)
+        self.assertEqual(result['missing_ingredients'][0]['available'], 300)
+
+    def test_rebuild_command_repairs_drift(self):
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=800)
+        # Queryset writes bypass Inventory.save and leave the totals stale
+        Inventory.objects.filter(item=self.flour).update(quantity=600)
+
+        out = StringIO()
+        call_command('rebuild_on_hand', '--check', stdout=out)
+        self.assertIn('1 mismatched items', out.getvalue())
+        self.assertEqual(self._on_hand(self.flour), 800)
+
+        call_command('rebuild_on_hand', stdout=StringIO())
+        self.assertEqual(self._on_hand(self.flour), 600)
+        self.assertEqual(LocationOnHand.objects.get(item=self.flour, location=self.shelf).quantity, 600)
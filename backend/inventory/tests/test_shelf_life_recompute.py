@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, ExpirationRecompute
+from inventory.services.inventory_service import InventoryService
+
+
+class ShelfLifeRecomputeTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.it_user = CustomUser.objects.create_user(username="it", password="password", role='it')
+        self.location = Location.objects.create(store=self.store, name="Walk-in")
+        self.item = Item.objects.create(name="Milk", type="ingredient", base_unit="ml", shelf_life_days=10)
+        self.other = Item.objects.create(name="Cream", type="ingredient", base_unit="ml", shelf_life_days=10)
+
+        now = timezone.now()
+        self.batches = [
+            Inventory.objects.create(store=self.store, item=self.item, location=self.location, quantity=1,
+                                     created_at=now - timedelta(days=age), expiration_date=expiry)
+            for age, expiry in ((1, now + timedelta(days=9)), (3, None), (5, now + timedelta(days=5)))
+        ]
+        self.untouched = Inventory.objects.create(store=self.store, item=self.other, location=self.location,
+                                                  quantity=1, expiration_date=now + timedelta(days=10))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.it_user)
+
+    def test_patch_reprojects_every_batch_from_created_at(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.patch(f'/api/inventory/items/{self.item.id}/', {"shelf_life_days": 20}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        for batch in self.batches:
+            batch.refresh_from_db()
+            self.assertEqual(batch.expiration_date, batch.created_at + timedelta(days=20))
+        expiry = self.untouched.expiration_date
+        self.untouched.refresh_from_db()
+        self.assertEqual(self.untouched.expiration_date, expiry)
+
+    def test_recompute_is_one_update(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(InventoryService.recompute_expirations(self.item.id, 7), 3)
+
+    @override_settings(EXPIRATION_RECOMPUTE_INLINE_LIMIT=2)
+    def test_large_items_are_deferred(self):
+        self.item.shelf_life_days = 20
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertTrue(InventoryService.schedule_expiration_recompute(self.item))
+        self.assertEqual(len(callbacks), 1)
+        # Nothing written inside the request
+        batch = Inventory.objects.get(id=self.batches[0].id)
+        self.assertNotEqual(batch.expiration_date, batch.created_at + timedelta(days=20))
+        self.assertTrue(ExpirationRecompute.objects.filter(item=self.item).exists())
+
+    @override_settings(EXPIRATION_RECOMPUTE_INLINE_LIMIT=2)
+    def test_queued_job_uses_latest_shelf_life(self):
+        for days in (20, 30):
+            self.item.shelf_life_days = days
+            self.item.save()
+            InventoryService.schedule_expiration_recompute(self.item)
+        self.assertEqual(ExpirationRecompute.objects.count(), 1)
+
+        # An older scheduled value must not win over the item's current shelf life
+        Item.objects.filter(id=self.item.id).update(shelf_life_days=40)
+        self.assertEqual(InventoryService.run_expiration_recomputes(), {'done': 1, 'failed': 0})
+        for batch in self.batches:
+            batch.refresh_from_db()
+            self.assertEqual(batch.expiration_date, batch.created_at + timedelta(days=40))
+        self.assertFalse(ExpirationRecompute.objects.exists())
+
+    @override_settings(EXPIRATION_RECOMPUTE_INLINE_LIMIT=2)
+    def test_failed_job_stays_queued_for_command(self):
+        self.item.shelf_life_days = 20
+        self.item.save()
+        InventoryService.schedule_expiration_recompute(self.item)
+
+        with mock.patch.object(InventoryService, 'recompute_expirations', side_effect=RuntimeError("db gone")):
+            self.assertEqual(InventoryService.run_expiration_recomputes(), {'done': 0, 'failed': 1})
+        job = ExpirationRecompute.objects.get(item=self.item)
+        self.assertEqual((job.attempts, job.last_error), (1, "db gone"))
+
+        out = StringIO()
+        call_command('recompute_expirations', stdout=out)
+        self.assertIn("Recomputed expirations for 1 items", out.getvalue())
+        self.assertFalse(ExpirationRecompute.objects.exists())
+        batch = Inventory.objects.get(id=self.batches[0].id)
+        self.assertEqual(batch.expiration_date, batch.created_at + timedelta(days=20))
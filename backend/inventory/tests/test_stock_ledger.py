@@ -0,0 +1,82 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, OnHand, ProductionLog, Recipe, RecipeIngredient, ReceivingLog, StockMovement, StockCheckpoint
+from inventory.services.inventory_service import InventoryService
+from inventory.services.ledger_service import LedgerService
+
+
+class StockLedgerTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g")
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="unit")
+        self.recipe = Recipe.objects.create(item=self.bread, yield_quantity=10)
+        RecipeIngredient.objects.create(recipe=self.recipe, ingredient_item=self.flour, quantity_required=500)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def ledger_total(self, item):
+        return StockMovement.objects.filter(store=self.store, item=item).aggregate(total=Sum('quantity'))['total']
+
+    def test_mutations_append_labelled_movements(self):
+        receiving = ReceivingLog.objects.create(store=self.store, user=self.user, item=self.flour, quantity=2000)
+        InventoryService.process_receiving_log(receiving)
+        production = ProductionLog.objects.create(
+            store=self.store, user=self.user, recipe=self.recipe, quantity_made=1, unit_type="Batch", target_location=self.shelf
+        )
+        InventoryService.process_production_log(production)
+
+        movements = list(StockMovement.objects.order_by('id').values_list('item_id', 'quantity', 'reason', 'reference'))
+        self.assertEqual(movements, [
+            (self.flour.id, 2000, StockMovement.RECEIVING, f"receiving:{receiving.id}"),
+            (self.flour.id, -500, StockMovement.PRODUCTION, f"production:{production.id}"),
+            (self.bread.id, 10, StockMovement.PRODUCTION, f"production:{production.id}"),
+        ])
+        for item in (self.flour, self.bread):
+            self.assertEqual(self.ledger_total(item), OnHand.objects.get(store=self.store, item=item).quantity)
+
+    def test_direct_edits_are_adjustments(self):
+        batch = Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=5)
+        batch.quantity = 3
+        batch.save()
+        self.assertEqual(list(StockMovement.objects.values_list('quantity', 'reason')), [(5, 'adjustment'), (-2, 'adjustment')])
+
+    def test_stock_at_with_and_without_checkpoint(self):
+        now = timezone.now()
+        monday, tuesday, wednesday = now - timedelta(days=3), now - timedelta(days=2), now - timedelta(days=1)
+        for quantity, when in ((100, monday), (-30, tuesday), (50, wednesday)):
+            StockMovement.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=quantity, timestamp=when)
+
+        key = (self.flour.id, self.shelf.id)
+        self.assertEqual(LedgerService.stock_at(self.store.id, tuesday + timedelta(hours=6)), {key: 70})
+
+        self.assertEqual(LedgerService.checkpoint(self.store.id, tuesday + timedelta(hours=1)), 1)
+        self.assertEqual(LedgerService.checkpoint(self.store.id, tuesday + timedelta(hours=1)), 0)
+        with self.assertNumQueries(3):
+            self.assertEqual(LedgerService.stock_at(self.store.id, tuesday + timedelta(hours=6)), {key: 70})
+        self.assertEqual(LedgerService.stock_at(self.store.id, now), {key: 120})
+        self.assertEqual(LedgerService.stock_at(self.store.id, monday - timedelta(hours=1)), {})
+
+        call_command('checkpoint_stock', stdout=StringIO())
+        self.assertEqual(StockCheckpoint.objects.filter(store=self.store).count(), 2)
+        self.assertEqual(LedgerService.stock_at(self.store.id, now), {key: 120})
+
+    def test_stock_at_endpoint(self):
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=40)
+        resp = self.client.get('/api/inventory/stock-at/', {'at': timezone.now().isoformat()})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['item_name'], row['quantity']) for row in resp.data['positions']], [('Flour', 40)])
+        self.assertEqual(self.client.get('/api/inventory/stock-at/').status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = self.client.get('/api/inventory/stock-movements/', {'item': self.flour.id})
+        self.assertEqual(resp.data['results'][0]['quantity'], 40)
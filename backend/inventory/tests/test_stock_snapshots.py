@@ -0,0 +1,56 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, StockMovement, StockSnapshot
+from inventory.services.inventory_service import InventoryService
+
+
+class StockSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.fridge = Location.objects.create(store=self.store, name="Fridge")
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="unit")
+        self.today = timezone.localdate()
+
+        def move(days_ago, hour, quantity, location):
+            when = InventoryService.start_of_business_day(self.today - timedelta(days=days_ago)) + timedelta(hours=hour)
+            StockMovement.objects.create(store=self.store, item=self.bread, location=location, quantity=quantity, timestamp=when)
+
+        move(5, 9, 20, self.shelf)
+        move(5, 10, 5, self.fridge)
+        move(3, 9, -8, self.shelf)
+        move(3, 0, -5, self.fridge)  # exactly at the start of the day: belongs to that day
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def positions(self, day):
+        return {
+            (location_id, quantity)
+            for location_id, quantity in StockSnapshot.objects.filter(store=self.store, date=day).values_list('location_id', 'quantity')
+        }
+
+    def test_backfill_and_rerun(self):
+        out = StringIO()
+        call_command('snapshot_stock', '--days', '6', stdout=out)
+        self.assertEqual(self.positions(self.today - timedelta(days=5)), set())
+        self.assertEqual(self.positions(self.today - timedelta(days=4)), {(self.shelf.id, 20), (self.fridge.id, 5)})
+        self.assertEqual(self.positions(self.today - timedelta(days=3)), {(self.shelf.id, 20), (self.fridge.id, 5)})
+        self.assertEqual(self.positions(self.today), {(self.shelf.id, 12)})
+
+        call_command('snapshot_stock', stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.filter(date=self.today).count(), 1)
+
+    def test_analytics_reads_opening_and_closing_stock(self):
+        call_command('snapshot_stock', '--days', '6', stdout=StringIO())
+        start, end = self.today - timedelta(days=4), self.today - timedelta(days=2)
+        resp = self.client.get('/api/inventory/analytics/', {'start': start.isoformat(), 'end': end.isoformat()})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([(row['item__name'], row['total_quantity']) for row in resp.data['opening_stock']], [('Bread', 25)])
+        self.assertEqual([(row['item__name'], row['total_quantity']) for row in resp.data['closing_stock']], [('Bread', 12)])
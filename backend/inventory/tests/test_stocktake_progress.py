@@ -0,0 +1,67 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, StocktakeSession, StocktakeSubSession, StocktakeRecord
+
+
+class StocktakeProgressTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="counter", password="password", store=self.store)
+        self.freezer = Location.objects.create(store=self.store, name="Freezer")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+
+        self.items = [Item.objects.create(name=f"Item {i}", type="ingredient", base_unit="g") for i in range(3)]
+        for item in self.items:
+            Inventory.objects.create(store=self.store, item=item, location=self.shelf, quantity=5)
+            Inventory.objects.create(store=self.store, item=item, location=self.shelf, quantity=2)
+        # Drained batches are not expected to be counted
+        Inventory.objects.create(store=self.store, item=self.items[0], location=self.freezer, quantity=0)
+
+        self.session = StocktakeSession.objects.create(store=self.store, user=self.user, status='PENDING', type='FULL')
+        for item in self.items[:2]:
+            StocktakeRecord.objects.create(session=self.session, item=item, location=self.shelf, quantity_counted=7)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_progress_per_location(self):
+        resp = self.client.get(f'/api/inventory/stocktake-sessions/{self.session.id}/progress/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        by_location = {row['location_id']: row for row in resp.data['locations']}
+        self.assertEqual(by_location[self.shelf.id]['records_counted'], 2)
+        self.assertEqual(by_location[self.shelf.id]['items_expected'], 3)
+        self.assertIsNotNone(by_location[self.shelf.id]['last_saved_at'])
+
+        self.assertEqual(by_location[self.freezer.id]['records_counted'], 0)
+        self.assertEqual(by_location[self.freezer.id]['items_expected'], 0)
+        self.assertIsNone(by_location[self.freezer.id]['last_saved_at'])
+
+    def test_sub_session_counts_are_not_double_counted(self):
+        # Before merge the same item can be counted at session level and in the sub-session
+        sub_session = StocktakeSubSession.objects.create(session=self.session, location=self.shelf)
+        for item in self.items:
+            StocktakeRecord.objects.create(session=self.session, sub_session=sub_session, item=item, location=self.shelf, quantity_counted=7)
+
+        resp = self.client.get(f'/api/inventory/stocktake-sessions/{self.session.id}/progress/')
+        by_location = {row['location_id']: row for row in resp.data['locations']}
+        self.assertEqual(by_location[self.shelf.id]['records_counted'], 3)
+        self.assertEqual(by_location[self.shelf.id]['sub_session_status'], 'PENDING')
+
+    def test_records_cursor_pagination(self):
+        url = f'/api/inventory/stocktake-sessions/{self.session.id}/records/'
+        first = self.client.get(url, {'page_size': 1})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data['results']), 1)
+        self.assertEqual(first.data['results'][0]['item_name'], 'Item 0')
+        self.assertEqual(first.data['results'][0]['location_name'], 'Shelf')
+        self.assertIsNotNone(first.data['next'])
+
+        second = self.client.get(first.data['next'])
+        self.assertEqual(second.data['results'][0]['item_name'], 'Item 1')
+        self.assertIsNone(second.data['next'])
+
+        filtered = self.client.get(url, {'location': self.freezer.id})
+        self.assertEqual(filtered.data['results'], [])
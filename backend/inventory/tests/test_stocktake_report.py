@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import (
+    Item, Location, Inventory, Recipe, RecipeIngredient, ProductionLog, ReceivingLog,
+    StocktakeSession, StocktakeRecord, StocktakeReportLine, VarianceLog
+)
+from inventory.services.inventory_service import InventoryService
+
+
+class StocktakeReportTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="manager", password="password", store=self.store)
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.fridge = Location.objects.create(store=self.store, name="Fridge")
+
+        self.flour = Item.objects.create(name="Flour", type="ingredient", base_unit="g", shelf_life_days=None)
+        self.bread = Item.objects.create(name="Bread", type="product", base_unit="loaf", shelf_life_days=2)
+        self.recipe = Recipe.objects.create(item=self.bread, yield_quantity=10)
+        RecipeIngredient.objects.create(recipe=self.recipe, ingredient_item=self.flour, quantity_required=1000)
+
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=3000)
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.fridge, quantity=500)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _session(self, counts):
+        session = StocktakeSession.objects.create(store=self.store, user=self.user, status='PENDING', type='FULL')
+        for item, location, qty in counts:
+            StocktakeRecord.objects.create(session=session, item=item, location=location, quantity_counted=qty)
+        return session
+
+    def test_finalize_persists_report_and_variances(self):
+        ReceivingLog.objects.create(store=self.store, item=self.flour, quantity=250, user=self.user)
+        ProductionLog.objects.create(store=self.store, user=self.user, recipe=self.recipe, quantity_made=2, unit_type="Batch")
+        ProductionLog.objects.create(store=self.store, user=self.user, recipe=self.recipe, quantity_made=5, unit_type="loaf")
+        session = self._session([(self.flour, self.shelf, 2800), (self.flour, self.fridge, 500)])
+
+        resp = self.client.post(f'/api/inventory/stocktake-sessions/{session.id}/finalize/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        line = StocktakeReportLine.objects.get(session=session, item=self.flour)
+        self.assertEqual(line.system_quantity, 3500)
+        self.assertEqual(line.end_quantity, 3300)
+        self.assertEqual(line.variance, -200)
+        self.assertEqual(line.received_quantity, 250)
+        # 2 batches + 5 loaves / 10 per batch = 2.5 batches of 1000 g
+        self.assertAlmostEqual(line.theoretical_usage, 2500)
+
+        # Only the location that was off gets a variance row
+        logs = VarianceLog.objects.filter(session=session)
+        self.assertEqual(logs.count(), 1)
+        self.assertEqual(logs[0].location, self.shelf)
+        self.assertEqual(logs[0].variance, -200)
+        self.assertEqual(logs[0].user, self.user)
+
+    def test_report_endpoint_reads_stored_rows(self):
+        session = self._session([(self.flour, self.shelf, 1000)])
+        self.client.post(f'/api/inventory/stocktake-sessions/{session.id}/finalize/')
+
+        # Later stock movements don't change the historical report
+        Inventory.objects.create(store=self.store, item=self.flour, location=self.shelf, quantity=9999)
+
+        resp = self.client.get(f'/api/inventory/stocktake-sessions/{session.id}/report/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data['report']), 1)
+        self.assertEqual(resp.data['report'][0]['system_quantity'], 3500)
+        self.assertEqual(resp.data['report'][0]['end_quantity'], 1000)
+        self.assertEqual([v['location'] for v in resp.data['variances']], [self.shelf.id])
+
+    def test_finalize_query_count_independent_of_item_count(self):
+        def run(count):
+            counts = []
+            for i in range(count):
+                item = Item.objects.create(name=f"Item {count}-{i}", type="ingredient", base_unit="g")
+                Inventory.objects.create(store=self.store, item=item, location=self.shelf, quantity=10)
+                counts.append((item, self.shelf, 7))
+            session = self._session(counts)
+            with CaptureQueriesContext(connection) as ctx:
+                InventoryService.finalize_stocktake_session(session)
+            return len(ctx.captured_queries)
+
+        # The first finalize has no previous session to compute start quantities from
+        run(1)
+        self.assertEqual(run(2), run(20))
@@ -0,0 +1,127 @@
+from unittest import mock
+from django.test import TestCase
+from django.db.models import Sum
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, StocktakeSession, StocktakeSubSession, StocktakeRecord
+from inventory.services.inventory_service import InventoryService
+from inventory.services.stocktake_service import StocktakeService, StocktakeClosedError
+from inventory.views import StocktakeSubSessionViewSet
+
+
+class StocktakeSubSessionTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.alice = CustomUser.objects.create_user(username="alice", password="password", store=self.store)
+        self.bob = CustomUser.objects.create_user(username="bob", password="password", store=self.store)
+        self.freezer = Location.objects.create(store=self.store, name="Freezer")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+
+        self.oats = Item.objects.create(name="Oats", type="ingredient", base_unit="g", shelf_life_days=None)
+        Inventory.objects.create(store=self.store, item=self.oats, location=self.shelf, quantity=100)
+
+        self.session = StocktakeSession.objects.create(store=self.store, user=self.alice, status='PENDING', type='FULL')
+        self.alice_client = APIClient()
+        self.alice_client.force_authenticate(user=self.alice)
+        self.bob_client = APIClient()
+        self.bob_client.force_authenticate(user=self.bob)
+
+    def _split(self):
+        resp = self.alice_client.post(f'/api/inventory/stocktake-sessions/{self.session.id}/split/', {}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return {sub['location']: sub['id'] for sub in resp.data}
+
+    def test_split_creates_one_sub_session_per_location(self):
+        subs = self._split()
+        self.assertEqual(set(subs), {self.freezer.id, self.shelf.id})
+        # Splitting again is idempotent
+        self._split()
+        self.assertEqual(StocktakeSubSession.objects.filter(session=self.session).count(), 2)
+
+    def test_parallel_counters_merge_at_finalize(self):
+        subs = self._split()
+
+        self.alice_client.post(f'/api/inventory/stocktake-sub-sessions/{subs[self.shelf.id]}/save_records/', {
+            "records": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 60}]
+        }, format='json')
+        self.bob_client.post(f'/api/inventory/stocktake-sub-sessions/{subs[self.freezer.id]}/save_records/', {
+            "records": [{"item_id": self.oats.id, "location_id": self.freezer.id, "quantity_counted": 15}]
+        }, format='json')
+
+        # Cursors are per sub-session; the parent session row is never written
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.sync_cursor, 0)
+        self.assertEqual(StocktakeSubSession.objects.get(id=subs[self.freezer.id]).user, self.bob)
+
+        resp = self.alice_client.post(f'/api/inventory/stocktake-sessions/{self.session.id}/finalize/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(Inventory.objects.get(item=self.oats, location=self.shelf).quantity, 60)
+        self.assertEqual(Inventory.objects.get(item=self.oats, location=self.freezer).quantity, 15)
+        self.assertFalse(StocktakeSubSession.objects.filter(session=self.session, status='PENDING').exists())
+
+    def test_sub_session_rejects_other_locations(self):
+        subs = self._split()
+        resp = self.bob_client.post(f'/api/inventory/stocktake-sub-sessions/{subs[self.freezer.id]}/save_records/', {
+            "records": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 5}]
+        }, format='json')
+        self.assertEqual(resp.data['count'], 0)
+        self.assertFalse(StocktakeRecord.objects.exists())
+
+    def test_sub_session_counts_replace_session_level_records(self):
+        StocktakeRecord.objects.create(session=self.session, item=self.oats, location=self.shelf, quantity_counted=999)
+        subs = self._split()
+        self.alice_client.post(f'/api/inventory/stocktake-sub-sessions/{subs[self.shelf.id]}/save_records/', {
+            "records": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 40}]
+        }, format='json')
+
+        self.alice_client.post(f'/api/inventory/stocktake-sessions/{self.session.id}/finalize/')
+        total = Inventory.objects.filter(item=self.oats).aggregate(Sum('quantity'))['quantity__sum']
+        self.assertEqual(total, 40)
+
+    def test_submitted_sub_session_is_closed(self):
+        subs = self._split()
+        url = f'/api/inventory/stocktake-sub-sessions/{subs[self.shelf.id]}/'
+        self.assertEqual(self.alice_client.post(url + 'submit/').status_code, status.HTTP_200_OK)
+        resp = self.alice_client.post(url + 'save_records/', {"records": []}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sub_session_sync_matches_session_protocol(self):
+        subs = self._split()
+        url = f'/api/inventory/stocktake-sub-sessions/{subs[self.freezer.id]}/sync/'
+
+        resp = self.bob_client.post(url, {"changes": []}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.bob_client.post(url, {"device_id": "tablet", "changes": {}}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = self.bob_client.post(url, {"device_id": "tablet", "since": 0, "changes": [
+            {"item_id": self.oats.id, "location_id": self.freezer.id, "quantity_counted": 15, "seq": 1}
+        ]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual((resp.data['cursor'], resp.data['applied'], resp.data['skipped']), (1, 1, 0))
+        self.assertEqual([change['quantity_counted'] for change in resp.data['changes']], [15])
+        self.assertEqual(StocktakeSubSession.objects.get(id=subs[self.freezer.id]).user, self.bob)
+
+    def test_save_racing_finalize_is_rejected(self):
+        subs = self._split()
+        url = f'/api/inventory/stocktake-sub-sessions/{subs[self.shelf.id]}/save_records/'
+
+        # Finalize lands after the view's open check but before the write
+        def finalize_after_check(view, sub_session):
+            InventoryService.finalize_stocktake_session(StocktakeSession.objects.get(id=self.session.id))
+
+        with mock.patch.object(StocktakeSubSessionViewSet, '_check_open', finalize_after_check):
+            resp = self.alice_client.post(url, {
+                "records": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 60}]
+            }, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StocktakeRecord.objects.exists())
+
+        # Same for a session-level save holding a stale copy of the session
+        stale = StocktakeSession.objects.create(store=self.store, user=self.alice, status='PENDING', type='FULL')
+        StocktakeSession.objects.filter(id=stale.id).update(status='COMPLETED')
+        with self.assertRaises(StocktakeClosedError):
+            StocktakeService.apply_counts(stale, [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 5}])
+        self.assertFalse(StocktakeRecord.objects.exists())
@@ -0,0 +1,118 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, UnitConversion, StocktakeSession, StocktakeRecord, StocktakeDeviceCursor
+
+
+class StocktakeDeltaSyncTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.user = CustomUser.objects.create_user(username="counter", password="password", store=self.store)
+        self.freezer = Location.objects.create(store=self.store, name="Walk-in Freezer")
+        self.shelf = Location.objects.create(store=self.store, name="Dry Shelf")
+
+        self.berries = Item.objects.create(name="Berries", type="ingredient", base_unit="g")
+        self.oats = Item.objects.create(name="Oats", type="ingredient", base_unit="g")
+        UnitConversion.objects.create(item=self.berries, unit_name="Bag", factor=500)
+
+        self.session = StocktakeSession.objects.create(store=self.store, user=self.user, status='PENDING', type='FULL')
+        self.url = f'/api/inventory/stocktake-sessions/{self.session.id}/sync/'
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_replayed_changes_are_applied_once(self):
+        payload = {
+            "device_id": "tablet-1",
+            "since": 0,
+            "changes": [
+                {"item_id": self.berries.id, "location_id": self.freezer.id, "quantity_counted": 2, "unit_name": "Bag", "seq": 1},
+                {"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 750, "seq": 2},
+            ]
+        }
+        first = self.client.post(self.url, payload, format='json')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['applied'], 2)
+        self.assertEqual(first.data['cursor'], 2)
+
+        # Connection dropped before the client saw the response: it resends the same outbox
+        replay = self.client.post(self.url, payload, format='json')
+        self.assertEqual(replay.data['applied'], 0)
+        self.assertEqual(replay.data['skipped'], 2)
+        self.assertEqual(replay.data['cursor'], 2)
+
+        self.assertEqual(StocktakeRecord.objects.filter(session=self.session).count(), 2)
+        berries = StocktakeRecord.objects.get(session=self.session, item=self.berries)
+        self.assertEqual(berries.quantity_counted, 1000)
+
+    def test_stale_change_does_not_override_newer_one(self):
+        self.client.post(self.url, {
+            "device_id": "tablet-1",
+            "changes": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 10, "seq": 5}]
+        }, format='json')
+        resp = self.client.post(self.url, {
+            "device_id": "tablet-1",
+            "changes": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 3, "seq": 4}]
+        }, format='json')
+        self.assertEqual(resp.data['applied'], 0)
+        self.assertEqual(StocktakeRecord.objects.get(session=self.session, item=self.oats).quantity_counted, 10)
+
+    def test_replay_after_another_device_keeps_newer_count(self):
+        def send(device, quantity, seq):
+            return self.client.post(self.url, {
+                "device_id": device,
+                "changes": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": quantity, "seq": seq}]
+            }, format='json')
+
+        send("tablet-a", 5, 1)
+        send("tablet-b", 9, 1)
+        # tablet-a retries its already-applied change after tablet-b wrote the row
+        resp = send("tablet-a", 5, 1)
+        self.assertEqual(resp.data['applied'], 0)
+        self.assertEqual(StocktakeRecord.objects.get(session=self.session, item=self.oats).quantity_counted, 9)
+
+    def test_batch_resent_out_of_order_still_applies(self):
+        def send(*changes):
+            return self.client.post(self.url, {"device_id": "tablet-1", "changes": [
+                {"item_id": item.id, "location_id": location.id, "quantity_counted": quantity, "seq": seq}
+                for item, location, quantity, seq in changes
+            ]}, format='json')
+
+        # Batch 5-6 is lost in transit; 7 arrives first, then 5-6 is resent
+        send((self.oats, self.shelf, 30, 7))
+        resp = send((self.berries, self.freezer, 400, 5), (self.oats, self.shelf, 20, 6))
+        self.assertEqual((resp.data['applied'], resp.data['skipped']), (1, 1))
+        self.assertEqual(StocktakeRecord.objects.get(session=self.session, item=self.berries).quantity_counted, 400)
+        # The row counted again at seq 7 keeps that count
+        self.assertEqual(StocktakeRecord.objects.get(session=self.session, item=self.oats).quantity_counted, 30)
+
+        # Resending it once more is a plain replay
+        resp = send((self.berries, self.freezer, 400, 5))
+        self.assertEqual((resp.data['applied'], resp.data['skipped']), (0, 1))
+        self.assertEqual(StocktakeDeviceCursor.objects.get(device_id="tablet-1").applied_seqs, [[5, 5], [7, 7]])
+
+    def test_pull_returns_changes_after_cursor(self):
+        self.client.post(self.url, {
+            "device_id": "tablet-1",
+            "changes": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 10, "seq": 1}]
+        }, format='json')
+        resp = self.client.post(self.url, {
+            "device_id": "tablet-2",
+            "since": 1,
+            "changes": [{"item_id": self.berries.id, "location_id": self.freezer.id, "quantity_counted": 400, "seq": 1}]
+        }, format='json')
+        self.assertEqual(resp.data['cursor'], 2)
+        self.assertEqual([c['item'] for c in resp.data['changes']], [self.berries.id])
+
+        # A fresh device pulls everything
+        resp = self.client.post(self.url, {"device_id": "tablet-3", "since": 0, "changes": []}, format='json')
+        self.assertEqual(len(resp.data['changes']), 2)
+
+    def test_save_records_advances_cursor(self):
+        resp = self.client.post(f'/api/inventory/stocktake-sessions/{self.session.id}/save_records/', {
+            "records": [{"item_id": self.oats.id, "location_id": self.shelf.id, "quantity_counted": 10}]
+        }, format='json')
+        self.assertEqual(resp.data['count'], 1)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.sync_cursor, 1)
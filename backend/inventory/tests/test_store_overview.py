@@ -0,0 +1,54 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import Store, CustomUser
+from inventory.models import Item, Location, Inventory, StoreItemSettings, StocktakeSession, ExpiredItemLog
+
+
+class StoreOverviewTestCase(TestCase):
+    def setUp(self):
+        self.it_user = CustomUser.objects.create_user(username="it", password="password", role='it')
+        self.item = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.it_user)
+
+    def _store(self, name, expired=0):
+        store = Store.objects.create(name=name)
+        shelf = Location.objects.create(store=store, name="Shelf")
+        StoreItemSettings.objects.create(store=store, item=self.item, par=100)
+        Inventory.objects.create(store=store, item=self.item, location=shelf, quantity=10)
+        for _ in range(expired):
+            Inventory.objects.create(store=store, item=self.item, location=shelf, quantity=1, expiration_date=timezone.now() - timedelta(days=3))
+        return store
+
+    def test_kpis_per_store(self):
+        a = self._store("A", expired=2)
+        b = self._store("B")
+        StocktakeSession.objects.create(store=a, status='COMPLETED', completed_at=timezone.now())
+        ExpiredItemLog.objects.create(store=b, item=self.item, quantity_expired=4, user=self.it_user)
+
+        resp = self.client.get('/api/inventory/stores/overview/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        rows = {row['store_name']: row for row in resp.data['stores']}
+        self.assertEqual(rows['A']['expired_count'], 2)
+        self.assertEqual(rows['A']['batch_count'], 3)
+        self.assertEqual(rows['A']['low_stock_count'], 1)
+        self.assertIsNotNone(rows['A']['last_stocktake_at'])
+        self.assertIsNone(rows['B']['last_stocktake_at'])
+        self.assertEqual(rows['B']['waste_7d_quantity'], 4)
+
+    def test_query_count_independent_of_store_count(self):
+        self._store("A", expired=1)
+        with self.assertNumQueries(5):
+            self.client.get('/api/inventory/stores/overview/')
+        for i in range(10):
+            self._store(f"Store {i}", expired=i % 3)
+        with self.assertNumQueries(5):
+            self.client.get('/api/inventory/stores/overview/')
+
+    def test_it_only(self):
+        manager = CustomUser.objects.create_user(username="manager", password="password", store=self._store("A"))
+        self.client.force_authenticate(user=manager)
+        self.assertEqual(self.client.get('/api/inventory/stores/overview/').status_code, status.HTTP_403_FORBIDDEN)
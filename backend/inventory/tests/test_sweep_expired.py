@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from users.models import Store
+from inventory.models import Item, Location, Inventory, ExpiredItemLog, OnHand
+from inventory.services.inventory_service import InventoryService
+
+
+class SweepExpiredTestCase(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Test Store")
+        self.other_store = Store.objects.create(name="Other Store")
+        self.shelf = Location.objects.create(store=self.store, name="Shelf")
+        self.other_shelf = Location.objects.create(store=self.other_store, name="Shelf")
+        self.milk = Item.objects.create(name="Milk", type="ingredient", base_unit="ml")
+
+        start_of_today = InventoryService.start_of_business_day()
+        for i in range(5):
+            Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=10, expiration_date=start_of_today - timedelta(days=i + 1))
+        # Drained batch: removed but not logged
+        Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=0, expiration_date=start_of_today - timedelta(days=2))
+        # Expires later today (business day), not yet expired
+        self.today_batch = Inventory.objects.create(store=self.store, item=self.milk, location=self.shelf, quantity=7, expiration_date=start_of_today + timedelta(minutes=1))
+        Inventory.objects.create(store=self.other_store, item=self.milk, location=self.other_shelf, quantity=3, expiration_date=start_of_today - timedelta(days=1))
+
+    def test_business_day_boundary_is_local_midnight(self):
+        start = InventoryService.start_of_business_day(datetime(2026, 1, 15).date())
+        self.assertEqual(timezone.localtime(start).hour, 0)
+        self.assertEqual(timezone.localtime(start).date(), datetime(2026, 1, 15).date())
+
+    def test_dry_run_writes_nothing(self):
+        out = StringIO()
+        call_command('sweep_expired', '--dry-run', stdout=out)
+        self.assertIn('Would sweep 7 batches (6 logged)', out.getvalue())
+        self.assertEqual(Inventory.objects.count(), 8)
+        self.assertFalse(ExpiredItemLog.objects.exists())
+
+    def test_sweep_in_chunks(self):
+        out = StringIO()
+        call_command('sweep_expired', '--store', str(self.store.id), '--chunk-size', '2', stdout=out)
+        self.assertIn('Test Store: 6 expired batches, 5 logged', out.getvalue())
+
+        self.assertEqual(list(Inventory.objects.filter(store=self.store)), [self.today_batch])
+        self.assertEqual(ExpiredItemLog.objects.filter(store=self.store).count(), 5)
+        self.assertEqual(OnHand.objects.get(store=self.store, item=self.milk).quantity, 7)
+        # Other store untouched
+        self.assertEqual(Inventory.objects.filter(store=self.other_store).count(), 1)
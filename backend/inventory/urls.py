@@ -1,10 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    ItemViewSet, DashboardStatsView, ProductionLogViewSet, StocktakeView, 
+    ItemViewSet, DashboardStatsView, DashboardCacheStatsView, ProductionLogViewSet, StocktakeView, 
     InventoryViewSet, LocationViewSet, UnitConversionViewSet, RecipeViewSet,
-    ReceivingLogViewSet, StocktakeSessionViewSet, ExpiredItemLogViewSet,
-    AnalyticsView
+    ReceivingLogViewSet, StocktakeSessionViewSet, StocktakeSubSessionViewSet, ExpiredItemLogViewSet,
+    AnalyticsView, StoreOverviewView, DemandForecastViewSet, StockMovementViewSet, StockSnapshotViewSet, StockAtView, LogArchiveView
 )
 
 router = DefaultRouter()
@@ -13,14 +13,22 @@ router.register(r'recipes', RecipeViewSet)
 router.register(r'production-logs', ProductionLogViewSet)
 router.register(r'receiving-logs', ReceivingLogViewSet)
 router.register(r'stocktake-sessions', StocktakeSessionViewSet)
+router.register(r'stocktake-sub-sessions', StocktakeSubSessionViewSet)
 router.register(r'inventory', InventoryViewSet)
 router.register(r'locations', LocationViewSet)
 router.register(r'unit-conversions', UnitConversionViewSet)
 router.register(r'expired-logs', ExpiredItemLogViewSet)
+router.register(r'forecasts', DemandForecastViewSet)
+router.register(r'stock-movements', StockMovementViewSet)
+router.register(r'stock-snapshots', StockSnapshotViewSet)
 
 urlpatterns = [
     path('inventory/dashboard/stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('inventory/dashboard/cache/', DashboardCacheStatsView.as_view(), name='dashboard-cache'),
     path('inventory/stocktake/', StocktakeView.as_view(), name='stocktake'),
     path('inventory/analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('inventory/stock-at/', StockAtView.as_view(), name='stock-at'),
+    path('inventory/archives/', LogArchiveView.as_view(), name='log-archives'),
+    path('inventory/stores/overview/', StoreOverviewView.as_view(), name='store-overview'),
     path('inventory/', include(router.urls)),
 ]
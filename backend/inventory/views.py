@@ -2,16 +2,78 @@ from rest_framework import viewsets, permissions, filters, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Q, Sum
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from .models import Item, Inventory, ProductionLog, VarianceLog, Location, UnitConversion, Recipe, ReceivingLog, StocktakeSession, StocktakeRecord, ExpiredItemLog, RecipeIngredient, DailyUsage
-from .serializers import ItemSerializer, InventorySerializer, ProductionLogSerializer, VarianceLogSerializer, LocationSerializer, UnitConversionSerializer, RecipeSerializer, ReceivingLogSerializer, StocktakeSessionSerializer, StocktakeRecordSerializer, ExpiredItemLogSerializer
+from .models import Item, Inventory, Tombstone, ProductionLog, VarianceLog, Location, UnitConversion, Recipe, ReceivingLog, StocktakeSession, StocktakeSubSession, StocktakeRecord, ExpiredItemLog, LocationOnHand, UsageRollup, DemandForecast, StockMovement, StockSnapshot
+from .serializers import ItemSerializer, InventorySerializer, ProductionLogSerializer, VarianceLogSerializer, LocationSerializer, UnitConversionSerializer, RecipeSerializer, ReceivingLogSerializer, StocktakeSessionSerializer, StocktakeSubSessionSerializer, StocktakeRecordSerializer, StocktakeReportLineSerializer, ExpiredItemLogSerializer, DemandForecastSerializer, StockMovementSerializer, StockSnapshotSerializer
 from .services.inventory_service import InventoryService
-from datetime import timedelta
+from .services.stocktake_service import StocktakeService, StocktakeClosedError
+from .services.dashboard_cache import DashboardCache
+from .services.usage_service import UsageService
+from .services.ledger_service import LedgerService
+from users.views import IsITAdmin
+from datetime import date, datetime, timedelta
+
+class UpdatedSinceMixin:
+    """
+    Delta sync for list endpoints. ?updated_since=<ISO datetime> (the cursor from the
+    previous sync) returns, unpaginated:
+    {"cursor", "reset", "results": rows changed since, "deleted": ids deleted since}.
+    A cursor older than the tombstone retention (or the first sync, with any old
+    timestamp) gets every row and "reset": true, meaning replace the local cache.
+    The window reaches back `sync_overlap` to catch writes that committed just after the
+    previous cursor was taken, so a few rows may come back twice.
+    Tombstones from other stores are hidden unless sees_all_stores(user), which viewsets
+    override to match the check their get_queryset uses.
+    """
+    sync_overlap = timedelta(seconds=5)
+
+    def sees_all_stores(self, user):
+        return getattr(user, 'role', '') == 'it' or user.is_superuser
+
+    def changed_since(self, queryset, since):
+        return queryset.filter(updated_at__gte=since)
+
+    def list(self, request, *args, **kwargs):
+        raw_since = request.query_params.get('updated_since')
+        if not raw_since:
+            return super().list(request, *args, **kwargs)
+        try:
+            since = datetime.fromisoformat(raw_since)
+        except ValueError:
+            return Response({"error": "Invalid updated_since"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        from django.conf import settings
+        cursor = timezone.now()
+        retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+        reset = since < cursor - retention
+
+        queryset = self.filter_queryset(self.get_queryset())
+        deleted = []
+        if not reset:
+            window = since - self.sync_overlap
+            queryset = self.changed_since(queryset, window)
+            tombstones = Tombstone.objects.filter(model=queryset.model._meta.label_lower, deleted_at__gte=window)
+            user = request.user
+            if not self.sees_all_stores(user):
+                tombstones = tombstones.filter(Q(store__isnull=True) | Q(store_id=getattr(user, 'store_id', None)))
+            deleted = sorted(set(tombstones.values_list('object_id', flat=True)))
 
-class ItemViewSet(viewsets.ModelViewSet):
+        return Response({
+            "cursor": cursor,
+            "reset": reset,
+            "results": self.get_serializer(queryset, many=True).data,
+            "deleted": deleted
+        })
+
+class ItemViewSet(UpdatedSinceMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows items to be viewed or edited.
     Includes logic to handle 'par' updates in StoreItemSettings.
@@ -26,6 +88,9 @@ class ItemViewSet(viewsets.ModelViewSet):
     def _is_super(self, user):
         return getattr(user, 'role', '') == 'it' or user.is_superuser or user.is_staff
 
+    def sees_all_stores(self, user):
+        return self._is_super(user)
+
     def get_queryset(self):
         user = self.request.user
         store = getattr(user, 'store', None)
@@ -60,6 +125,21 @@ class ItemViewSet(viewsets.ModelViewSet):
         
         return Item.objects.filter(store__isnull=True)
 
+    def changed_since(self, queryset, since):
+        # Store settings (par, default location) and conversions are serialized with the
+        # item, so their changes resend it (a settings delete bumps the item itself);
+        # deleted conversions come via unit-conversions.
+        from .models import StoreItemSettings
+        settings_changed = StoreItemSettings.objects.filter(updated_at__gte=since)
+        store = getattr(self.request.user, 'store', None)
+        if store:
+            settings_changed = settings_changed.filter(store=store)
+        return queryset.filter(
+            Q(updated_at__gte=since)
+            | Q(id__in=settings_changed.values('item_id'))
+            | Q(id__in=UnitConversion.objects.filter(updated_at__gte=since).values('item_id'))
+        )
+
     def perform_update(self, serializer):
         user = self.request.user
         store = getattr(user, 'store', None)
@@ -79,40 +159,10 @@ class ItemViewSet(viewsets.ModelViewSet):
         
         # Check if shelf life was updated
         if 'shelf_life_days' in self.request.data:
-            from .models import Inventory
-            from datetime import timedelta
-            from django.utils import timezone
-            
-            # Recalculate expiration for ALL inventory of this item
-            # (Assuming changing the rule means we want to update current stock too)
-            # Strategy: 
-            # 1. For items with NO expiration date -> Set to Now + New Shelf Life
-            # 2. For items WITH expiration date -> We can't easily know when they were created to re-add the shelf life.
-            #    However, if the shelf life changed, the expiration date is likely wrong.
-            #    Simplest correct approach: Update all future expirations to respect new limit?
-            #    Better approach for now: Only update NULL expirations, as requested by user initially?
-            #    User said: "I updated this shelf life, but the expirations in the inventory were not updated."
-            #    This implies they expect existing dates to shift. 
-            #    But we don't track "Created At" on Inventory accurately enough to re-project.
-            #    Inventory doesn't have 'created_at'.
-            #    Wait, receiving logs do. But Inventory batches are simple.
-            
-            # Compromise: Update items that have NO expiration date OR update based on creation date if available.
-            # 1. Update items with NULL expiration
-            if item.shelf_life_days is not None:
-                 new_expiry = timezone.now() + timedelta(days=item.shelf_life_days)
-                 Inventory.objects.filter(item=item, expiration_date__isnull=True).update(expiration_date=new_expiry)
-                 
-                 # 2. Update items WITH creation date (recalculate correct expiry)
-                 # We can do this efficiently in the database using F expressions, but SQLite/Django date math support varies.
-                 # Let's iterate for safety or use a raw query if needed? 
-                 # Iteration for a single item type is usually fine unless massive scale.
-                 
-                 # Only update items that HAVE created_at
-                 items_with_creation = Inventory.objects.filter(item=item, created_at__isnull=False)
-                 for inv in items_with_creation:
-                     inv.expiration_date = inv.created_at + timedelta(days=item.shelf_life_days)
-                     inv.save()
+            # Re-project ALL inventory of this item from its batch creation time
+            # (changing the rule means current stock should follow it too).
+            # One UPDATE per item; very large items run in the background.
+            InventoryService.schedule_expiration_recompute(item)
         
         # Handle 'par' updates
         if store and 'par' in self.request.data:
@@ -247,7 +297,7 @@ class ItemViewSet(viewsets.ModelViewSet):
             "default_location": settings.default_location.id if settings.default_location else None
         })
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(UpdatedSinceMixin, viewsets.ModelViewSet):
     """
     API endpoint for viewing recipes.
     """
@@ -262,11 +312,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # Admin/IT/superusers can create/update/delete recipes
         return getattr(user, 'role', '') in ['admin', 'it'] or user.is_superuser or user.is_staff
 
+    def sees_all_stores(self, user):
+        return getattr(user, 'role', '') == 'it' or user.is_superuser or user.is_staff
+
     def get_queryset(self):
         user = self.request.user
         store = getattr(user, 'store', None)
 
-        if getattr(user, 'role', '') == 'it' or user.is_superuser or user.is_staff:
+        if self.sees_all_stores(user):
              return Recipe.objects.all()
         
         if store:
@@ -291,7 +344,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         super().perform_destroy(instance)
 
 
-class InventoryViewSet(viewsets.ModelViewSet):
+class InventoryViewSet(UpdatedSinceMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows viewing and managing full inventory details.
     """
@@ -304,7 +357,7 @@ class InventoryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if getattr(user, 'role', '') == 'it' or user.is_superuser:
+        if self.sees_all_stores(user):
             return Inventory.objects.all()
 
         store = getattr(user, 'store', None)
@@ -328,23 +381,103 @@ class InventoryViewSet(viewsets.ModelViewSet):
         else:
              serializer.save(expiration_date=expiration_date)
 
-    @action(detail=False, methods=['get'])
-    def expired(self, request):
+    def _expiry_response(self, request, predicate):
         user = request.user
         store = getattr(user, 'store', None)
+        expiry_qs = Inventory.objects.filter(predicate, quantity__gt=0).select_related('item', 'location', 'store')
         if not store:
             # IT user viewing expired?
-            if getattr(user, 'role', '') == 'it' or user.is_superuser:
-                 today = timezone.now().date()
-                 expired_qs = Inventory.objects.filter(expiration_date__date__lt=today, quantity__gt=0)
-                 serializer = self.get_serializer(expired_qs, many=True)
-                 return Response(serializer.data)
-            return Response({"error": "No store context"}, status=400)
-            
-        today = timezone.now().date()
-        expired_qs = Inventory.objects.filter(store=store, expiration_date__date__lt=today, quantity__gt=0)
-        serializer = self.get_serializer(expired_qs, many=True)
-        return Response(serializer.data)
+            if not (getattr(user, 'role', '') == 'it' or user.is_superuser):
+                return Response({"error": "No store context"}, status=400)
+        else:
+            expiry_qs = expiry_qs.filter(store=store)
+
+        # Plain list unless paging was asked for (dashboard "more" cursor or explicit limit)
+        if 'cursor' not in request.query_params and 'limit' not in request.query_params:
+            serializer = self.get_serializer(expiry_qs, many=True)
+            return Response(serializer.data)
+
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), 500)
+            batches, next_cursor = InventoryService.expiry_page(expiry_qs, max(limit, 1), request.query_params.get('cursor'))
+        except ValueError:
+            return Response({"error": "Invalid cursor or limit"}, status=400)
+        return Response({
+            "results": self.get_serializer(batches, many=True).data,
+            "next": next_cursor
+        })
+
+    @action(detail=False, methods=['get'])
+    def expired(self, request):
+        return self._expiry_response(request, InventoryService.expired_before())
+
+    @action(detail=False, methods=['get'])
+    def expiring_today(self, request):
+        return self._expiry_response(request, InventoryService.expiring_on())
+
+    @action(detail=False, methods=['get'])
+    def expiry_calendar(self, request):
+        """
+        What expires on each of the next `days` business days (default 14, max 90),
+        per item. IT users may pass store_id; otherwise it's the user's store.
+        """
+        try:
+            days = min(max(int(request.query_params.get('days', 14)), 1), 90)
+        except (TypeError, ValueError):
+            return Response({"error": "days must be an integer"}, status=400)
+
+        inventory_qs = self.get_queryset()
+        store_id = request.query_params.get('store_id')
+        if store_id and (getattr(request.user, 'role', '') == 'it' or request.user.is_superuser):
+            inventory_qs = inventory_qs.filter(store_id=store_id)
+
+        today = timezone.localdate()
+        return Response({
+            "start": today,
+            "days": InventoryService.expiry_calendar(inventory_qs, today, days)
+        })
+
+    @action(detail=False, methods=['post'])
+    def bulk_dispose(self, request):
+        """
+        Disposes of many batches in one request, either
+        {"ids": [...]} or {"location": id, "all_expired": true} (expired before today).
+        """
+        notes = request.data.get('notes', '')
+        ids = request.data.get('ids')
+        location_id = request.data.get('location')
+
+        with transaction.atomic():
+            batches = self.get_queryset().select_for_update()
+            if ids is not None:
+                if not isinstance(ids, list):
+                    return Response({"error": "ids must be a list"}, status=400)
+                try:
+                    ids = {int(batch_id) for batch_id in ids}
+                except (TypeError, ValueError):
+                    return Response({"error": "ids must be integers"}, status=400)
+                batches = batches.filter(id__in=ids)
+            elif location_id and request.data.get('all_expired'):
+                batches = batches.filter(
+                    location_id=location_id,
+                    expiration_date__lt=InventoryService.start_of_business_day()
+                )
+            else:
+                return Response({"error": "Provide ids, or location with all_expired"}, status=400)
+
+            # Store scope comes from get_queryset: ids outside it are simply not found
+            rows = list(batches.values_list('id', 'store_id', 'item_id', 'quantity'))
+            if ids is not None and len(rows) != len(ids):
+                missing = sorted(ids - {row[0] for row in rows})
+                return Response({"error": "Some batches were not found", "missing": missing}, status=404)
+
+            logs = InventoryService.dispose_batches(rows, user=request.user, notes=notes)
+
+        return Response({
+            "message": f"Disposed of {len(rows)} batches.",
+            "disposed": len(rows),
+            "logged": len(logs)
+        })
 
     @action(detail=True, methods=['post'])
     def dispose(self, request, pk=None):
@@ -362,11 +495,12 @@ class InventoryViewSet(viewsets.ModelViewSet):
         )
         
         # Delete the inventory record
-        inventory.delete()
+        with StockMovement.recording(StockMovement.DISPOSAL, f"inventory:{inventory.id}"):
+            inventory.delete()
         
         return Response({"message": "Expired item disposed and logged."})
 
-class LocationViewSet(viewsets.ReadOnlyModelViewSet):
+class LocationViewSet(UpdatedSinceMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for locations.
     """
@@ -377,7 +511,7 @@ class LocationViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        if getattr(user, 'role', '') == 'it' or user.is_superuser:
+        if self.sees_all_stores(user):
             return Location.objects.all()
 
         store = getattr(user, 'store', None)
@@ -385,7 +519,7 @@ class LocationViewSet(viewsets.ReadOnlyModelViewSet):
             return Location.objects.filter(store=store)
         return Location.objects.none()
 
-class UnitConversionViewSet(viewsets.ModelViewSet):
+class UnitConversionViewSet(UpdatedSinceMixin, viewsets.ModelViewSet):
     """
     API endpoint for unit conversions.
     """
@@ -395,11 +529,14 @@ class UnitConversionViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['item']
 
+    def sees_all_stores(self, user):
+        return getattr(user, 'role', '') == 'it' or user.is_superuser or user.is_staff
+
     def get_queryset(self):
         user = self.request.user
         store = getattr(user, 'store', None)
         
-        if getattr(user, 'role', '') == 'it' or user.is_superuser or user.is_staff:
+        if self.sees_all_stores(user):
              return UnitConversion.objects.all()
         
         if store:
@@ -502,6 +639,7 @@ class DashboardStatsView(APIView):
     API endpoint for dashboard statistics.
     """
     permission_classes = [permissions.IsAuthenticated]
+    expiry_limit = 10
 
     def get(self, request):
         user = request.user
@@ -511,52 +649,59 @@ class DashboardStatsView(APIView):
         if (getattr(user, 'role', '') == 'it' or user.is_superuser) and 'store_id' in request.query_params:
              store_id = request.query_params.get('store_id')
 
+        # Served per store and business date; writes for the store invalidate it
+        data, hit = DashboardCache.get_or_build(store_id, lambda: self._build_stats(store_id))
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def _build_stats(self, store_id):
         inventory_qs = Inventory.objects.all()
         if store_id:
             inventory_qs = inventory_qs.filter(store_id=store_id)
 
         # 1. Low Stock
+        # One query: par-tracked settings joined to grouped on-hand totals, deficit sorted in the DB
+        low_stock_qs = InventoryService.low_stock_settings(store_id)
         low_stock_items = []
-        low_stock_count = 0
-        
+        low_stock_by_store = None
+
         if store_id:
-            from .models import StoreItemSettings
-            from django.db.models import Sum
-            
-            # Get items with par levels > 0 for this store
-            settings = StoreItemSettings.objects.filter(store_id=store_id, par__gt=0).select_related('item')
-            
-            for setting in settings:
-                # Calculate total quantity for this item across all locations in the store
-                total_qty = Inventory.objects.filter(store_id=store_id, item=setting.item).aggregate(Sum('quantity'))['quantity__sum'] or 0
-                
-                if total_qty < setting.par:
-                    low_stock_items.append({
-                        'id': setting.item.id,
-                        'name': setting.item.name,
-                        'quantity': total_qty,
-                        'par_level': setting.par,
-                        'deficit': setting.par - total_qty,
-                        'unit': setting.item.base_unit
-                    })
+            low_stock_items = [
+                {
+                    'id': row['item_id'],
+                    'name': row['item__name'],
+                    'quantity': row['total_qty'],
+                    'par_level': row['par'],
+                    'deficit': row['deficit'],
+                    'unit': row['item__base_unit']
+                }
+                for row in low_stock_qs.values('item_id', 'item__name', 'total_qty', 'par', 'deficit', 'item__base_unit')
+            ]
             low_stock_count = len(low_stock_items)
         else:
-             # Fallback logic if no store context (e.g. counting individual inventory entries < 10)
-             # For IT Dashboard global view
-             low_stock_count = inventory_qs.filter(quantity__lt=10).count()
+             # IT Dashboard global view: per-store rollup of the same low-stock rule
+             low_stock_by_store = list(
+                 low_stock_qs.order_by().values('store_id', 'store__name').annotate(count=Count('id')).order_by('store__name')
+             )
+             low_stock_count = sum(row['count'] for row in low_stock_by_store)
 
         # 2. Expiration Logic
-        today = timezone.now().date()
-        
+        # Business date in the store's timezone, matching the cache key and the expiry ranges
+        today = timezone.localdate()
+        counts = InventoryService.expiry_counts(inventory_qs, today)
+
+        # Lists are capped; `*_next` is a cursor for the expiring_today/expired endpoints
+        limit = self.expiry_limit
+        in_stock_qs = inventory_qs.filter(quantity__gt=0).select_related('item', 'location', 'store')
+
         # Expiring Today
-        expiring_today_qs = inventory_qs.filter(expiration_date__date=today)
-        expiring_today_count = expiring_today_qs.count()
-        expiring_today_items = InventorySerializer(expiring_today_qs, many=True).data
+        expiring_today, expiring_today_next = InventoryService.expiry_page(in_stock_qs.filter(InventoryService.expiring_on(today)), limit)
+        expiring_today_items = InventorySerializer(expiring_today, many=True).data
 
         # Expired (Past)
-        expired_qs = inventory_qs.filter(expiration_date__date__lt=today)
-        expired_count = expired_qs.count()
-        expired_items = InventorySerializer(expired_qs, many=True).data
+        expired, expired_next = InventoryService.expiry_page(in_stock_qs.filter(InventoryService.expired_before(today)), limit)
+        expired_items = InventorySerializer(expired, many=True).data
 
         # 3. Recent Activity (Production Logs)
         prod_logs_qs = ProductionLog.objects.all()
@@ -565,20 +710,78 @@ class DashboardStatsView(APIView):
         recent_production = prod_logs_qs.order_by('-timestamp')[:5]
         recent_production_data = ProductionLogSerializer(recent_production, many=True).data
 
-        # 4. Total Items (in inventory)
-        total_inventory_items = inventory_qs.count()
-
         data = {
             "low_stock_count": low_stock_count,
             "low_stock_items": low_stock_items,
-            "expiring_today_count": expiring_today_count,
+            "low_stock_by_store": low_stock_by_store,
+            "expiring_today_count": counts['expiring_today_count'],
             "expiring_today_items": expiring_today_items,
-            "expired_count": expired_count,
+            "expiring_today_next": expiring_today_next,
+            "expired_count": counts['expired_count'],
             "expired_items": expired_items,
-            "total_inventory_items": total_inventory_items,
+            "expired_next": expired_next,
+            "total_inventory_items": counts['total_inventory_items'],
             "recent_activity": recent_production_data
         }
-        return Response(data)
+        return data
+
+class DashboardCacheStatsView(APIView):
+    """
+    API endpoint exposing dashboard cache hit/miss counters (IT only).
+    """
+    permission_classes = [IsITAdmin]
+
+    def get(self, request):
+        return Response(DashboardCache.stats())
+
+class StoreOverviewView(APIView):
+    """
+    API endpoint with headline KPIs for every store (IT only).
+    A fixed number of grouped queries, however many stores there are.
+    """
+    permission_classes = [IsITAdmin]
+
+    def get(self, request):
+        from users.models import Store
+
+        today = timezone.localdate()
+        week_start = today - timedelta(days=6)
+
+        low_stock = dict(
+            InventoryService.low_stock_settings().order_by().values('store_id').annotate(count=Count('id')).values_list('store_id', 'count')
+        )
+        batches = {
+            row['store_id']: row
+            for row in Inventory.objects.order_by().values('store_id').annotate(**InventoryService.expiry_count_expressions(today))
+        }
+        last_stocktake = dict(
+            StocktakeSession.objects.filter(status='COMPLETED').order_by().values('store_id').annotate(
+                last=Max('completed_at')
+            ).values_list('store_id', 'last')
+        )
+        waste = {
+            row['store_id']: row
+            for row in ExpiredItemLog.objects.filter(disposed_at__gte=InventoryService.start_of_business_day(week_start)).order_by().values('store_id').annotate(
+                disposals=Count('id'), quantity=Sum('quantity_expired')
+            )
+        }
+
+        stores = []
+        for store in Store.objects.order_by('name'):
+            counts = batches.get(store.id, {})
+            store_waste = waste.get(store.id, {})
+            stores.append({
+                'store_id': store.id,
+                'store_name': store.name,
+                'low_stock_count': low_stock.get(store.id, 0),
+                'expiring_today_count': counts.get('expiring_today_count', 0),
+                'expired_count': counts.get('expired_count', 0),
+                'batch_count': counts.get('total_inventory_items', 0),
+                'last_stocktake_at': last_stocktake.get(store.id),
+                'waste_7d_disposals': store_waste.get('disposals', 0),
+                'waste_7d_quantity': store_waste.get('quantity') or 0.0
+            })
+        return Response({'date': today, 'stores': stores})
 
 class ReceivingLogViewSet(viewsets.ModelViewSet):
     """
@@ -612,7 +815,97 @@ class ReceivingLogViewSet(viewsets.ModelViewSet):
         
         InventoryService.process_receiving_log(receiving_log)
 
-class StocktakeSessionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Receives a whole delivery in one request:
+        {"lines": [{"item": id, "quantity": n, "unit_cost": n (opt)}, ...]} (IT users add store_id).
+        All lines are created together or not at all.
+        """
+        user = request.user
+        store = getattr(user, 'store', None)
+        if not store and (getattr(user, 'role', '') == 'it' or user.is_superuser) and request.data.get('store_id'):
+            from .models import Store
+            store = Store.objects.filter(id=request.data.get('store_id')).first()
+        if not store:
+            return Response({"error": "No store context"}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = request.data.get('lines')
+        if not isinstance(lines, list) or not lines:
+            return Response({"error": "lines must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            parsed = [
+                (
+                    int(line['item']),
+                    float(line['quantity']),
+                    float(line['unit_cost']) if line.get('unit_cost') not in (None, '') else None
+                )
+                for line in lines
+            ]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return Response({"error": "Each line needs a numeric item and quantity"}, status=status.HTTP_400_BAD_REQUEST)
+        if any(quantity <= 0 for _, quantity, _ in parsed):
+            return Response({"error": "Quantities must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only global items and the receiving store's own; anything else reads as missing
+        visible_items = Item.objects.filter(Q(store=store) | Q(store__isnull=True))
+        items = visible_items.in_bulk({item_id for item_id, _, _ in parsed})
+        missing = sorted({item_id for item_id, _, _ in parsed} - set(items))
+        if missing:
+            return Response({"error": "Some items were not found", "missing": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+        logs = InventoryService.receive_delivery(
+            store, [(items[item_id], quantity, unit_cost) for item_id, quantity, unit_cost in parsed], user=user
+        )
+        return Response(ReceivingLogSerializer(logs, many=True).data, status=status.HTTP_201_CREATED)
+
+class StocktakeRecordCursorPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+class StocktakeSyncMixin:
+    """
+    The offline counting delta sync shared by the session and sub-session endpoints:
+    {device_id, since, changes: [{item_id, location_id, quantity_counted, unit_name (opt), seq}]}
+    in, {cursor, applied, skipped, changes: records changed after `since`} out.
+    """
+
+    def counts_saved(self, request, sub_session):
+        pass
+
+    def sync_counts(self, request, session, sub_session=None):
+        device_id = str(request.data.get('device_id') or '')[:64]
+        if not device_id:
+            return Response({"error": "device_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            since = int(request.data.get('since') or 0)
+        except (ValueError, TypeError):
+            return Response({"error": "Invalid since cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = request.data.get('changes', [])
+        if not isinstance(changes, list):
+            return Response({"error": "changes must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            applied, skipped, cursor = StocktakeService.apply_counts(
+                session, changes, device_id=device_id, sub_session=sub_session
+            )
+        except StocktakeClosedError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        self.counts_saved(request, sub_session)
+        changed = StocktakeService.changes_since(session, since, sub_session=sub_session)
+
+        return Response({
+            "cursor": cursor,
+            "applied": len(applied),
+            "skipped": skipped,
+            "changes": StocktakeRecordSerializer(changed, many=True).data
+        })
+
+class StocktakeSessionViewSet(StocktakeSyncMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing stocktake sessions.
     """
@@ -685,43 +978,104 @@ class StocktakeSessionViewSet(viewsets.ModelViewSet):
              
         items_data = request.data.get('records', [])
         # Format: [{item_id, location_id, quantity_counted, unit_name (opt)}]
-        
-        created_records = []
-        for data in items_data:
-            item_id = data.get('item_id')
-            location_id = data.get('location_id')
-            raw_qty = data.get('quantity_counted')
-            unit_name = data.get('unit_name')
-            
-            if not item_id or not location_id: 
-                continue
-                
+        try:
+            records, _, cursor = StocktakeService.apply_counts(session, items_data)
+        except StocktakeClosedError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"message": "Records saved.", "count": len(records), "cursor": cursor})
+
+    @action(detail=True, methods=['post'])
+    def sync(self, request, pk=None):
+        """
+        Delta sync for offline counting.
+        Client sends only changed counts: {device_id, since, changes: [{item_id, location_id, quantity_counted, unit_name (opt), seq}]}.
+        Replayed changes are ignored. Returns the new server cursor plus every change after `since`.
+        """
+        session = self.get_object()
+        if session.status != 'PENDING':
+             return Response({"error": "Session is not pending."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return self.sync_counts(request, session)
+
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        """
+        Per-location progress for the counting wizard: distinct items counted (session level
+        and sub-sessions together), items expected from current inventory, last save time
+        and sub-session status. One annotated query.
+        """
+        session = self.get_object()
+
+        records = StocktakeRecord.objects.filter(session=session, location=OuterRef('pk')).values('location')
+        expected = Inventory.objects.filter(store=session.store_id, location=OuterRef('pk'), quantity__gt=0).values('location')
+        sub_session = StocktakeSubSession.objects.filter(session=session, location=OuterRef('pk'))
+
+        locations = Location.objects.filter(store=session.store_id).annotate(
+            # An item counted at session level and in the location's sub-session is one record
+            # once merged, so count distinct items
+            records_counted=Coalesce(Subquery(records.annotate(c=Count('item_id', distinct=True)).values('c')), 0),
+            items_expected=Coalesce(Subquery(expected.annotate(c=Count('item_id', distinct=True)).values('c')), 0),
+            last_saved_at=Subquery(records.annotate(m=Max('updated_at')).values('m')),
+            sub_session_status=Subquery(sub_session.values('status')[:1]),
+        ).order_by('name')
+
+        return Response({
+            "session": StocktakeSessionSerializer(session).data,
+            "locations": [
+                {
+                    "location_id": loc.id,
+                    "location_name": loc.name,
+                    "records_counted": loc.records_counted,
+                    "items_expected": loc.items_expected,
+                    "last_saved_at": loc.last_saved_at,
+                    "sub_session_status": loc.sub_session_status,
+                }
+                for loc in locations
+            ]
+        })
+
+    @action(detail=True, methods=['get'])
+    def records(self, request, pk=None):
+        """
+        The session's counted records, cursor-paginated. Optional ?location=<id> filter.
+        """
+        session = self.get_object()
+        qs = StocktakeRecord.objects.filter(session=session).select_related('item', 'location')
+
+        location_id = request.query_params.get('location')
+        if location_id:
             try:
-                qty = float(raw_qty)
-            except (ValueError, TypeError):
-                continue
+                qs = qs.filter(location_id=int(location_id))
+            except (TypeError, ValueError):
+                return Response({"error": "Invalid location."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Convert to base unit if needed
-            if unit_name:
-                try:
-                     item = Item.objects.get(id=item_id)
-                     if unit_name != item.base_unit:
-                         conv = UnitConversion.objects.filter(item=item, unit_name=unit_name).first()
-                         if conv:
-                             qty = qty * conv.factor
-                except Item.DoesNotExist:
-                     continue
-            
-            # Update or Create record for this session/item/location
-            record, created = StocktakeRecord.objects.update_or_create(
-                session=session,
-                item_id=item_id,
-                location_id=location_id,
-                defaults={'quantity_counted': qty}
-            )
-            created_records.append(record)
-            
-        return Response({"message": "Records saved.", "count": len(created_records)})
+        paginator = StocktakeRecordCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        return paginator.get_paginated_response(StocktakeRecordSerializer(page, many=True).data)
+
+    @action(detail=True, methods=['post'])
+    def split(self, request, pk=None):
+        """
+        Splits the session into per-location sub-sessions so several staff can count in parallel.
+        Optional body: {location_ids: [...]} (defaults to every location in the store).
+        """
+        session = self.get_object()
+        if session.status != 'PENDING':
+             return Response({"error": "Session is not pending."}, status=status.HTTP_400_BAD_REQUEST)
+
+        location_ids = request.data.get('location_ids')
+        if location_ids is not None and not isinstance(location_ids, list):
+            return Response({"error": "location_ids must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+
+        sub_sessions = StocktakeService.split_session(session, location_ids)
+        return Response(StocktakeSubSessionSerializer(sub_sessions, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def sub_sessions(self, request, pk=None):
+        session = self.get_object()
+        sub_sessions = session.sub_sessions.select_related('location', 'user').order_by('location__name')
+        return Response(StocktakeSubSessionSerializer(sub_sessions, many=True).data)
 
     @action(detail=True, methods=['post'])
     def finalize(self, request, pk=None):
@@ -729,9 +1083,96 @@ class StocktakeSessionViewSet(viewsets.ModelViewSet):
         if session.status != 'PENDING':
              return Response({"error": "Session is not pending."}, status=status.HTTP_400_BAD_REQUEST)
              
-        report = InventoryService.finalize_stocktake_session(session)
+        report = InventoryService.finalize_stocktake_session(session, user=request.user)
         return Response({"message": "Stocktake finalized.", "report": report})
 
+    @action(detail=True, methods=['get'])
+    def report(self, request, pk=None):
+        """
+        The report and per-location variances stored when the session was finalized.
+        """
+        session = self.get_object()
+        if session.status != 'COMPLETED':
+             return Response({"error": "Session is not completed."}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = session.report_lines.order_by('item_id')
+        variances = session.variance_logs.select_related('item', 'location', 'user').order_by('item_id', 'location_id')
+        return Response({
+            "session": StocktakeSessionSerializer(session).data,
+            "report": StocktakeReportLineSerializer(lines, many=True).data,
+            "variances": VarianceLogSerializer(variances, many=True).data
+        })
+
+class StocktakeSubSessionViewSet(StocktakeSyncMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for per-location stocktake sub-sessions.
+    Each counter saves into their own sub-session; counts are merged when the session is finalized.
+    """
+    queryset = StocktakeSubSession.objects.all()
+    serializer_class = StocktakeSubSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['session', 'status']
+
+    def get_queryset(self):
+        user = self.request.user
+        qs = StocktakeSubSession.objects.select_related('session', 'location', 'user')
+        if getattr(user, 'role', '') == 'it' or user.is_superuser:
+            return qs
+
+        store = getattr(user, 'store', None)
+        if store:
+            return qs.filter(session__store=store)
+        return StocktakeSubSession.objects.none()
+
+    def _check_open(self, sub_session):
+        if sub_session.session.status != 'PENDING' or sub_session.status != 'PENDING':
+            raise ValidationError("Sub-session is not open for counting.")
+
+    def _claim(self, sub_session, user):
+        # First counter to save claims the location
+        if sub_session.user_id is None:
+            StocktakeSubSession.objects.filter(pk=sub_session.pk, user__isnull=True).update(user=user)
+
+    def counts_saved(self, request, sub_session):
+        self._claim(sub_session, request.user)
+
+    @action(detail=True, methods=['post'])
+    def save_records(self, request, pk=None):
+        sub_session = self.get_object()
+        self._check_open(sub_session)
+
+        try:
+            records, _, cursor = StocktakeService.apply_counts(
+                sub_session.session,
+                request.data.get('records', []),
+                sub_session=sub_session
+            )
+        except StocktakeClosedError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        self._claim(sub_session, request.user)
+        return Response({"message": "Records saved.", "count": len(records), "cursor": cursor})
+
+    @action(detail=True, methods=['post'])
+    def sync(self, request, pk=None):
+        """
+        Same delta sync protocol as the session endpoint, scoped to this location.
+        """
+        sub_session = self.get_object()
+        self._check_open(sub_session)
+
+        return self.sync_counts(request, sub_session.session, sub_session=sub_session)
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        sub_session = self.get_object()
+        self._check_open(sub_session)
+
+        sub_session.status = 'SUBMITTED'
+        sub_session.submitted_at = timezone.now()
+        sub_session.save(update_fields=['status', 'submitted_at'])
+        return Response(StocktakeSubSessionSerializer(sub_session).data)
+
 class ExpiredItemLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ExpiredItemLog.objects.all()
     serializer_class = ExpiredItemLogSerializer
@@ -747,6 +1188,181 @@ class ExpiredItemLogViewSet(viewsets.ReadOnlyModelViewSet):
             return ExpiredItemLog.objects.filter(store=store).order_by('-disposed_at')
         return ExpiredItemLog.objects.none()
 
+class DemandForecastViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for demand forecasts written by `manage.py forecast_demand`.
+    """
+    queryset = DemandForecast.objects.all()
+    serializer_class = DemandForecastSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['store', 'item', 'date']
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = DemandForecast.objects.select_related('item').order_by('item__name', 'date')
+        if getattr(user, 'role', '') == 'it' or user.is_superuser:
+            return queryset
+
+        store = getattr(user, 'store', None)
+        if store:
+            return queryset.filter(store=store)
+        return DemandForecast.objects.none()
+
+class StockMovementCursorPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+
+class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for the append-only stock movement ledger, newest first.
+    """
+    queryset = StockMovement.objects.all()
+    serializer_class = StockMovementSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StockMovementCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['store', 'item', 'location', 'reason']
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = StockMovement.objects.select_related('item', 'location')
+        if getattr(user, 'role', '') == 'it' or user.is_superuser:
+            return queryset
+
+        store = getattr(user, 'store', None)
+        if store:
+            return queryset.filter(store=store)
+        return StockMovement.objects.none()
+
+class StockSnapshotViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for nightly stock snapshots written by `manage.py snapshot_stock`.
+    """
+    queryset = StockSnapshot.objects.all()
+    serializer_class = StockSnapshotSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['store', 'item', 'location', 'date']
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = StockSnapshot.objects.select_related('item', 'location').order_by('date', 'item__name', 'location__name')
+        if getattr(user, 'role', '') == 'it' or user.is_superuser:
+            return queryset
+
+        store = getattr(user, 'store', None)
+        if store:
+            return queryset.filter(store=store)
+        return StockSnapshot.objects.none()
+
+class StockAtView(APIView):
+    """
+    On-hand per item and location at a past moment:
+    ?at=<ISO datetime>[&item=<id>][&location=<id>] (IT users add store_id).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        store_id = getattr(user, 'store_id', None)
+        if (getattr(user, 'role', '') == 'it' or user.is_superuser) and request.query_params.get('store_id'):
+            store_id = request.query_params.get('store_id')
+        if not store_id:
+            return Response({"error": "No store context"}, status=400)
+
+        try:
+            at = datetime.fromisoformat(request.query_params['at'])
+            item_ids = [int(request.query_params['item'])] if request.query_params.get('item') else None
+            location_id = int(request.query_params['location']) if request.query_params.get('location') else None
+        except KeyError:
+            return Response({"error": "at is required"}, status=400)
+        except ValueError:
+            return Response({"error": "Invalid at, item or location"}, status=400)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+        positions = LedgerService.stock_at(store_id, at, item_ids=item_ids, location_id=location_id)
+        items = Item.objects.in_bulk({item_id for item_id, _ in positions})
+        locations = Location.objects.in_bulk({location_id for _, location_id in positions})
+        results = [
+            {
+                "item_id": item_id,
+                "item_name": items[item_id].name,
+                "base_unit": items[item_id].base_unit,
+                "location_id": location_id,
+                "location_name": locations[location_id].name,
+                "quantity": quantity
+            }
+            for (item_id, location_id), quantity in positions.items()
+        ]
+        results.sort(key=lambda row: (row["item_name"], row["location_name"]))
+        return Response({"at": at, "positions": results})
+
+class LogArchiveView(APIView):
+    """
+    Archived production/receiving/variance log rows (older than the store's retention
+    horizon) with their monthly rollups:
+    ?kind=<production|receiving|variance>[&start=<ISO>][&end=<ISO>][&item=<id>][&limit=<n>]
+    (IT users add store_id).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        from .services.archive_service import ArchiveService
+
+        user = request.user
+        store_id = getattr(user, 'store_id', None)
+        if (getattr(user, 'role', '') == 'it' or user.is_superuser) and request.query_params.get('store_id'):
+            store_id = request.query_params.get('store_id')
+        if not store_id:
+            return Response({"error": "No store context"}, status=400)
+
+        kind = request.query_params.get('kind')
+        if kind not in ArchiveService.MODELS:
+            return Response({"error": f"kind must be one of {', '.join(ArchiveService.MODELS)}"}, status=400)
+        try:
+            bounds = []
+            for name in ('start', 'end'):
+                value = request.query_params.get(name)
+                value = datetime.fromisoformat(value) if value else None
+                if value and timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+                bounds.append(value)
+            item_id = int(request.query_params['item']) if request.query_params.get('item') else None
+            limit = min(int(request.query_params.get('limit', 1000)), 5000)
+        except ValueError:
+            return Response({"error": "Invalid start, end, item or limit"}, status=400)
+        start, end = bounds
+
+        rows, truncated = ArchiveService.read(store_id, kind, start=start, end=end, item_id=item_id, limit=limit)
+        rollups = ArchiveService.rollups(
+            store_id, kind,
+            start_month=timezone.localtime(start).date() if start else None,
+            end_month=timezone.localtime(end).date() if end else None
+        )
+        if item_id:
+            rollups = rollups.filter(item_id=item_id)
+        return Response({
+            "kind": kind,
+            "rows": rows,
+            "truncated": truncated,
+            "rollups": [
+                {
+                    "item_id": rollup.item_id,
+                    "item_name": rollup.item.name,
+                    "month": rollup.month,
+                    "unit": rollup.unit,
+                    "rows": rollup.rows,
+                    "quantity": rollup.quantity,
+                    "value": rollup.value
+                }
+                for rollup in rollups
+            ]
+        })
+
 class AnalyticsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -767,112 +1383,133 @@ class AnalyticsView(APIView):
         if not store:
              return Response({"error": "No store context"}, status=400)
 
-        # Time range: Last 30 days
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=30)
-
-        # 0. Identify Top 3 Products
-        top_products_qs = DailyUsage.objects.filter(
-            store=store,
-            date__gte=start_date,
-            item__type='product',
-            implied_consumption__gt=0
-        ).values('item__name').annotate(
-            total_sold=Sum('implied_consumption')
-        ).order_by('-total_sold')[:3]
-        
-        top_3_names = [p['item__name'] for p in top_products_qs]
+        # Time range: start/end (inclusive business dates), last 30 days by default.
+        # Whole weeks/months are read from the usage rollups, so long ranges stay cheap.
+        try:
+            end_date = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+            start_date = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else end_date - timedelta(days=30)
+        except ValueError:
+            return Response({"error": "start and end must be YYYY-MM-DD dates"}, status=400)
+        if start_date > end_date:
+            return Response({"error": "start must not be after end"}, status=400)
+
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in UsageService.GRANULARITIES:
+            return Response({"error": f"granularity must be one of {', '.join(UsageService.GRANULARITIES)}"}, status=400)
+
+        product_filters = {'item__type': 'product', 'implied_consumption__gt': 0}
+
+        # 0. Product totals (one pass feeds both the top 3 and the popular list)
+        def popular(range_start, range_end):
+            totals = UsageService.grouped(
+                store, range_start, range_end, ['item__name'], product_filters, total_sold=Sum('implied_consumption')
+            )
+            ranked = sorted(totals.items(), key=lambda kv: (-kv[1]['total_sold'], kv[0][0]))[:10]
+            # Rename key to match frontend expectation (was recipe__item__name -> item__name)
+            return [
+                {
+                    'recipe__item__name': name, # Keep key for frontend compatibility
+                    'total_made': row['total_sold'] # Keep key for frontend compatibility
+                }
+                for (name,), row in ranked
+            ]
+
+        popular_products_formatted = popular(start_date, end_date)
+        top_3_names = [p['recipe__item__name'] for p in popular_products_formatted[:3]]
 
         # 1. Sales/Consumption Trends (DailyUsage.implied_consumption)
-        # Initialize sales_trends map with dates and zero values for top items
+        # Initialize sales_trends map with one bucket per day/week/month and zero values for top items
         sales_trends = {}
-        for i in range(31):
-            d = start_date + timedelta(days=i)
-            if d > end_date: break
-            date_str = d.strftime('%Y-%m-%d')
-            sales_trends[date_str] = {name: 0 for name in top_3_names}
-
-        # Use DailyUsage table which is populated by stocktake sessions
-        # Filter for product type items
-        daily_usage_qs = DailyUsage.objects.filter(
-            store=store, 
-            date__gte=start_date,
-            item__type='product',
-            item__name__in=top_3_names, # Limit to top 3
-            implied_consumption__gt=0
-        ).values('date', 'item__name').annotate(
-            total_sold=Sum('implied_consumption')
-        ).order_by('date')
+        bucket = start_date if granularity == 'day' else UsageRollup.period_bounds(granularity, start_date)[0]
+        while bucket <= end_date:
+            sales_trends[bucket] = {name: 0 for name in top_3_names}
+            bucket = bucket + timedelta(days=1) if granularity == 'day' else UsageRollup.period_bounds(granularity, bucket)[1] + timedelta(days=1)
 
         # Populate with actual data
-        for usage in daily_usage_qs:
-            date_str = usage['date'].strftime('%Y-%m-%d')
-            item_name = usage['item__name'] or 'Unknown'
-            if date_str in sales_trends and item_name in sales_trends[date_str]:
-                sales_trends[date_str][item_name] = usage['total_sold']
+        series = UsageService.series(
+            store, start_date, end_date, granularity, ['item__name'],
+            dict(product_filters, item__name__in=top_3_names), # Limit to top 3
+            total_sold=Sum('implied_consumption')
+        )
+        for bucket, rows in series.items():
+            for (item_name,), row in rows.items():
+                item_name = item_name or 'Unknown'
+                if bucket in sales_trends and item_name in sales_trends[bucket]:
+                    sales_trends[bucket][item_name] = row['total_sold']
 
         formatted_trends = []
-        for date_str in sorted(sales_trends.keys()):
-            entry = {'date': date_str}
-            entry.update(sales_trends[date_str])
+        for bucket in sorted(sales_trends.keys()):
+            entry = {'date': bucket.strftime('%Y-%m-%d')}
+            entry.update(sales_trends[bucket])
             formatted_trends.append(entry)
 
-        # 2. Popular Products (by Sales/Consumption)
-        popular_products = DailyUsage.objects.filter(
-            store=store,
-            date__gte=start_date,
-            item__type='product',
-            implied_consumption__gt=0
-        ).values('item__name').annotate(
-            total_sold=Sum('implied_consumption')
-        ).order_by('-total_sold')[:10]
-        
-        # Rename key to match frontend expectation (was recipe__item__name -> item__name)
-        popular_products_formatted = []
-        for p in popular_products:
-            popular_products_formatted.append({
-                'recipe__item__name': p['item__name'], # Keep key for frontend compatibility
-                'total_made': p['total_sold'] # Keep key for frontend compatibility
-            })
+        # 3. Ingredient Usage (Based on Sales/Consumption of Products)
+        # Sold Products -> Recipe -> Ingredients as one join, summed in the database.
+        # Each product uses its first recipe (lowest id), as before.
+        first_recipe = Recipe.objects.filter(item_id=OuterRef('item_id')).order_by('id').values('id')[:1]
+        ingredient_rows = UsageService.grouped(
+            store, start_date, end_date,
+            ['item__recipes__ingredients__ingredient_item_id'],
+            dict(product_filters, item__recipes__id=Subquery(first_recipe), item__recipes__yield_quantity__gt=0),
+            quantity=Sum(
+                F('implied_consumption') * F('item__recipes__ingredients__quantity_required') / F('item__recipes__yield_quantity')
+            )
+        )
+        ingredient_totals = {
+            ingredient_id: row['quantity']
+            for (ingredient_id,), row in ingredient_rows.items()
+            if ingredient_id is not None # recipe without ingredients
+        }
 
+        # 4. Current Stock (Products Only)
+        # Read from the materialized per-location totals; rows only exist where batches do
+        stock_totals = dict(
+            LocationOnHand.objects.filter(
+                store=store, 
+                item__type='product'
+            ).values('item_id').annotate(total=Sum('quantity')).values_list('item_id', 'total')
+        )
 
-        # 3. Ingredient Usage (Based on Sales/Consumption of Products)
-        # We need to map Sold Products -> Recipes -> Ingredients
-        
-        # Get total sold quantity per item in the period
-        product_sales = DailyUsage.objects.filter(
-            store=store,
-            date__gte=start_date,
-            item__type='product',
-            implied_consumption__gt=0
-        ).values('item').annotate(total_sold=Sum('implied_consumption'))
-
-        ingredient_usage = {} # item_name -> {quantity: float, item: ItemObject}
-
-        for entry in product_sales:
-            item_id = entry['item']
-            total_sold = entry['total_sold']
-            
-            # Find recipe for this product
-            # Assuming 1-to-1 mapping for simplicity (first recipe found)
-            recipe = Recipe.objects.filter(item_id=item_id).first()
-            if not recipe or recipe.yield_quantity <= 0:
-                continue
-
-            scale = total_sold / recipe.yield_quantity
-            ingredients = RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient_item')
-            
-            for ing in ingredients:
-                qty = ing.quantity_required * scale
-                name = ing.ingredient_item.name
-                item_obj = ing.ingredient_item
-                
-                if name not in ingredient_usage:
-                    ingredient_usage[name] = {'quantity': 0, 'item': item_obj}
-                ingredient_usage[name]['quantity'] += qty
+        # 4b. Historical stock (Products Only): opening position of the range and, for past
+        # ranges, the close of its last day; read from the nightly snapshots
+        def snapshot_totals(day):
+            return dict(
+                StockSnapshot.objects.filter(
+                    store=store,
+                    date=day,
+                    item__type='product'
+                ).values('item_id').annotate(total=Sum('quantity')).values_list('item_id', 'total')
+            )
+
+        opening_totals = snapshot_totals(start_date)
+        closing_totals = snapshot_totals(end_date + timedelta(days=1)) if end_date < timezone.localdate() else {}
+
+        # 5. Expired Items (Waste over the range)
+        waste_totals = dict(
+            ExpiredItemLog.objects.filter(
+                store=store,
+                disposed_at__gte=InventoryService.start_of_business_day(start_date),
+                disposed_at__lt=InventoryService.start_of_business_day(end_date + timedelta(days=1))
+            ).values('item_id').annotate(total=Sum('quantity_expired')).values_list('item_id', 'total')
+        )
+
+        # Display units for every listed item with two queries (items + their conversions)
+        display_items = Item.objects.prefetch_related('conversions').in_bulk(
+            set(ingredient_totals) | set(stock_totals) | set(waste_totals) | set(opening_totals) | set(closing_totals)
+        )
+
+        def by_name(totals):
+            # Items sharing a name are reported together
+            merged = {}
+            for item_id, quantity in totals.items():
+                item = display_items[item_id]
+                if item.name not in merged:
+                    merged[item.name] = {'quantity': 0.0, 'item': item}
+                merged[item.name]['quantity'] += quantity or 0.0
+            return merged
 
         formatted_usage = []
-        for name, data in ingredient_usage.items():
+        for name, data in by_name(ingredient_totals).items():
             qty, unit = data['item'].get_display_quantity_and_unit(data['quantity'])
             formatted_usage.append({
                 'name': name,
@@ -881,44 +1518,22 @@ class AnalyticsView(APIView):
             })
         formatted_usage.sort(key=lambda x: x['quantity'], reverse=True)
 
-        # 4. Current Stock (Products Only)
-        current_stock_qs = Inventory.objects.filter(
-            store=store, 
-            item__type='product'
-        ).select_related('item')
-        
-        stock_map = {}
-        for inv in current_stock_qs:
-            if inv.item.name not in stock_map:
-                stock_map[inv.item.name] = {'quantity': 0.0, 'item': inv.item}
-            stock_map[inv.item.name]['quantity'] += inv.quantity
-            
-        current_stock = []
-        for name, data in stock_map.items():
-            qty, unit = data['item'].get_display_quantity_and_unit(data['quantity'])
-            current_stock.append({
-                'item__name': name,
-                'total_quantity': qty,
-                'item__base_unit': unit
-            })
-        
-        current_stock.sort(key=lambda x: x['total_quantity'], reverse=True)
+        def stock_list(totals):
+            rows = []
+            for name, data in by_name(totals).items():
+                qty, unit = data['item'].get_display_quantity_and_unit(data['quantity'])
+                rows.append({
+                    'item__name': name,
+                    'total_quantity': qty,
+                    'item__base_unit': unit
+                })
+            rows.sort(key=lambda x: x['total_quantity'], reverse=True)
+            return rows
 
-        # 5. Expired Items (Waste - Last 30 Days)
-        expired_logs = ExpiredItemLog.objects.filter(
-            store=store,
-            disposed_at__date__gte=start_date
-        ).select_related('item')
-        
-        waste_map = {}
-        for log in expired_logs:
-            name = log.item.name
-            if name not in waste_map:
-                waste_map[name] = {'quantity': 0.0, 'item': log.item}
-            waste_map[name]['quantity'] += log.quantity_expired
+        current_stock = stock_list(stock_totals)
 
         waste_summary = []
-        for name, data in waste_map.items():
+        for name, data in by_name(waste_totals).items():
             qty, unit = data['item'].get_display_quantity_and_unit(data['quantity'])
             waste_summary.append({
                 'name': name,
@@ -932,7 +1547,22 @@ class AnalyticsView(APIView):
             "popular_products": popular_products_formatted, # Now Popular Sales
             "ingredient_usage": formatted_usage, # Now usage based on Sales
             "current_stock": current_stock,
-            "expired_waste": waste_summary
+            "opening_stock": stock_list(opening_totals),
+            "closing_stock": stock_list(closing_totals),
+            "expired_waste": waste_summary,
+            "start": start_date,
+            "end": end_date,
+            "granularity": granularity
         }
+
+        # Same period last year, e.g. to compare this year's sales with last year's
+        if request.query_params.get('compare') == 'last_year':
+            def last_year(day):
+                return day.replace(year=day.year - 1, day=28) if (day.month, day.day) == (2, 29) else day.replace(year=day.year - 1)
+            data['comparison'] = {
+                'start': last_year(start_date),
+                'end': last_year(end_date),
+                'popular_products': popular(last_year(start_date), last_year(end_date))
+            }
         
         return Response(data)
@@ -15,4 +15,4 @@ class CustomUserAdmin(UserAdmin):
 
 @admin.register(Store)
 class StoreAdmin(admin.ModelAdmin):
-    list_display = ('name', 'address')
+    list_display = ('name', 'address', 'log_retention_days')
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='log_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 class Store(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField(blank=True, null=True)
+    # Production/receiving/variance logs older than this are archived (None: LOG_RETENTION_DAYS)
+    log_retention_days = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -4,7 +4,7 @@ from .models import CustomUser, Store
 class StoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Store
-        fields = ['id', 'name', 'address']
+        fields = ['id', 'name', 'address', 'log_retention_days']
 
 class UserProfileSerializer(serializers.ModelSerializer):
     store_name = serializers.CharField(source='store.name', read_only=True)
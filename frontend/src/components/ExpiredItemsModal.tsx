@@ -15,6 +15,7 @@ interface ExpiredItemsModalProps {
     expiringItems: InventoryItem[];
     expiredItems: InventoryItem[];
     onDispose: (id: number, reason: string) => Promise<void>;
+    onDisposeAll?: (ids: number[]) => Promise<void>;
 }
 
 const ExpiredItemsModal: React.FC<ExpiredItemsModalProps> = ({ 
@@ -22,9 +23,11 @@ const ExpiredItemsModal: React.FC<ExpiredItemsModalProps> = ({
     onClose, 
     expiringItems, 
     expiredItems,
-    onDispose 
+    onDispose,
+    onDisposeAll
 }) => {
     const [processingId, setProcessingId] = useState<number | null>(null);
+    const [disposingAll, setDisposingAll] = useState(false);
 
     if (!isOpen) return null;
 
@@ -41,6 +44,20 @@ const ExpiredItemsModal: React.FC<ExpiredItemsModalProps> = ({
         }
     };
 
+    const handleDisposeAll = async () => {
+        if (!onDisposeAll) return;
+        if (!window.confirm(`Confirm disposal of all ${expiredItems.length} expired items?`)) return;
+
+        setDisposingAll(true);
+        try {
+            await onDisposeAll(expiredItems.map(item => item.id));
+        } catch (error) {
+            console.error('Error disposing items:', error);
+        } finally {
+            setDisposingAll(false);
+        }
+    };
+
     const hasItems = expiringItems.length > 0 || expiredItems.length > 0;
 
     return (
@@ -65,10 +82,21 @@ const ExpiredItemsModal: React.FC<ExpiredItemsModalProps> = ({
                         <div className="space-y-8">
                             {expiredItems.length > 0 && (
                                 <div>
-                                    <h3 className="text-lg font-semibold text-red-700 mb-3 flex items-center">
-                                        <AlertTriangle className="w-5 h-5 mr-2" />
-                                        Expired Items (Needs Removal)
-                                    </h3>
+                                    <div className="flex justify-between items-center mb-3">
+                                        <h3 className="text-lg font-semibold text-red-700 flex items-center">
+                                            <AlertTriangle className="w-5 h-5 mr-2" />
+                                            Expired Items (Needs Removal)
+                                        </h3>
+                                        {onDisposeAll && (
+                                            <button
+                                                onClick={handleDisposeAll}
+                                                disabled={disposingAll}
+                                                className="px-4 py-2 bg-red-700 text-white text-sm rounded hover:bg-red-800 transition-colors disabled:opacity-50"
+                                            >
+                                                {disposingAll ? 'Processing...' : 'Dispose All Expired'}
+                                            </button>
+                                        )}
+                                    </div>
                                     <div className="bg-red-50 rounded-lg border border-red-100 overflow-hidden">
                                         <div className="divide-y divide-red-100">
                                             {expiredItems.map(item => (
@@ -84,7 +112,7 @@ const ExpiredItemsModal: React.FC<ExpiredItemsModalProps> = ({
                                                     </div>
                                                     <button
                                                         onClick={() => handleDispose(item.id, item.item_name, true)}
-                                                        disabled={processingId === item.id}
+                                                        disabled={disposingAll || processingId === item.id}
                                                         className="px-4 py-2 bg-red-600 text-white text-sm rounded hover:bg-red-700 transition-colors disabled:opacity-50"
                                                     >
                                                         {processingId === item.id ? 'Processing...' : 'Dispose'}
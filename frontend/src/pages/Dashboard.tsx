@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getDashboardStats, disposeExpiredItem } from '../services/api';
+import { getDashboardStats, disposeExpiredItem, bulkDisposeItems, getExpiryPage } from '../services/api';
 import ExpiredItemsModal from '../components/ExpiredItemsModal';
 import { AlertTriangle } from 'lucide-react';
 
@@ -25,8 +25,10 @@ interface DashboardData {
   low_stock_items: LowStockItem[];
   expiring_today_count: number;
   expiring_today_items: InventoryItem[];
+  expiring_today_next: string | null;
   expired_count: number;
   expired_items: InventoryItem[];
+  expired_next: string | null;
   total_inventory_items: number;
   recent_activity: {
     id: number;
@@ -58,6 +60,20 @@ const Dashboard: React.FC = () => {
     fetchData();
   }, []);
 
+  const loadMore = async (section: 'expired' | 'expiring_today') => {
+      if (!data) return;
+      const cursor = section === 'expired' ? data.expired_next : data.expiring_today_next;
+      if (!cursor) return;
+      try {
+          const page = await getExpiryPage(section, cursor);
+          setData(prev => prev && (section === 'expired'
+              ? { ...prev, expired_items: [...prev.expired_items, ...page.results], expired_next: page.next }
+              : { ...prev, expiring_today_items: [...prev.expiring_today_items, ...page.results], expiring_today_next: page.next }));
+      } catch (e) {
+          console.error("Failed to load more items", e);
+      }
+  };
+
   const handleDispose = async (invId: number, reason: string) => {
       try {
           await disposeExpiredItem(invId, reason);
@@ -69,6 +85,17 @@ const Dashboard: React.FC = () => {
       }
   };
 
+  const handleDisposeAll = async (ids: number[]) => {
+      try {
+          await bulkDisposeItems({ ids, notes: 'Expired' });
+          fetchData();
+      } catch (e) {
+          console.error("Failed to dispose", e);
+          alert("Failed to dispose items.");
+          throw e;
+      }
+  };
+
   if (loading) {
     return <div className="p-8 text-center">Loading Dashboard...</div>;
   }
@@ -176,6 +203,11 @@ const Dashboard: React.FC = () => {
                     </div>
                 ))
              )}
+             {data.expiring_today_next && (
+                <button onClick={() => loadMore('expiring_today')} className="w-full p-3 text-sm text-tertiary-gold hover:bg-background-warm">
+                    Show more ({data.expiring_today_count - data.expiring_today_items.length} remaining)
+                </button>
+             )}
           </div>
         </div>
 
@@ -203,6 +235,11 @@ const Dashboard: React.FC = () => {
                     </div>
                 ))
              )}
+             {data.expired_next && (
+                <button onClick={() => loadMore('expired')} className="w-full p-3 text-sm text-primary hover:bg-background-warm">
+                    Show more ({data.expired_count - data.expired_items.length} remaining)
+                </button>
+             )}
           </div>
         </div>
       </div>
@@ -244,6 +281,7 @@ const Dashboard: React.FC = () => {
           expiringItems={data.expiring_today_items}
           expiredItems={data.expired_items}
           onDispose={handleDispose}
+          onDisposeAll={handleDisposeAll}
       />
     </div>
   );
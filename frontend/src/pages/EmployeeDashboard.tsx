@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { getDashboardStats, disposeExpiredItem } from '../services/api';
+import { getDashboardStats, disposeExpiredItem, bulkDisposeItems } from '../services/api';
 import ExpiredItemsModal from '../components/ExpiredItemsModal';
 import { AlertTriangle, ClipboardList } from 'lucide-react';
 
@@ -66,6 +66,17 @@ const EmployeeDashboard: React.FC = () => {
         }
     };
 
+    const handleDisposeAll = async (ids: number[]) => {
+        try {
+            await bulkDisposeItems({ ids, notes: 'Expired' });
+            fetchData();
+        } catch (e) {
+            console.error("Failed to dispose", e);
+            alert("Failed to dispose items.");
+            throw e;
+        }
+    };
+
     if (loading) {
         return <div className="p-8 text-center">Loading Dashboard...</div>;
     }
@@ -235,6 +246,7 @@ const EmployeeDashboard: React.FC = () => {
                 expiringItems={data.expiring_today_items}
                 expiredItems={data.expired_items}
                 onDispose={handleDispose}
+                onDisposeAll={handleDisposeAll}
             />
         </div>
     );
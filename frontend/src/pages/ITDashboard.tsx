@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getUsers, createUser, updateUser, getStores } from '../services/api';
+import { getUsers, createUser, updateUser, getStores, getStoreOverview } from '../services/api';
 import { Users, Database, FileText, Server, Edit } from 'lucide-react';
 
 interface User {
@@ -18,9 +18,22 @@ interface Store {
     name: string;
 }
 
+interface StoreOverview {
+    store_id: number;
+    store_name: string;
+    low_stock_count: number;
+    expiring_today_count: number;
+    expired_count: number;
+    batch_count: number;
+    last_stocktake_at: string | null;
+    waste_7d_disposals: number;
+    waste_7d_quantity: number;
+}
+
 const ITDashboard: React.FC = () => {
     const [users, setUsers] = useState<User[]>([]);
     const [stores, setStores] = useState<Store[]>([]);
+    const [overview, setOverview] = useState<StoreOverview[]>([]);
     // const [loading, setLoading] = useState(true);
     const [showUserModal, setShowUserModal] = useState(false);
     const [editingUser, setEditingUser] = useState<User | null>(null);
@@ -42,9 +55,10 @@ const ITDashboard: React.FC = () => {
 
     const fetchData = async () => {
         try {
-            const [usersData, storesData] = await Promise.all([getUsers(), getStores()]);
+            const [usersData, storesData, overviewData] = await Promise.all([getUsers(), getStores(), getStoreOverview()]);
             setUsers(usersData);
             setStores(storesData);
+            setOverview(overviewData.stores);
         } catch (error) {
             console.error("Error fetching data", error);
         } finally {
@@ -141,6 +155,39 @@ const ITDashboard: React.FC = () => {
                 </a>
             </div>
 
+            {/* Store Overview */}
+            <div className="bg-white rounded-xl shadow-sm border border-neutral-light p-6 mb-8">
+                <h2 className="text-xl font-semibold text-charcoal mb-6">Store Overview</h2>
+                <div className="overflow-x-auto">
+                    <table className="w-full text-left">
+                        <thead className="bg-neutral-pale text-dark-grey uppercase text-xs">
+                            <tr>
+                                <th className="px-4 py-3 rounded-l-lg">Store</th>
+                                <th className="px-4 py-3 text-right">Low Stock</th>
+                                <th className="px-4 py-3 text-right">Expiring Today</th>
+                                <th className="px-4 py-3 text-right">Expired</th>
+                                <th className="px-4 py-3 text-right">Batches</th>
+                                <th className="px-4 py-3">Last Stocktake</th>
+                                <th className="px-4 py-3 rounded-r-lg text-right">Waste (7d)</th>
+                            </tr>
+                        </thead>
+                        <tbody className="divide-y divide-neutral-light">
+                            {overview.map(row => (
+                                <tr key={row.store_id} className="hover:bg-neutral-pale transition-colors">
+                                    <td className="px-4 py-3 font-medium">{row.store_name}</td>
+                                    <td className="px-4 py-3 text-right">{row.low_stock_count}</td>
+                                    <td className="px-4 py-3 text-right">{row.expiring_today_count}</td>
+                                    <td className="px-4 py-3 text-right">{row.expired_count}</td>
+                                    <td className="px-4 py-3 text-right">{row.batch_count}</td>
+                                    <td className="px-4 py-3 text-gray-600">{row.last_stocktake_at ? new Date(row.last_stocktake_at).toLocaleDateString() : '-'}</td>
+                                    <td className="px-4 py-3 text-right">{row.waste_7d_disposals}</td>
+                                </tr>
+                            ))}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+
             {/* User Management Section */}
             <div className="bg-white rounded-xl shadow-sm border border-neutral-light p-6">
                 <div className="flex justify-between items-center mb-6">
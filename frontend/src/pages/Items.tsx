@@ -9,6 +9,7 @@ interface Item {
     base_unit: string;
     shelf_life_days: number | null;
     par: number;
+    suggested_par?: number | null;
     default_location: number | null;
     store: number | null;
     store_name?: string | null;
@@ -340,7 +341,12 @@ const ItemsPage: React.FC = () => {
                                                 : <span className="text-gray-400 italic">No Expiration</span>
                                             }
                                         </td>
-                                        <td className="p-4 text-right font-mono text-gray-700">{item.par}</td>
+                                        <td className="p-4 text-right font-mono text-gray-700">
+                                            {item.par}
+                                            {item.suggested_par != null && item.suggested_par !== item.par && (
+                                                <div className="text-xs text-gray-400" title="Suggested from demand forecast">suggested {item.suggested_par}</div>
+                                            )}
+                                        </td>
                                         <td className="p-4 text-right">
                                             <button 
                                                 onClick={() => openModal(item)}
@@ -6,6 +6,7 @@ import {
     getActiveStocktakeSession,
     saveStocktakeRecords,
     finalizeStocktakeSession,
+    getStocktakeProgress,
     getLocations,
     getItems,
     getItemConversions
@@ -84,6 +85,14 @@ const StocktakePage: React.FC = () => {
             if (activeSession) {
                 setSession(activeSession);
                 await loadMetadata();
+
+                // Resume: locations with saved counts are already done
+                const progress = await getStocktakeProgress(activeSession.id);
+                setCompletedLocations(
+                    progress.locations
+                        .filter((loc: any) => loc.records_counted > 0)
+                        .map((loc: any) => loc.location_id)
+                );
             }
         } catch (err) {
             console.error("Failed to check active session", err);
@@ -19,8 +19,13 @@ export const getDashboardStats = async () => {
   return response.data;
 };
 
-export const getAnalytics = async () => {
-  const response = await api.get('/inventory/analytics/');
+export const getStoreOverview = async () => {
+  const response = await api.get('/inventory/stores/overview/');
+  return response.data;
+};
+
+export const getAnalytics = async (params?: { start?: string; end?: string; granularity?: 'day' | 'week' | 'month'; compare?: 'last_year' }) => {
+  const response = await api.get('/inventory/analytics/', { params });
   return response.data;
 };
 
@@ -172,6 +177,17 @@ export const getFullInventory = async (typeFilter?: string) => {
   return results;
 };
 
+// Delta sync: pass the cursor from the previous call (any old timestamp the first time).
+// On "reset" replace the local cache with results; otherwise upsert results and drop deleted ids.
+export const syncCollection = async (
+  resource: 'items' | 'recipes' | 'unit-conversions' | 'locations' | 'inventory',
+  updatedSince: string,
+  params?: Record<string, any>
+) => {
+  const response = await api.get(`/inventory/${resource}/`, { params: { ...params, updated_since: updatedSince } });
+  return response.data as { cursor: string; reset: boolean; results: any[]; deleted: number[] };
+};
+
 export const getRecipes = async () => {
   const response = await api.get('/inventory/items/?has_recipe=true&type=product');
   return response.data.results;
@@ -229,6 +245,11 @@ export const createReceivingLog = async (data: any) => {
   return response.data;
 };
 
+export const receiveDelivery = async (lines: { item: number; quantity: number; unit_cost?: number | null }[], storeId?: number) => {
+  const response = await api.post('/inventory/receiving-logs/bulk/', { lines, store_id: storeId });
+  return response.data;
+};
+
 // Stocktake Session
 export const getActiveStocktakeSession = async () => {
   const response = await api.get('/inventory/stocktake-sessions/current/');
@@ -245,22 +266,87 @@ export const saveStocktakeRecords = async (sessionId: number, records: any[]) =>
   return response.data;
 };
 
+export const syncStocktakeRecords = async (
+  sessionId: number,
+  deviceId: string,
+  since: number,
+  changes: { item_id: number, location_id: number, quantity_counted: number, unit_name?: string, seq: number }[]
+) => {
+  const response = await api.post(`/inventory/stocktake-sessions/${sessionId}/sync/`, { device_id: deviceId, since, changes });
+  return response.data;
+};
+
+export const splitStocktakeSession = async (sessionId: number, locationIds?: number[]) => {
+  const response = await api.post(`/inventory/stocktake-sessions/${sessionId}/split/`, locationIds ? { location_ids: locationIds } : {});
+  return response.data;
+};
+
+export const saveStocktakeSubSessionRecords = async (subSessionId: number, records: any[]) => {
+  const response = await api.post(`/inventory/stocktake-sub-sessions/${subSessionId}/save_records/`, { records });
+  return response.data;
+};
+
+export const submitStocktakeSubSession = async (subSessionId: number) => {
+  const response = await api.post(`/inventory/stocktake-sub-sessions/${subSessionId}/submit/`);
+  return response.data;
+};
+
 export const finalizeStocktakeSession = async (sessionId: number) => {
   const response = await api.post(`/inventory/stocktake-sessions/${sessionId}/finalize/`);
   return response.data;
 };
 
+export const getStocktakeProgress = async (sessionId: number) => {
+  const response = await api.get(`/inventory/stocktake-sessions/${sessionId}/progress/`);
+  return response.data;
+};
+
+export const getStocktakeReport = async (sessionId: number) => {
+  const response = await api.get(`/inventory/stocktake-sessions/${sessionId}/report/`);
+  return response.data;
+};
+
 // Expired Items
 export const getExpiredItems = async () => {
   const response = await api.get('/inventory/inventory/expired/');
   return response.data;
 };
 
+export const getExpiryPage = async (section: 'expired' | 'expiring_today', cursor: string, limit: number = 50) => {
+  const response = await api.get(`/inventory/inventory/${section}/`, { params: { cursor, limit } });
+  return response.data;
+};
+
+export const getExpiryCalendar = async (params?: { days?: number; store_id?: number }) => {
+  const response = await api.get('/inventory/inventory/expiry_calendar/', { params });
+  return response.data;
+};
+
+export const getStockAt = async (params: { at: string; item?: number; location?: number; store_id?: number }) => {
+  const response = await api.get('/inventory/stock-at/', { params });
+  return response.data;
+};
+
+export const getLogArchive = async (params: { kind: 'production' | 'receiving' | 'variance'; start?: string; end?: string; item?: number; limit?: number; store_id?: number }) => {
+  const response = await api.get('/inventory/archives/', { params });
+  return response.data;
+};
+
+export const getStockMovements = async (params?: { item?: number; location?: number; reason?: string; cursor?: string }) => {
+  const response = await api.get('/inventory/stock-movements/', { params });
+  return response.data;
+};
+
 export const disposeExpiredItem = async (inventoryId: number, notes: string = '') => {
   const response = await api.post(`/inventory/inventory/${inventoryId}/dispose/`, { notes });
   return response.data;
 };
 
+export const bulkDisposeItems = async (payload: { ids?: number[]; location?: number; all_expired?: boolean; notes?: string }) => {
+  const response = await api.post('/inventory/inventory/bulk_dispose/', payload);
+  return response.data;
+};
+
 export const getExpiredItemLogs = async () => {
   const response = await api.get('/inventory/expired-logs/');
   return response.data.results;